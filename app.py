@@ -1,17 +1,30 @@
-from flask import Flask, request, jsonify, render_template
-from flask_bcrypt import Bcrypt
+from flask import Flask, Response, request, jsonify, render_template, g
 import sys
 sys.path.append("..")
 import os
-import pika
-import uuid
+import json
+from concurrent.futures import TimeoutError as FutureTimeout
+from werkzeug.exceptions import RequestEntityTooLarge
 from dotenv import load_dotenv
 from flask_cors import CORS
-from configurations import database_configuration, redis_configuration  
-from helper import helper
-
-
-dot_env_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), '.env')
+from configurations import database_configuration, redis_configuration, storage_configuration, rabbitmq_configuration
+from helper import helper, serialization, search, progress as progress_channels
+from helper.auth import Authenticator
+from helper.sessions import SessionStore
+from helper.hashing import PasswordHasher, HashingPoolSaturated
+from helper.count_cache import MovieCountCache
+from helper.response_cache import ResponseCache
+from helper.blob_store import FileTooLargeError
+from helper.movies import MOVIE_FIELDS, parse_fields, parse_page, parse_listing, listing_cache_key, page_out_of_range, find_page, page_response
+from helper.autocomplete import Autocomplete
+from helper.chunked_upload import ChunkedUploads, UploadError
+from helper.fingerprints import UploadFingerprints
+from helper.upload_queue import UploadQueue
+from helper.upload_request import spooling_request
+from helper.health import HealthChecks
+
+
+dot_env_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.env')
 load_dotenv(dot_env_path)
 
 
@@ -23,16 +36,72 @@ app.config['SECRET_KEY'] = os.getenv('FLASK_SECRET_KEY')
 app.config['ALLOWED_EXTENSIONS'] = {'csv', 'xlsx'}
 
 max_content_length = int(os.getenv('MAX_CONTENT_LENGTH', 10 * 1024 * 1024 * 1024))  # Default 10 GB
+app.config['MAX_CONTENT_LENGTH'] = max_content_length + 1024 * 1024  # The file plus its multipart framing
+max_per_page = int(os.getenv('MAX_PER_PAGE', 100))
+sse_heartbeat_seconds = float(os.getenv('SSE_HEARTBEAT_SECONDS', 15))
+message_compression = os.getenv('MESSAGE_COMPRESSION', 'gzip')
 
 
 redis_conn = redis_configuration.get_redis_connection()
-
-rabbitmq_host = os.getenv('RABBITMQ_HOST')
-connection = pika.BlockingConnection(pika.ConnectionParameters(host=rabbitmq_host))
-channel = connection.channel()
-
-
-bcrypt = Bcrypt(app)
+blob_store = storage_configuration.get_blob_store()
+session_store = SessionStore(redis_conn, ttl=int(os.getenv('SESSION_TTL', 3600)))
+authenticator = Authenticator(
+    session_store,
+    cache_size=int(os.getenv('AUTH_CACHE_SIZE', 10000)),
+    cache_ttl=float(os.getenv('AUTH_CACHE_TTL', 30))
+)
+movie_count_cache = MovieCountCache(
+    redis_conn,
+    database_configuration.get_movies_collection,
+    refresh_interval=float(os.getenv('MOVIES_COUNT_REFRESH_SECONDS', 60)),
+    use_estimate=os.getenv('MOVIES_COUNT_ESTIMATED', 'false').lower() == 'true'
+)
+movies_response_cache = ResponseCache(redis_conn, ttl=int(os.getenv('MOVIES_CACHE_TTL', 30)))
+facets_cache = ResponseCache(redis_conn, ttl=int(os.getenv('FACETS_CACHE_TTL', 300)))
+autocomplete = Autocomplete(redis_conn)
+chunked_uploads = ChunkedUploads(
+    redis_conn,
+    blob_store,
+    chunk_size=int(os.getenv('UPLOAD_CHUNK_SIZE', 8 * 1024 * 1024)),
+    max_size=max_content_length,
+    session_ttl=int(os.getenv('UPLOAD_SESSION_TTL', 86400))
+)
+app.request_class = spooling_request(blob_store, app.config['ALLOWED_EXTENSIONS'], max_file_size=max_content_length)
+upload_fingerprints = UploadFingerprints(redis_conn, ttl=int(os.getenv('UPLOAD_FINGERPRINT_TTL', 30 * 24 * 3600)))
+max_suggestions = int(os.getenv('MAX_SUGGESTIONS', 20))
+
+publisher = rabbitmq_configuration.get_publisher()
+upload_queue = UploadQueue(
+    redis_conn,
+    blob_store,
+    publisher,
+    upload_fingerprints,
+    compression=message_compression,
+    confirm_timeout=float(os.getenv('PUBLISH_CONFIRM_TIMEOUT', 10))
+)
+
+
+readiness_timeout = float(os.getenv('READINESS_TIMEOUT', 2))
+
+def publisher_ready():
+    # The first probe starts the publisher; it may connect within the probe's deadline
+    if not publisher.wait_ready(readiness_timeout):
+        raise ConnectionError('Publisher is not connected to RabbitMQ.')
+
+
+readiness_checks = HealthChecks({
+    'mongodb': lambda: database_configuration.get_database().command('ping'),
+    'redis': lambda: redis_conn.ping(),
+    'rabbitmq': publisher_ready
+}, timeout=readiness_timeout)
+
+
+password_hasher = PasswordHasher(
+    log_rounds=int(os.getenv('BCRYPT_LOG_ROUNDS', 12)),
+    max_workers=int(os.getenv('HASHING_WORKERS', os.cpu_count() or 1)),
+    max_queue=int(os.getenv('HASHING_QUEUE_DEPTH', 16)),
+    timeout=float(os.getenv('HASHING_TIMEOUT', 10))
+)
 
 
 
@@ -50,7 +119,8 @@ def register():
     2. Validates that both fields are provided.
     3. Checks if the username already exists in the database.
     4. Hashes the password and stores the user in the database.
-    5. Generates a JWT token for the newly registered user.
+    5. Starts a session keyed by the new user's ID and generates a JWT token for it, so the token
+       works immediately without a separate login.
 
     **Request**:
     - Method: POST
@@ -67,6 +137,7 @@ def register():
           "token": "<JWT_token>"
       }
     - Error (400): Username and password missing or user already exists.
+    - Error (503): The password hashing pool is saturated; retry later.
 
     **Returns**:
     - A success message with a token if registration is successful.
@@ -84,9 +155,14 @@ def register():
     if users_collection.find_one({'username': username}):
         return jsonify({'message': 'User already exists!'}), 400
 
-    hashed_password = bcrypt.generate_password_hash(password).decode('utf-8')
-    user_id = users_collection.insert_one({'username': username, 'password': hashed_password}).inserted_id
-    token = helper.generate_token(str(user_id),app.config['SECRET_KEY'])
+    try:
+        hashed_password = password_hasher.hash_password(password)
+    except (HashingPoolSaturated, FutureTimeout):
+        return jsonify({'message': 'Server busy, please retry.'}), 503
+
+    user_id = str(users_collection.insert_one({'username': username, 'password': hashed_password}).inserted_id)
+    session_store.create(user_id, username)
+    token = helper.generate_token(user_id,app.config['SECRET_KEY'])
 
     return jsonify({'message': 'User registered successfully!', 'token': token}), 201
 
@@ -104,8 +180,9 @@ def login():
     1. Accepts a JSON payload containing `username` and `password`.
     2. Validates the provided credentials against the database.
     3. If credentials are valid:
-        - Stores the username in Redis with a 1-hour expiry.
-        - Generates a JWT token for the user.
+        - Re-hashes the password in the background when it was stored with an outdated cost factor.
+        - Starts a session keyed by the user's ID (sliding expiry of `SESSION_TTL` seconds).
+        - Generates a JWT token for the same user ID.
     4. If credentials are invalid:
         - Returns an error response.
 
@@ -124,6 +201,7 @@ def login():
           "token": "<JWT_token>"
       }
     - Error (400/401): Invalid credentials or missing fields.
+    - Error (503): The password hashing pool is saturated; retry later.
 
     **Returns**:
     - A success message with a token if login is successful.
@@ -139,17 +217,54 @@ def login():
 
     users_collection = database_configuration.get_users_collection()
     user = users_collection.find_one({'username': username})
-    if not user or not bcrypt.check_password_hash(user['password'], password):
+    if not user:
         return jsonify({'message': 'Invalid credentials!'}), 401
 
-    redis_conn.setex(f"user:{username}", 3600, str(username))  # 1-hour expiry
-    token = helper.generate_token(str(user['username']),app.config['SECRET_KEY'])
+    try:
+        if not password_hasher.check_password(user['password'], password):
+            return jsonify({'message': 'Invalid credentials!'}), 401
+    except (HashingPoolSaturated, FutureTimeout):
+        return jsonify({'message': 'Server busy, please retry.'}), 503
+
+    if password_hasher.needs_rehash(user['password']):
+        password_hasher.rehash_in_background(
+            password,
+            lambda new_hash: users_collection.update_one({'_id': user['_id']}, {'$set': {'password': new_hash}})
+        )
+
+    user_id = str(user['_id'])
+    session_store.create(user_id, username)
+    token = helper.generate_token(user_id,app.config['SECRET_KEY'])
 
     return jsonify({'message': 'Login successful!', 'token': token}), 200
 
 
 
+@app.route('/logout', methods=['POST'])
+@authenticator.required
+def logout():
+    """
+    Endpoint to log out the current user.
+
+    **Authorization**: Requires a valid token in the `Authorization` header.
+
+    **Process**:
+    - Deletes the user's session from Redis.
+    - Publishes the revocation so every web process drops the session from its local cache immediately.
+
+    Returns:
+        - 403: If token is missing or invalid.
+        - 401: If the user's session has already expired.
+        - 200: If the user was logged out.
+    """
+
+    authenticator.revoke(g.user_id)
+    return jsonify({'message': 'Logged out successfully!'}), 200
+
+
+
 @app.route('/welcome', methods=['GET'])
+@authenticator.required
 def welcome():
     """
     Endpoint to display a welcome page for logged-in users.
@@ -160,7 +275,7 @@ def welcome():
     **Process**:
     1. Checks for an `Authorization` header containing a valid JWT token.
     2. Decodes the token to validate it.
-    3. Retrieves the user's session data from Redis.
+    3. Retrieves the user's session data (from the in-process session cache, falling back to Redis).
     4. If the token or session data is invalid, an error response is returned.
     5. Renders a `welcome.html` page with the user's username.
 
@@ -178,25 +293,12 @@ def welcome():
     - An error message if the token or session data is invalid.
     """
 
-    token = request.headers.get('Authorization')
-    if not token:
-        return jsonify({'message': 'Token is missing!'}), 403
-
-    token = token.split(" ")[1] if " " in token else token
-    decoded_token = helper.decode_token(token,app.config['SECRET_KEY'])
-    if not decoded_token:
-        return jsonify({'message': 'Invalid or expired token!'}), 403
-
-    user_id = decoded_token['user_id']
-    username = redis_conn.get(f"user:{user_id}")
-    if not username:
-        return jsonify({'message': 'Session expired, please log in again.'}), 401
-
-    return render_template('welcome.html', username=username.decode('utf-8'))
+    return render_template('welcome.html', username=g.username)
 
 
 
 @app.route('/upload', methods=['POST'])
+@authenticator.required
 def upload_file():
     """
     Endpoint to handle file uploads.
@@ -210,61 +312,184 @@ def upload_file():
     - File size (maximum of 10GB).
 
     **Process**:
-    - Checks for an active user session using Redis.
-    - Queues the file for background processing via RabbitMQ.
+    - Checks for an active user session (see `helper.auth.Authenticator`).
+    - Parses the multipart body straight into the shared spool directory (see `helper.upload_request`), so the
+      file is written to disk once and memory stays flat regardless of file size. The size limit is enforced
+      while parsing, including for bodies sent without `Content-Length`.
+    - Queues a small JSON descriptor (file_id, path, size, checksum), wrapped in a versioned envelope,
+      for background processing via RabbitMQ.
 
     Returns:
         - 403: If token is missing or invalid.
         - 401: If the user's session has expired.
         - 400: If the file is missing, invalid, or exceeds the size limit.
+        - 200: If an identical file was already uploaded; its `file_id` is returned.
         - 202: If the file is successfully queued for processing.
+        - 503: If the message broker rejected the file or could not be reached; retry the request.
     """
 
-    token = request.headers.get('Authorization')
-    if not token:
-        return jsonify({'message': 'Token is missing!'}), 403
+   
+    too_large = f'File size exceeds the maximum allowed limit of 10GB ({max_content_length / (1024 * 1024 * 1024)}GB).'
+    if request.content_length is not None and request.content_length > max_content_length:
+        return jsonify({'message': too_large}), 400
 
-    token = token.split(" ")[1] if " " in token else token
-    decoded_token = helper.decode_token(token, app.config['SECRET_KEY'])
-    if not decoded_token:
-        return jsonify({'message': 'Invalid or expired token!'}), 403
-    
-    user_id = decoded_token['user_id']
-    username = redis_conn.get(f"user:{user_id}")
-    if not username:
-        return jsonify({'message': 'Session expired, please log in again.'}), 401
+    try:
+        files = request.files  # Parsed here: the file is written to the spool as it is received
+    except (FileTooLargeError, RequestEntityTooLarge):
+        return jsonify({'message': too_large}), 400
 
-   
-    if 'file' not in request.files:
+    if 'file' not in files:
         return jsonify({'message': 'No file part'}), 400
 
-    file = request.files['file']
+    file = files['file']
     if file.filename == '':
         return jsonify({'message': 'No selected file'}), 400
 
     if not helper.allowed_file(file.filename,app.config['ALLOWED_EXTENSIONS']):
         return jsonify({'message': 'Invalid file format. Only CSV and XLSX files are allowed.'}), 400
-    
-    file.seek(0, os.SEEK_END)  
-    file_size = file.tell()   
-    
-    if file_size > max_content_length:
-        return jsonify({'message': f'File size exceeds the maximum allowed limit of 10GB ({max_content_length / (1024 * 1024 * 1024)}GB).'}), 400
 
-   
-    file_id = str(uuid.uuid4())
+    descriptor = file.stream.commit()  # A `SpoolFile`; the request discards any other file part
+    return enqueue_file(descriptor)
 
-    
-    message = {'file_id': file_id, 'file_content': file.read().decode('latin1')}
-    redis_conn.set(f'progress_{file_id}',0)
-    channel.basic_publish(exchange='', routing_key='file_processing_queue', body=str(message))
 
-    return jsonify({'file_id': file_id, 'status': 'File queued for processing'}), 202
+def enqueue_file(descriptor):
+    """
+    Queues a spooled file for the consumers (see `helper.upload_queue.UploadQueue`).
+
+    Returns:
+        - 200: The earlier `file_id`, with `duplicate` set, if an identical file was already uploaded.
+        - 202: If the file is successfully queued for processing.
+        - 503: If the broker rejected the message, or it could not be sent within `PUBLISH_CONFIRM_TIMEOUT` seconds.
+    """
+    payload, status = upload_queue.enqueue(descriptor)
+    return jsonify(payload), status
+
+
+@app.route('/uploads', methods=['POST'])
+@authenticator.required
+def initiate_upload():
+    """
+    Endpoint starting a resumable, chunked upload.
+
+    **Authorization**: Requires a valid token in the `Authorization` header.
+
+    **Request Body** (JSON):
+    - `filename` (str): Name of the file (only CSV and XLSX allowed).
+    - `size` (int): Size of the file in bytes; rejected up front if it exceeds `MAX_CONTENT_LENGTH`.
+
+    **Protocol**:
+    1. `POST /uploads` returns `upload_id`, `chunk_size` and `total_chunks`.
+    2. `PUT /uploads/<upload_id>` once per chunk (in any order, possibly in parallel) with
+       `Content-Range: bytes <start>-<end>/<size>` and optionally `X-Chunk-Checksum` (BLAKE2b hex of the chunk).
+    3. After a failure, `GET /uploads/<upload_id>` tells which chunks are missing.
+    4. `POST /uploads/<upload_id>/complete` queues the file, as `/upload` does.
+
+    Returns:
+        - 403: If token is missing or invalid.
+        - 400: If the filename or size is invalid.
+        - 413: If the file exceeds the size limit.
+        - 201: Upload created.
+    """
+
+    data = request.get_json(silent=True) or {}
+    filename = data.get('filename') or ''
+    if not helper.allowed_file(filename, app.config['ALLOWED_EXTENSIONS']):
+        return jsonify({'message': 'Invalid file format. Only CSV and XLSX files are allowed.'}), 400
+    if not isinstance(data.get('size'), int):
+        return jsonify({'message': 'Invalid size! Must be an integer.'}), 400
+
+    try:
+        upload = chunked_uploads.initiate(g.user_id, filename.rsplit('.', 1)[1].lower(), data['size'])
+    except UploadError as e:
+        return jsonify({'message': str(e)}), e.status
+    return jsonify(upload), 201
+
+
+@app.route('/uploads/<upload_id>', methods=['PUT'])
+@authenticator.required
+def upload_chunk(upload_id):
+    """
+    Endpoint receiving one chunk of a resumable upload.
+
+    **Process**:
+    - The request body is streamed straight into the spool file at the chunk's offset; a chunk already
+      received is acknowledged without being written again.
+    - Requests larger than the upload's chunk size are rejected before the body is read.
+
+    Returns:
+        - 403: If token is missing or invalid.
+        - 400: If the `Content-Range` is invalid or the body is incomplete.
+        - 404: If the upload does not exist or expired.
+        - 413: If the request body is larger than a chunk.
+        - 422: If the chunk does not match `X-Chunk-Checksum`; it can be sent again.
+        - 200: Chunk stored (or skipped, if it was already received).
+    """
+
+    if request.content_length is not None and request.content_length > chunked_uploads.chunk_size:
+        return jsonify({'message': f'Chunk exceeds {chunked_uploads.chunk_size} bytes.'}), 413
+    try:
+        result = chunked_uploads.write_chunk(
+            upload_id,
+            g.user_id,
+            request.headers.get('Content-Range'),
+            request.stream,
+            checksum=request.headers.get('X-Chunk-Checksum')
+        )
+    except UploadError as e:
+        return jsonify({'message': str(e)}), e.status
+    return jsonify(result), 200
+
+
+@app.route('/uploads/<upload_id>', methods=['GET'])
+@authenticator.required
+def upload_status(upload_id):
+    """
+    Endpoint reporting the received offset and the missing chunks of a resumable upload.
+
+    Returns:
+        - 403: If token is missing or invalid.
+        - 404: If the upload does not exist or expired.
+        - 200: `offset`, `received_chunks`, `missing_chunks`, `chunk_size`, `total_chunks` and `size`.
+    """
+
+    try:
+        return jsonify(chunked_uploads.status(upload_id, g.user_id)), 200
+    except UploadError as e:
+        return jsonify({'message': str(e)}), e.status
+
+
+@app.route('/uploads/<upload_id>/complete', methods=['POST'])
+@authenticator.required
+def complete_upload(upload_id):
+    """
+    Endpoint completing a resumable upload and queueing the file for processing.
+
+    Returns:
+        - 403: If token is missing or invalid.
+        - 404: If the upload does not exist or expired.
+        - 409: If chunks are still missing.
+        - 200: If an identical file was already uploaded; its `file_id` is returned.
+        - 202: If the file is successfully queued for processing.
+        - 503: If the file could not be queued; the upload is kept, retry the request.
+    """
+
+    try:
+        descriptor = chunked_uploads.complete(upload_id, g.user_id)
+    except UploadError as e:
+        return jsonify({'message': str(e)}), e.status
+
+    payload, status = upload_queue.enqueue(descriptor, keep_file=True)
+    if status == 503:
+        chunked_uploads.reopen(upload_id, descriptor)
+    else:
+        chunked_uploads.finish(upload_id)
+    return jsonify(payload), status
 
 
 
 
 @app.route('/progress/<file_id>', methods=['GET'])
+@authenticator.required
 def check_progress(file_id):
     """
     Endpoint to fetch the progress of a file upload.
@@ -282,20 +507,6 @@ def check_progress(file_id):
         - 200: Progress status of the file upload.
     """
 
-    token = request.headers.get('Authorization')
-    if not token:
-        return jsonify({'message': 'Token is missing!'}), 403
-
-    token = token.split(" ")[1] if " " in token else token
-    decoded_token = helper.decode_token(token,app.config['SECRET_KEY'])
-    if not decoded_token:
-        return jsonify({'message': 'Invalid or expired token!'}), 403
-    
-    user_id = decoded_token['user_id']
-    username = redis_conn.get(f"user:{user_id}")
-    if not username:
-        return jsonify({'message': 'Session expired, please log in again.'}), 401
-    
     progress = redis_conn.get(f'progress_{file_id}')
     if not progress:
         return jsonify({'error': 'File not being processed'}), 404
@@ -303,7 +514,90 @@ def check_progress(file_id):
     return jsonify({'progress': float(progress)})
 
 
+def fetch_movies_page(listing):
+    """
+    Queries one page of movies and serializes the response body.
+
+    **Purpose**:
+    - Computes `/movies` responses on a cache miss; the result is stored as-is by the response cache.
+
+    **Process**:
+    1. Asks MongoDB only for the requested `fields` (plus `_id` and the sort field needed for the cursor),
+       so documents arrive already shaped like the response and are not rebuilt field by field
+       (see `helper.movies.find_page`).
+    2. Fills defaults for missing fields, drops the cursor-only fields and serializes the payload
+       (see `helper.movies.page_response`).
+
+    **Returns**:
+    - `(status, body)`: HTTP status code and the serialized JSON body as bytes.
+    """
+
+    total_movies = movie_count_cache.get()
+    if page_out_of_range(listing, total_movies):
+        return page_response(listing, [], total_movies)
+    movies = list(find_page(database_configuration.get_movies_collection(), listing))
+    return page_response(listing, movies, total_movies)
+
+
+@app.route('/progress/<file_id>/stream', methods=['GET'])
+@authenticator.required
+def stream_progress(file_id):
+    """
+    Endpoint streaming the progress of a file as Server-Sent Events.
+
+    **Authorization**: Requires a valid token in the `Authorization` header.
+
+    **Process**:
+    - Subscribes to the file's Redis pub/sub channel before reading the current state, so no update is missed.
+    - Sends the current progress details first, then one `progress` event per update published by the consumer
+      (rows and bytes done, throughput, ETA, status).
+    - Sends a comment every `SSE_HEARTBEAT_SECONDS` to keep idle connections open, and closes the stream once
+      the file is done or failed (a `retrying` update keeps it open: the failed attempt is retried once).
+
+    Args:
+        file_id (str): Unique ID of the uploaded file.
+
+    Returns:
+        - 403: If token is missing or invalid.
+        - 404: If the file is not being processed.
+        - 200: `text/event-stream` of progress events.
+    """
+
+    pubsub = redis_conn.pubsub(ignore_subscribe_messages=True)
+    pubsub.subscribe(progress_channels.progress_channel(file_id))
+
+    pipeline = redis_conn.pipeline(transaction=False)
+    pipeline.get(progress_channels.progress_key(file_id))
+    pipeline.hgetall(progress_channels.details_key(file_id))
+    progress, details = pipeline.execute()
+    if progress is None:
+        pubsub.close()
+        return jsonify({'error': 'File not being processed'}), 404
+
+    snapshot = progress_channels.snapshot(file_id, progress, details)
+
+    def events():
+        try:
+            yield progress_channels.progress_event(snapshot)
+            if progress_channels.is_final(snapshot):
+                return
+            while True:
+                message = pubsub.get_message(timeout=sse_heartbeat_seconds)
+                if message is None:
+                    yield progress_channels.KEEP_ALIVE_EVENT
+                    continue
+                update = json.loads(message['data'])
+                yield progress_channels.progress_event(update)
+                if progress_channels.is_final(update):
+                    return
+        finally:
+            pubsub.close()
+
+    return Response(events(), mimetype='text/event-stream', headers=progress_channels.SSE_HEADERS)
+
+
 @app.route('/movies', methods=['GET'])
+@authenticator.required
 def list_movies():
     """
     Endpoint to fetch a paginated and sortable list of movies/shows.
@@ -312,97 +606,200 @@ def list_movies():
 
     **Query Parameters**:
     - `page` (int): Page number for pagination (default: 1).
-    - `limit` (int): Number of items per page (default: 10).
+    - `per_page` (int): Number of items per page (default: 10, maximum: `MAX_PER_PAGE`).
     - `sort_by` (str): Field to sort by (e.g., 'date_added', 'release_year', 'duration').
+    - `order` (str): 'asc' or 'desc' (default: 'asc').
+    - `cursor` (str): Continuation token returned as `next_cursor` by a previous call. When present, `page`,
+      `sort_by` and `order` are ignored and the page following the token is returned.
+    - `fields` (str): Optional comma-separated list of fields to return (default: all movie fields).
 
     **Process**:
     - Fetches data from the database.
-    - Supports pagination and sorting.
+    - The total count comes from a Redis cache refreshed in the background, not from a collection scan.
+    - Serialized responses are cached in Redis per (sort, order, page/cursor, per_page) for `MOVIES_CACHE_TTL`
+      seconds and invalidated when an ingest finishes; concurrent misses are computed only once.
+    - Results are ordered by the sort field with `_id` as a tiebreaker, so ordering is stable.
+    - Cursor mode uses a range query on the `(sort_by, _id)` index instead of `skip()`, so deep pages
+      cost the same as the first page.
 
     Returns:
         - 403: If token is missing or invalid.
-        - 200: Paginated list of movies/shows.
+        - 400: If a parameter or the cursor is invalid.
+        - 200: Paginated list of movies/shows, with `next_cursor` set when more results follow.
     """
 
-    token = request.headers.get('Authorization')
-    if not token:
-        return jsonify({'message': 'Token is missing!'}), 403
-
-    token = token.split(" ")[1] if " " in token else token
-    decoded_token = helper.decode_token(token, app.config['SECRET_KEY'])
-    if not decoded_token:
-        return jsonify({'message': 'Invalid or expired token!'}), 403
-    
-    user_id = decoded_token['user_id']
-    username = redis_conn.get(f"user:{user_id}")
-    if not username:
-        return jsonify({'message': 'Session expired, please log in again.'}), 401
-
-    
     try:
-        page = int(request.args.get('page', 1))
-        if page < 1:
-            return jsonify({'message': 'Invalid page number! Page must be a positive integer.'}), 400
-    except ValueError:
-        return jsonify({'message': 'Invalid page number! Must be an integer.'}), 400
+        listing = parse_listing(request.args, max_per_page)
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
 
+    status, body = movies_response_cache.get_or_compute(
+        'movies',
+        listing_cache_key(listing),
+        lambda: fetch_movies_page(listing)
+    )
+    return app.response_class(body, status=status, mimetype='application/json')
 
-    try:
-        per_page = int(request.args.get('per_page', 10))
-        if per_page < 1:
-            return jsonify({'message': 'Invalid per_page number! Must be a positive integer.'}), 400
-    except ValueError:
-        return jsonify({'message': 'Invalid per_page number! Must be an integer.'}), 400
 
-    sort_by = request.args.get('sort_by', 'date_added')
-    order = request.args.get('order', 'asc')
+@app.route('/movies/search', methods=['GET'])
+@authenticator.required
+def search_movies():
+    """
+    Endpoint to search movies/shows with full-text and field filters, returning facet counts.
 
-    valid_sort_fields = ['date_added', 'release_year', 'duration']
-    if sort_by not in valid_sort_fields:
-        return jsonify({'message': f"Invalid sort field! Must be one of {valid_sort_fields}."}), 400
+    **Authorization**: Requires a valid token in the `Authorization` header.
 
-    sort_order = 1 if order == 'asc' else -1
-    skip_count = (page - 1) * per_page
+    **Query Parameters**:
+    - `q` (str): Full-text search over title, description, cast and director; results are ranked by relevance.
+    - `title` (str): Title prefix (case-sensitive).
+    - `director`, `cast`, `country`, `genre`, `rating`, `type` (str): Exact value; `cast`, `country` and `genre`
+      match any element of the movie's list.
+    - `year_from`, `year_to` (int): Inclusive release year range.
+    - `page` (int), `per_page` (int): Pagination, as in `/movies`.
+    - `fields` (str): Optional comma-separated list of fields to return.
 
-    
-    movies_collection = database_configuration.get_movies_collection()
-    total_movies = movies_collection.count_documents({})
+    **Process**:
+    - `search.plan` hints the most selective index led by one of the filters (text index, multikey `cast`/`country`/
+      `listed_in` indexes, `(field, release_year)` compound indexes); every filter leads one, so filtered queries
+      never scan the collection.
+    - Facet counts (type, rating, genre, country, year) and the total come from one `$facet` aggregation,
+      cached in Redis per set of filters for `FACETS_CACHE_TTL` seconds and invalidated when an ingest finishes.
+      Every page of the same search reuses them.
 
-    
-    total_pages = (total_movies + per_page - 1) // per_page
-    if page > total_pages:
-        return jsonify({'message': f'Page number exceeds total pages! Total pages: {total_pages}.'}), 400
+    Returns:
+        - 403: If token is missing or invalid.
+        - 400: If a parameter is invalid or no filter is given.
+        - 200: Matching movies/shows, facet counts and pagination.
+    """
 
-    
-    movies_cursor = movies_collection.find().sort(sort_by, sort_order).skip(skip_count).limit(per_page)
-
-    movies = [
-        {
-               "title": movie.get('title'),
-                    "release_year": movie.get('release_year'),
-                    "duration": movie.get('duration', 0),
-                    "date_added": movie.get('date_added'),
-                    "description": movie.get('description'),
-                    "director": movie.get('director'),
-                    "cast": movie.get('cast', []),
-                    "country": movie.get('country'),
-                    "rating": movie.get('rating'),
-                    "listed_in": movie.get('listed_in', []),
-                    "show_id": movie.get('show_id'),
-                    "type": movie.get('type')
-        }
-        for movie in movies_cursor
-    ]
+    try:
+        page, per_page = parse_page(request.args, max_per_page)
+        fields = parse_fields(request.args.get('fields'))
+        criteria = search.parse_criteria(request.args)
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+    if not criteria:
+        return jsonify({'message': 'At least one search filter is required!'}), 400
 
-    return jsonify({
+    movies_collection = database_configuration.get_movies_collection()
+    search_plan = search.plan(criteria)
+    _, facets_body = facets_cache.get_or_compute(
+        'facets',
+        tuple(sorted(criteria.items())),
+        lambda: (200, serialization.dumps(search.count_facets(movies_collection, search_plan)))
+    )
+    facets = serialization.loads(facets_body)
+    total_movies = facets.pop('total')
+
+    projection = dict.fromkeys(fields, 1)
+    projection['_id'] = 0
+    movies = search.find_page(movies_collection, search_plan, projection, page, per_page)
+    for movie in movies:
+        for field in fields:
+            if field not in movie:
+                movie[field] = MOVIE_FIELDS[field]
+
+    return app.response_class(serialization.dumps({
         'movies': movies,
+        'facets': facets,
         'pagination': {
             'current_page': page,
             'per_page': per_page,
-            'total_pages': total_pages,
+            'total_pages': (total_movies + per_page - 1) // per_page,
             'total_movies': total_movies
         }
-    }), 200
+    }), status=200, mimetype='application/json')
+
+
+@app.route('/movies/suggest', methods=['GET'])
+@authenticator.required
+def suggest_movies():
+    """
+    Endpoint for type-ahead suggestions of titles, directors and cast members.
+
+    **Authorization**: Requires a valid token in the `Authorization` header.
+
+    **Query Parameters**:
+    - `q` (str): What the user typed so far; matched case- and accent-insensitively against the start of any word.
+    - `limit` (int): Maximum number of suggestions (default: 10, maximum: `MAX_SUGGESTIONS`).
+
+    **Process**:
+    - Answered by one `ZRANGEBYLEX` on the Redis prefix index maintained by the consumer; MongoDB is never queried.
+
+    Returns:
+        - 403: If token is missing or invalid.
+        - 400: If `q` is missing or `limit` is invalid.
+        - 200: `suggestions`, a list of `{'value', 'kind'}` where `kind` is `title`, `director` or `cast`.
+    """
+
+    q = request.args.get('q', '')
+    if not q.strip():
+        return jsonify({'message': 'Query parameter q is required!'}), 400
+    try:
+        limit = int(request.args.get('limit', 10))
+    except ValueError:
+        return jsonify({'message': 'Invalid limit! Must be an integer.'}), 400
+    if not 1 <= limit <= max_suggestions:
+        return jsonify({'message': f'Invalid limit! Must be between 1 and {max_suggestions}.'}), 400
+
+    body = serialization.dumps({'suggestions': autocomplete.suggest(q, limit)})
+    return app.response_class(body, status=200, mimetype='application/json')
+
+
+@app.route('/metrics/hashing', methods=['GET'])
+@authenticator.required
+def hashing_metrics():
+    """
+    Endpoint exposing the password hashing pool metrics.
+
+    **Authorization**: Requires a valid token in the `Authorization` header.
+
+    **Purpose**:
+    - Reports submitted/rejected/completed jobs, in-flight and queued work, and queue-wait and hashing
+      latency totals and maxima, to size `HASHING_WORKERS` and `HASHING_QUEUE_DEPTH`.
+
+    Returns:
+        - 403: If token is missing or invalid.
+        - 401: If the user's session has expired.
+        - 200: Metrics snapshot.
+    """
+
+    return jsonify(password_hasher.metrics()), 200
+
+
+@app.route('/healthz', methods=['GET'])
+def liveness():
+    """
+    Liveness probe.
+
+    **Purpose**:
+    - Tells whether the process is able to serve requests at all. It touches no dependency, so a database or
+      broker outage never gets healthy web processes restarted.
+
+    Returns:
+        - 200: `{'status': 'alive'}`.
+    """
+
+    return jsonify({'status': 'alive'}), 200
+
+
+@app.route('/readyz', methods=['GET'])
+def readiness():
+    """
+    Readiness probe.
+
+    **Purpose**:
+    - Tells whether this process should receive traffic: MongoDB and Redis answer a ping and the publisher
+      is connected to RabbitMQ. Connections are created lazily, so the first probe also warms them up.
+    - Checks run concurrently and the probe answers within `READINESS_TIMEOUT` seconds.
+
+    Returns:
+        - 200: `status` `ready` and the result and duration of every check.
+        - 503: `status` `not ready`, with the failing checks.
+    """
+
+    ready, checks = readiness_checks.run()
+    return jsonify({'status': 'ready' if ready else 'not ready', 'checks': checks}), 200 if ready else 503
 
 
 @app.route('/')
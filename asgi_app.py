@@ -0,0 +1,421 @@
+import asyncio
+import json
+import os
+import sys
+import time
+import uuid
+from contextlib import asynccontextmanager
+sys.path.append("..")
+from dotenv import load_dotenv
+from fastapi import FastAPI, Request, Depends, Header, HTTPException
+from fastapi.responses import Response, StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import UploadFile
+from configurations import async_configuration, redis_configuration, storage_configuration, rabbitmq_configuration
+from helper import helper, serialization, progress as progress_channels
+from helper.auth import TTLCache
+from helper.sessions import AsyncSessionStore
+from helper.hashing import PasswordHasher, HashingPoolSaturated
+from helper.count_cache import MOVIES_COUNT_KEY
+from helper.response_cache import AsyncResponseCache
+from helper.blob_store import FileTooLargeError
+from helper.fingerprints import UploadFingerprints
+from helper.upload_queue import UploadQueue
+from helper.movies import parse_listing, listing_cache_key, find_page, page_response
+from logger import logger
+
+log=logger.get_logger("asgi_app")
+dot_env_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.env')
+load_dotenv(dot_env_path)
+
+secret_key = os.getenv('FLASK_SECRET_KEY')
+allowed_extensions = {'csv', 'xlsx'}
+max_content_length = int(os.getenv('MAX_CONTENT_LENGTH', 10 * 1024 * 1024 * 1024))  # Default 10 GB
+max_per_page = int(os.getenv('MAX_PER_PAGE', 100))
+sse_heartbeat_seconds = float(os.getenv('SSE_HEARTBEAT_SECONDS', 15))
+message_compression = os.getenv('MESSAGE_COMPRESSION', 'gzip')
+count_refresh_interval = float(os.getenv('MOVIES_COUNT_REFRESH_SECONDS', 60))
+count_estimated = os.getenv('MOVIES_COUNT_ESTIMATED', 'false').lower() == 'true'
+readiness_timeout = float(os.getenv('READINESS_TIMEOUT', 2))
+
+blob_store = storage_configuration.get_blob_store()
+upload_queue = UploadQueue(
+    redis_configuration.get_redis_connection(),
+    blob_store,
+    rabbitmq_configuration.get_publisher(),
+    UploadFingerprints(redis_configuration.get_redis_connection(), ttl=int(os.getenv('UPLOAD_FINGERPRINT_TTL', 30 * 24 * 3600))),
+    compression=message_compression,
+    confirm_timeout=float(os.getenv('PUBLISH_CONFIRM_TIMEOUT', 10))
+)
+token_cache = TTLCache(int(os.getenv('AUTH_CACHE_SIZE', 10000)), float(os.getenv('AUTH_CACHE_TTL', 30)))
+password_hasher = PasswordHasher(
+    log_rounds=int(os.getenv('BCRYPT_LOG_ROUNDS', 12)),
+    max_workers=int(os.getenv('HASHING_WORKERS', os.cpu_count() or 1)),
+    max_queue=int(os.getenv('HASHING_QUEUE_DEPTH', 16)),
+    timeout=float(os.getenv('HASHING_TIMEOUT', 10))
+)
+
+# Created in `lifespan`, once the event loop is running
+session_store = None
+movies_response_cache = None
+
+
+async def refresh_movie_count_forever():
+    """
+    Recomputes the cached movie count every `MOVIES_COUNT_REFRESH_SECONDS`, like `MovieCountCache` does for Flask.
+    """
+    while True:
+        await asyncio.sleep(count_refresh_interval)
+        try:
+            await refresh_movie_count()
+        except Exception as e:
+            log.error(f"Failed to refresh the movie count: {e}")
+
+
+@asynccontextmanager
+async def lifespan(app):
+    global session_store, movies_response_cache
+    redis_conn = async_configuration.get_redis_connection()
+    session_store = AsyncSessionStore(redis_conn, ttl=int(os.getenv('SESSION_TTL', 3600)))
+    movies_response_cache = AsyncResponseCache(redis_conn, ttl=int(os.getenv('MOVIES_CACHE_TTL', 30)))
+    refresher = asyncio.create_task(refresh_movie_count_forever())
+    try:
+        yield
+    finally:
+        refresher.cancel()
+        await async_configuration.close()
+
+
+app = FastAPI(lifespan=lifespan)
+
+
+@app.exception_handler(HTTPException)
+async def http_error(request, exc):
+    return json_response({'message': exc.detail}, exc.status_code)
+
+
+def json_response(payload, status=200):
+    """
+    Serializes a payload with `serialization.dumps`, the same encoder the Flask app uses.
+    """
+    return Response(serialization.dumps(payload), status_code=status, media_type='application/json')
+
+
+async def current_user(authorization: str = Header(None)):
+    """
+    Dependency protecting a route with a bearer token and an active session.
+
+    Decoded tokens are cached in-process until they expire; the session is validated and its expiry slid with
+    one non-blocking Redis round trip. Answers 403 when the token is missing or invalid and 401 when the
+    session has expired, like `Authenticator.required`.
+
+    **Returns**:
+    - `(user_id, username)`
+    """
+    if not authorization:
+        raise HTTPException(403, 'Token is missing!')
+
+    token = authorization.split(" ")[1] if " " in authorization else authorization
+    payload = token_cache.get(token)
+    if payload is None:
+        payload = helper.decode_token(token, secret_key)
+        if not payload:
+            raise HTTPException(403, 'Invalid or expired token!')
+        token_cache.set(token, payload, ttl=payload['exp'] - time.time())
+
+    username = await session_store.touch(payload['user_id'])
+    if not username:
+        raise HTTPException(401, 'Session expired, please log in again.')
+    return payload['user_id'], username
+
+
+async def read_credentials(request):
+    try:
+        data = await request.json()
+    except ValueError:
+        data = None
+    if not isinstance(data, dict) or not data.get('username') or not data.get('password'):
+        raise HTTPException(400, 'Username and password are required!')
+    return data['username'], data['password']
+
+
+@app.post('/register')
+async def register(request: Request):
+    """
+    Endpoint to register a new user; see `app.register`.
+
+    Returns:
+        - 400: Username and password missing or user already exists.
+        - 503: The password hashing pool is saturated; retry later.
+        - 201: The user was created; the response carries a token for a new session.
+    """
+
+    username, password = await read_credentials(request)
+    users_collection = async_configuration.get_users_collection()
+    if await users_collection.find_one({'username': username}, {'_id': 1}):
+        return json_response({'message': 'User already exists!'}, 400)
+
+    try:
+        hashed_password = await password_hasher.hash_password_async(password)
+    except (HashingPoolSaturated, asyncio.TimeoutError):
+        return json_response({'message': 'Server busy, please retry.'}, 503)
+
+    user_id = str((await users_collection.insert_one({'username': username, 'password': hashed_password})).inserted_id)
+    await session_store.create(user_id, username)
+    return json_response({'message': 'User registered successfully!', 'token': helper.generate_token(user_id, secret_key)}, 201)
+
+
+@app.post('/login')
+async def login(request: Request):
+    """
+    Endpoint to log in an existing user; see `app.login`.
+
+    Returns:
+        - 400/401: Invalid credentials or missing fields.
+        - 503: The password hashing pool is saturated; retry later.
+        - 200: Login successful, with a token.
+    """
+
+    username, password = await read_credentials(request)
+    users_collection = async_configuration.get_users_collection()
+    user = await users_collection.find_one({'username': username})
+    if not user:
+        return json_response({'message': 'Invalid credentials!'}, 401)
+
+    try:
+        if not await password_hasher.check_password_async(user['password'], password):
+            return json_response({'message': 'Invalid credentials!'}, 401)
+    except (HashingPoolSaturated, asyncio.TimeoutError):
+        return json_response({'message': 'Server busy, please retry.'}, 503)
+
+    if password_hasher.needs_rehash(user['password']):
+        loop = asyncio.get_running_loop()
+        password_hasher.rehash_in_background(
+            password,
+            lambda new_hash: asyncio.run_coroutine_threadsafe(
+                users_collection.update_one({'_id': user['_id']}, {'$set': {'password': new_hash}}), loop
+            )
+        )
+
+    user_id = str(user['_id'])
+    await session_store.create(user_id, username)
+    return json_response({'message': 'Login successful!', 'token': helper.generate_token(user_id, secret_key)}, 200)
+
+
+@app.post('/logout')
+async def logout(user=Depends(current_user)):
+    """
+    Endpoint to log out the current user; the revocation is published so Flask processes drop their cached session too.
+    """
+
+    await session_store.revoke(user[0])
+    return json_response({'message': 'Logged out successfully!'}, 200)
+
+
+@app.post('/upload')
+async def upload_file(request: Request, user=Depends(current_user)):
+    """
+    Endpoint to handle file uploads; see `app.upload_file`.
+
+    **Process**:
+    - Starlette parses the multipart body into a temporary file; it is then streamed to the spool on a worker
+      thread, so the event loop never blocks on disk I/O.
+
+    Returns:
+        - 403/401: If the token or the session is invalid.
+        - 400: If the file is missing, invalid, or exceeds the size limit.
+        - 200: If an identical file was already uploaded; its `file_id` is returned.
+        - 202: If the file is successfully queued for processing.
+        - 503: If the message broker rejected the file or could not be reached; retry the request.
+    """
+
+    too_large = f'File size exceeds the maximum allowed limit of 10GB ({max_content_length / (1024 * 1024 * 1024)}GB).'
+    if int(request.headers.get('content-length') or 0) > max_content_length:
+        return json_response({'message': too_large}, 400)
+
+    form = await request.form()
+    file = form.get('file')
+    if not isinstance(file, UploadFile):
+        return json_response({'message': 'No file part'}, 400)
+    if not file.filename:
+        return json_response({'message': 'No selected file'}, 400)
+    if not helper.allowed_file(file.filename, allowed_extensions):
+        return json_response({'message': 'Invalid file format. Only CSV and XLSX files are allowed.'}, 400)
+
+    file_id = str(uuid.uuid4())
+    extension = file.filename.rsplit('.', 1)[1].lower()
+    try:
+        descriptor = await run_in_threadpool(blob_store.save_stream, file_id, file.file, extension, max_content_length)
+    except FileTooLargeError:
+        return json_response({'message': too_large}, 400)
+    finally:
+        await form.close()
+
+    payload, status = await run_in_threadpool(upload_queue.enqueue, descriptor)
+    return json_response(payload, status)
+
+
+@app.get('/progress/{file_id}')
+async def check_progress(file_id: str, user=Depends(current_user)):
+    """
+    Endpoint to check the progress of a file; see `app.check_progress`.
+    """
+
+    progress = await async_configuration.get_redis_connection().get(progress_channels.progress_key(file_id))
+    if not progress:
+        return json_response({'error': 'File not being processed'}, 404)
+    return json_response({'progress': float(progress)})
+
+
+@app.get('/progress/{file_id}/stream')
+async def stream_progress(file_id: str, user=Depends(current_user)):
+    """
+    Endpoint streaming the progress of a file as Server-Sent Events; see `app.stream_progress`.
+
+    Each open stream holds a pub/sub subscription but no thread, so idle dashboards cost almost nothing.
+    """
+
+    redis_conn = async_configuration.get_redis_connection()
+    pubsub = redis_conn.pubsub(ignore_subscribe_messages=True)
+    await pubsub.subscribe(progress_channels.progress_channel(file_id))
+
+    pipeline = redis_conn.pipeline(transaction=False)
+    pipeline.get(progress_channels.progress_key(file_id))
+    pipeline.hgetall(progress_channels.details_key(file_id))
+    progress, details = await pipeline.execute()
+    if progress is None:
+        await pubsub.aclose()
+        return json_response({'error': 'File not being processed'}, 404)
+
+    snapshot = progress_channels.snapshot(file_id, progress, details)
+
+    async def events():
+        try:
+            yield progress_channels.progress_event(snapshot)
+            if progress_channels.is_final(snapshot):
+                return
+            while True:
+                message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=sse_heartbeat_seconds)
+                if message is None:
+                    yield progress_channels.KEEP_ALIVE_EVENT
+                    continue
+                update = json.loads(message['data'])
+                yield progress_channels.progress_event(update)
+                if progress_channels.is_final(update):
+                    return
+        finally:
+            await pubsub.aclose()
+
+    return StreamingResponse(events(), media_type='text/event-stream', headers=progress_channels.SSE_HEADERS)
+
+
+count_fill = {}  # Background refresh started when the count is missing, so only one runs at a time
+
+
+async def refresh_movie_count():
+    collection = async_configuration.get_movies_collection()
+    total = await collection.estimated_document_count() if count_estimated else await collection.count_documents({})
+    await async_configuration.get_redis_connection().set(MOVIES_COUNT_KEY, total)
+    return total
+
+
+async def movie_count():
+    """
+    Returns the cached movie count (see `helper.count_cache`). While it is not cached, the estimated count is
+    returned and a single background refresh restores the exact value.
+    """
+    total = await async_configuration.get_redis_connection().get(MOVIES_COUNT_KEY)
+    if total is None:
+        if 'fill' not in count_fill or count_fill['fill'].done():
+            count_fill['fill'] = asyncio.create_task(refresh_movie_count())
+            count_fill['fill'].add_done_callback(lambda task: task.cancelled() or not task.exception() or log.error(f"Failed to refresh the movie count: {task.exception()}"))
+        return await async_configuration.get_movies_collection().estimated_document_count()
+    return int(total)
+
+
+async def fetch_movies_page(listing):
+    """
+    Queries one page of movies and serializes the response body; see `app.fetch_movies_page`.
+
+    The count and the page fetch do not depend on each other, so they run concurrently.
+    """
+
+    movies_cursor = find_page(async_configuration.get_movies_collection(), listing)
+    total_movies, movies = await asyncio.gather(movie_count(), movies_cursor.to_list(listing['per_page'] + 1))
+    return page_response(listing, movies, total_movies)
+
+
+@app.get('/movies')
+async def list_movies(request: Request, user=Depends(current_user)):
+    """
+    Endpoint to fetch a paginated and sortable list of movies/shows; see `app.list_movies` for the parameters.
+
+    Responses are cached under the same keys as the Flask app, so both serve from one cache.
+
+    Returns:
+        - 403: If token is missing or invalid.
+        - 400: If a parameter or the cursor is invalid.
+        - 200: Paginated list of movies/shows, with `next_cursor` set when more results follow.
+    """
+
+    try:
+        listing = parse_listing(request.query_params, max_per_page)
+    except ValueError as e:
+        return json_response({'message': str(e)}, 400)
+
+    status, body = await movies_response_cache.get_or_compute(
+        'movies',
+        listing_cache_key(listing),
+        lambda: fetch_movies_page(listing)
+    )
+    return Response(body, status_code=status, media_type='application/json')
+
+
+@app.get('/healthz')
+async def liveness():
+    """
+    Liveness probe; touches no dependency, like the Flask app's.
+    """
+    return json_response({'status': 'alive'})
+
+
+async def timed_check(check):
+    started_at = time.monotonic()
+    try:
+        await asyncio.wait_for(check(), readiness_timeout)
+        result = {'status': 'ok'}
+    except asyncio.TimeoutError:
+        result = {'status': 'timeout'}
+    except Exception as e:
+        result = {'status': 'error', 'error': f"{type(e).__name__}: {e}"}
+    result['seconds'] = round(time.monotonic() - started_at, 3)
+    return result
+
+
+async def publisher_ready():
+    publisher = rabbitmq_configuration.get_publisher()
+    # The first probe starts the publisher; it may connect within the probe's deadline
+    if not await run_in_threadpool(publisher.wait_ready, readiness_timeout):
+        raise ConnectionError('Publisher is not connected to RabbitMQ.')
+
+
+@app.get('/readyz')
+async def readiness():
+    """
+    Readiness probe: pings MongoDB and Redis through the asyncio clients and checks the publisher, concurrently
+    and within `READINESS_TIMEOUT` seconds. Answers 503 with the failing checks when not ready.
+    """
+    names = ('mongodb', 'redis', 'rabbitmq')
+    results = await asyncio.gather(
+        timed_check(lambda: async_configuration.get_mongo_client().admin.command('ping')),
+        timed_check(lambda: async_configuration.get_redis_connection().ping()),
+        timed_check(publisher_ready)
+    )
+    checks = dict(zip(names, results))
+    ready = all(result['status'] == 'ok' for result in checks.values())
+    return json_response({'status': 'ready' if ready else 'not ready', 'checks': checks}, 200 if ready else 503)
+
+
+if __name__ == '__main__':
+    import uvicorn
+    uvicorn.run('asgi_app:app', host='0.0.0.0', port=int(os.getenv('ASGI_PORT', 8000)))
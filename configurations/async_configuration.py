@@ -0,0 +1,63 @@
+from pymongo import AsyncMongoClient
+import redis.asyncio as aioredis
+from dotenv import load_dotenv
+import os
+
+
+dot_env_path=os.path.join(os.path.dirname(os.path.dirname(__file__)), '.env')
+load_dotenv(dot_env_path)
+mongo_uri=os.getenv('MONGO_URI')
+redis_host=os.getenv('REDIS_HOST')
+redis_port=os.getenv('REDIS_PORT')
+
+# Pool sizes shared by every request of an ASGI process
+mongo_max_pool_size=int(os.getenv('ASYNC_MONGO_POOL_SIZE', 100))
+redis_max_connections=int(os.getenv('ASYNC_REDIS_POOL_SIZE', 200))
+
+_clients = {}
+
+
+def get_mongo_client():
+    """
+    Returns the process-wide asyncio MongoDB client, creating it on first use.
+
+    **Purpose**:
+    - `AsyncMongoClient` binds to the running event loop, so it is created lazily from the ASGI app's lifespan
+      rather than at import time.
+    """
+    if 'mongo' not in _clients:
+        _clients['mongo'] = AsyncMongoClient(mongo_uri, maxPoolSize=mongo_max_pool_size)
+    return _clients['mongo']
+
+
+def get_redis_connection():
+    """
+    Returns the process-wide asyncio Redis client, backed by a shared connection pool.
+    """
+    if 'redis' not in _clients:
+        _clients['redis'] = aioredis.Redis(host=redis_host, port=redis_port, db=0, max_connections=redis_max_connections)
+    return _clients['redis']
+
+
+def get_movies_collection():
+    """
+    Retrieves the movies collection through the asyncio client.
+    """
+    return get_mongo_client()["imdb"]['movies']
+
+
+def get_users_collection():
+    """
+    Retrieves the users collection through the asyncio client.
+    """
+    return get_mongo_client()["imdb"]['users']
+
+
+async def close():
+    """
+    Closes the asyncio clients and their pools (called when the ASGI app shuts down).
+    """
+    if 'mongo' in _clients:
+        await _clients.pop('mongo').close()
+    if 'redis' in _clients:
+        await _clients.pop('redis').aclose()
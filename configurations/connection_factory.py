@@ -0,0 +1,99 @@
+import os
+import threading
+import sys
+sys.path.append("..")
+from logger import logger
+
+log=logger.get_logger("connection_factory")
+
+_connections = []
+
+
+class LazyConnection:
+    """
+    Holds a client that is only created when it is first used, and created again in forked children.
+
+    **Purpose**:
+    - Importing the app or a configuration module performs no network I/O, so processes start fast and the
+      test suite can import the app without live services.
+    - Pre-fork servers (e.g. gunicorn) import the app in the master and fork workers. Clients are never
+      inherited: every worker builds its own pool on first use (fork is detected both through
+      `os.register_at_fork` and by comparing process IDs).
+    - Attribute access is forwarded to the client, so a `LazyConnection` can be passed wherever the client
+      itself was passed before.
+
+    **Parameters**:
+    - `name` (str): Name used in logs and health checks.
+    - `factory` (callable): Creates the client.
+    - `close` (callable): Optional `close(client)`, used by `close()`.
+    """
+
+    def __init__(self, name, factory, close=None):
+        self.name = name
+        self.factory = factory
+        self._close = close
+        self._client = None
+        self._pid = None
+        self._lock = threading.Lock()
+        _connections.append(self)
+
+    def get(self):
+        """
+        Returns the client of the current process, creating it on first use.
+        """
+        client, pid = self._client, self._pid
+        if client is not None and pid == os.getpid():
+            return client
+        with self._lock:
+            if self._client is None or self._pid != os.getpid():
+                self._client = self.factory()
+                self._pid = os.getpid()
+                log.info(f"Created {self.name} client in process {self._pid}.")
+            return self._client
+
+    @property
+    def created(self):
+        """
+        Tells whether the client of the current process exists.
+        """
+        return self._client is not None and self._pid == os.getpid()
+
+    def reset(self):
+        """
+        Forgets the client without closing it; used in forked children, whose inherited sockets belong to the parent.
+        """
+        self._client = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def close(self):
+        """
+        Closes the client of the current process, if it was created.
+        """
+        if self.created and self._close:
+            self._close(self._client)
+        self._client = None
+        self._pid = None
+
+    def __getattr__(self, name):
+        return getattr(self.get(), name)
+
+
+def reset_after_fork():
+    """
+    Drops every client inherited from the parent process.
+    """
+    for connection in _connections:
+        connection.reset()
+
+
+def close_all():
+    """
+    Closes every client created by this process.
+    """
+    for connection in _connections:
+        connection.close()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=reset_after_fork)
@@ -1,13 +1,29 @@
 from pymongo import MongoClient
 from dotenv import load_dotenv
 import os
+import sys
+sys.path.append("..")
+from configurations.connection_factory import LazyConnection
 
 
 dot_env_path=os.path.join(os.path.dirname(os.path.dirname(__file__)), '.env')
 load_dotenv(dot_env_path)
 mongo_uri=os.getenv('MONGO_URI')
-mongo_client = MongoClient(mongo_uri)
-db=mongo_client["imdb"]
+server_selection_timeout_ms=int(os.getenv('MONGO_SERVER_SELECTION_TIMEOUT_MS', 30000))
+
+# Created on first use, and again in forked workers: MongoClient is not fork-safe
+mongo_client = LazyConnection(
+    'mongodb',
+    lambda: MongoClient(mongo_uri, serverSelectionTimeoutMS=server_selection_timeout_ms),
+    close=lambda client: client.close()
+)
+
+
+def get_database():
+    """
+    Retrieves the `imdb` database, creating the MongoDB client on first use.
+    """
+    return mongo_client.get()["imdb"]
 
 def get_movies_collection():
     """
@@ -19,7 +35,7 @@ def get_movies_collection():
     **Returns**:
     - `Collection`: A reference to the `movies` collection in the MongoDB database.
     """
-    return db['movies']
+    return get_database()['movies']
 
 
 def get_users_collection():
@@ -32,4 +48,4 @@ def get_users_collection():
     **Returns**:
     - `Collection`: A reference to the `users` collection in the MongoDB database.
     """
-    return db['users']
\ No newline at end of file
+    return get_database()['users']
@@ -0,0 +1,212 @@
+import argparse
+from pymongo import ASCENDING, DESCENDING, TEXT, IndexModel
+from pymongo.errors import OperationFailure
+import sys
+sys.path.append("..")
+from configurations import database_configuration
+from logger import logger
+
+log=logger.get_logger("index_configuration")
+
+SORT_FIELDS = ['date_added', 'release_year', 'duration']
+
+# Declared indexes per collection. `(field, _id)` compound indexes back the `/movies` sorts and the keyset
+# cursor: MongoDB can walk an index backwards, so one ascending index also serves the descending shape.
+INDEXES = {
+    'movies': [
+        *[
+            {'name': f'{field}_id', 'keys': [(field, ASCENDING), ('_id', ASCENDING)]}
+            for field in SORT_FIELDS
+        ],
+        {
+            'name': 'show_id_unique',
+            'keys': [('show_id', ASCENDING)],
+            'unique': True,
+            'partialFilterExpression': {'show_id': {'$type': 'string'}}
+        },
+        # /movies/search: full-text index, multikey indexes on the array fields and the equality filters
+        {
+            'name': 'search_text',
+            'keys': [('title', TEXT), ('description', TEXT), ('cast', TEXT), ('director', TEXT)],
+            'weights': {'title': 10, 'director': 5, 'cast': 3, 'description': 1},
+            'default_language': 'english'
+        },
+        {'name': 'cast_year', 'keys': [('cast', ASCENDING), ('release_year', ASCENDING)]},
+        {'name': 'listed_in_year', 'keys': [('listed_in', ASCENDING), ('release_year', ASCENDING)]},
+        {'name': 'country_year', 'keys': [('country', ASCENDING), ('release_year', ASCENDING)]},
+        {'name': 'director_year', 'keys': [('director', ASCENDING), ('release_year', ASCENDING)]},
+        {'name': 'title_year', 'keys': [('title', ASCENDING), ('release_year', ASCENDING)]},
+        {'name': 'type_rating_year', 'keys': [('type', ASCENDING), ('rating', ASCENDING), ('release_year', ASCENDING)]},
+        {'name': 'rating_year', 'keys': [('rating', ASCENDING), ('release_year', ASCENDING)]}
+    ],
+    'users': [
+        {'name': 'username_unique', 'keys': [('username', ASCENDING)], 'unique': True}
+    ]
+}
+
+# Query shapes issued by the API, used to report index coverage.
+QUERY_SHAPES = [
+    {
+        'name': f'/movies sort_by={field} order={order}',
+        'collection': 'movies',
+        'keys': [(field, direction), ('_id', direction)]
+    }
+    for field in SORT_FIELDS
+    for order, direction in (('asc', ASCENDING), ('desc', DESCENDING))
+] + [
+    {'name': '/movies upsert by show_id', 'collection': 'movies', 'keys': [('show_id', ASCENDING)]},
+    {'name': '/movies/search q=', 'collection': 'movies', 'keys': [('_fts', 'text')]},
+    *[
+        {'name': f'/movies/search {field}=', 'collection': 'movies', 'keys': [(field, ASCENDING)]}
+        for field in ('cast', 'listed_in', 'country', 'director', 'title', 'type', 'rating')
+    ],
+    {'name': '/login by username', 'collection': 'users', 'keys': [('username', ASCENDING)]}
+]
+
+INDEX_OPTIONS = ('unique', 'partialFilterExpression', 'sparse', 'weights', 'default_language')
+
+
+def get_collection(name):
+    """
+    Returns the MongoDB collection an index declaration refers to.
+    """
+    return database_configuration.get_database()[name]
+
+def index_options(index):
+    """
+    Returns the creation options of a declared index (everything except its name and keys).
+    """
+    return {key: value for key, value in index.items() if key in INDEX_OPTIONS}
+
+def stored_keys(index):
+    """
+    Returns the keys `index_information()` reports for a declared index. MongoDB stores the fields of a text
+    index as `_fts`/`_ftsx` (the fields themselves only appear in its `weights`).
+    """
+    keys = []
+    for field, direction in index['keys']:
+        if direction != TEXT:
+            keys.append((field, direction))
+        elif ('_fts', TEXT) not in keys:
+            keys += [('_fts', TEXT), ('_ftsx', 1)]
+    return keys
+
+def stored_options(index):
+    """
+    Returns the options `index_information()` reports for a declared index: text fields without a declared
+    weight are stored with weight 1.
+    """
+    options = index_options(index)
+    text_fields = [field for field, direction in index['keys'] if direction == TEXT]
+    if text_fields:
+        options['weights'] = {**{field: 1 for field in text_fields}, **options.get('weights', {})}
+    return options
+
+def matches(existing, index):
+    """
+    Tells whether an index reported by `index_information()` matches a declaration.
+    """
+    if [tuple(key) for key in existing['key']] != stored_keys(index):
+        return False
+    return all(existing.get(key) == value for key, value in stored_options(index).items())
+
+def reconcile_indexes(prune=False):
+    """
+    Makes the indexes in MongoDB match the declarations in `INDEXES`.
+
+    **Purpose**:
+    - Index builds are a deploy-time concern; running this once per deploy replaces the `create_index`
+      calls that used to run on every consumer start.
+
+    **Process**:
+    1. Creates declared indexes that are missing.
+    2. Drops and recreates declared indexes whose keys or options changed.
+    3. With `prune=True`, drops indexes that are not declared (the `_id_` index is always kept).
+
+    Every index is built on its own, so one that cannot be built (e.g. `show_id_unique` on a collection that still
+    holds duplicate `show_id`s; see `python -m consumer.backfill --dedupe`) never blocks the others.
+
+    **Returns**:
+    - `(changes, failures)`: Human-readable description of every change made, and of every index that could not
+      be built.
+    """
+
+    changes, failures = [], []
+    for collection_name, indexes in INDEXES.items():
+        collection = get_collection(collection_name)
+        existing_indexes = collection.index_information()
+
+        for index in indexes:
+            existing = existing_indexes.get(index['name'])
+            if existing and matches(existing, index):
+                continue
+            if existing:
+                collection.drop_index(index['name'])
+                changes.append(f"{collection_name}: dropped outdated index {index['name']}")
+            try:
+                collection.create_indexes([IndexModel(index['keys'], name=index['name'], **index_options(index))])
+            except OperationFailure as e:
+                hint = ' (duplicate keys: run python -m consumer.backfill --dedupe first)' if e.code == 11000 else ''
+                failures.append(f"{collection_name}: could not create index {index['name']}{hint}: {e}")
+                continue
+            changes.append(f"{collection_name}: created index {index['name']}")
+
+        if prune:
+            declared = {index['name'] for index in indexes} | {'_id_'}
+            for name in existing_indexes:
+                if name not in declared:
+                    collection.drop_index(name)
+                    changes.append(f"{collection_name}: dropped undeclared index {name}")
+
+    return changes, failures
+
+def coverage_report():
+    """
+    Reports which API query shapes are served by an existing index.
+
+    A shape is covered when an index starts with the shape's keys, either in the same directions or all reversed.
+
+    **Returns**:
+    - `report` (list): `{'query_shape', 'collection', 'index'}` entries; `index` is `None` for uncovered shapes.
+    """
+
+    report = []
+    index_cache = {}
+    for shape in QUERY_SHAPES:
+        collection_name = shape['collection']
+        if collection_name not in index_cache:
+            index_cache[collection_name] = get_collection(collection_name).index_information()
+
+        keys = [tuple(key) for key in shape['keys']]
+        reversed_keys = [(field, -direction if isinstance(direction, (int, float)) else direction) for field, direction in keys]
+        covering_index = None
+        for name, info in index_cache[collection_name].items():
+            prefix = [(field, direction) for field, direction in info['key']][:len(keys)]
+            if prefix == keys or prefix == reversed_keys:
+                covering_index = name
+                break
+
+        report.append({'query_shape': shape['name'], 'collection': collection_name, 'index': covering_index})
+    return report
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Reconcile MongoDB indexes with the declared index set.')
+    parser.add_argument('--prune', action='store_true', help='Drop indexes that are not declared.')
+    parser.add_argument('--report', action='store_true', help='Only print the query shape coverage report.')
+    args = parser.parse_args()
+
+    failures = []
+    if not args.report:
+        changes, failures = reconcile_indexes(prune=args.prune)
+        for change in changes or ['Indexes already up to date.']:
+            log.info(change)
+        for failure in failures:
+            log.error(failure)
+
+    for entry in coverage_report():
+        status = f"covered by {entry['index']}" if entry['index'] else 'NOT COVERED'
+        log.info(f"{entry['query_shape']}: {status}")
+
+    if failures:
+        sys.exit(1)
@@ -0,0 +1,39 @@
+import pika
+from dotenv import load_dotenv
+import os
+import sys
+sys.path.append("..")
+from helper.publisher import Publisher
+
+
+dot_env_path=os.path.join(os.path.dirname(os.path.dirname(__file__)), '.env')
+load_dotenv(dot_env_path)
+
+rabbitmq_host=os.getenv('RABBITMQ_HOST')
+rabbitmq_heartbeat=int(os.getenv('RABBITMQ_HEARTBEAT', 60))
+file_processing_queue=os.getenv('FILE_PROCESSING_QUEUE', 'file_processing_queue')
+
+_publisher = {}
+
+
+def get_connection_parameters():
+    """
+    Returns the RabbitMQ connection settings shared by the web tier and the consumers.
+    """
+    return pika.ConnectionParameters(host=rabbitmq_host, heartbeat=rabbitmq_heartbeat)
+
+
+def get_publisher():
+    """
+    Retrieves the process-wide publisher of the file processing queue.
+
+    **Purpose**:
+    - Every web thread (or ASGI worker thread) publishes through the same `Publisher`, whose I/O thread is
+      started on the first publish rather than at import time.
+
+    **Returns**:
+    - `Publisher`: Thread-safe publisher with confirms on the durable `FILE_PROCESSING_QUEUE`.
+    """
+    if 'publisher' not in _publisher:
+        _publisher['publisher'] = Publisher(get_connection_parameters(), file_processing_queue)
+    return _publisher['publisher']
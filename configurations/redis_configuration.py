@@ -1,30 +1,35 @@
 import redis
+from redis.commands.core import Script
 import os
 from dotenv import load_dotenv
 import sys
 sys.path.append("..")
-from logger import logger
+from configurations.connection_factory import LazyConnection
 
-log=logger.get_logger("redis_configuration")
 dot_env_path=os.path.join(os.path.dirname(os.path.dirname(__file__)), '.env')
 load_dotenv(dot_env_path)
 
 
 redis_host=os.getenv('REDIS_HOST')
 redis_port=os.getenv('REDIS_PORT')
+redis_timeout=float(os.getenv('REDIS_SOCKET_TIMEOUT', 5))
 
 
-try:
-    # Connect to the Redis server
-    redis_conn = redis.Redis(host=redis_host, port=redis_port, db=0)
-    
-    # Check the connection
-    if redis_conn.ping():
-        log.info("Connected to Redis!")
-    
-except redis.ConnectionError as e:
-    log.error(f"Redis connection error: {e}")
-    sys.exit(0)
+class LazyRedis(LazyConnection):
+    """
+    Lazy Redis client. Scripts are registered against the lazy client itself, so they keep working with the
+    client recreated after a fork.
+    """
+
+    def register_script(self, script):
+        return Script(self, script.encode('utf-8') if isinstance(script, str) else script)
+
+
+redis_conn = LazyRedis(
+    'redis',
+    lambda: redis.Redis(host=redis_host, port=redis_port, db=0, socket_connect_timeout=redis_timeout),
+    close=lambda client: client.close()
+)
 
 
 def get_redis_connection():
@@ -33,13 +38,9 @@ def get_redis_connection():
 
     **Purpose**:
     - Provides a centralized way to access the Redis connection instance, which is used for caching, session management, and other high-speed data storage tasks.
+    - The client and its pool are created on first use (and again after a fork); no connection is made at import time.
 
     **Returns**:
-    - `Redis`: The Redis connection object.
+    - `Redis`: The Redis connection object (a `LazyConnection` forwarding to it).
     """
     return redis_conn
-
-
-
-
-
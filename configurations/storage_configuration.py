@@ -0,0 +1,33 @@
+import os
+from dotenv import load_dotenv
+import sys
+sys.path.append("..")
+from helper.blob_store import LocalBlobStore
+
+
+dot_env_path=os.path.join(os.path.dirname(os.path.dirname(__file__)), '.env')
+load_dotenv(dot_env_path)
+
+# Relative spool paths are resolved against the project root so the web tier and the consumers agree on them
+spool_folder=os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), os.getenv('SPOOL_FOLDER', 'spool_uploads'))
+blob_store_backend=os.getenv('BLOB_STORE', 'local')
+
+BLOB_STORES = {
+    'local': LocalBlobStore
+}
+
+blob_store = BLOB_STORES[blob_store_backend](spool_folder)
+
+
+def get_blob_store():
+    """
+    Retrieves the blob store used to spool uploaded files.
+
+    **Purpose**:
+    - Provides a single place where the web tier and the consumers agree on where uploads are stored.
+    - The backend is selected with the `BLOB_STORE` environment variable; new backends only need to be registered in `BLOB_STORES`.
+
+    **Returns**:
+    - `LocalBlobStore`: The configured blob store instance.
+    """
+    return blob_store
@@ -0,0 +1,119 @@
+import argparse
+import sys
+sys.path.append("..")
+from pymongo import UpdateOne
+from logger import logger
+from consumer import normalizer
+from consumer.batch_writer import content_hash
+from consumer.ingestion import redis_conn, get_movies_collection
+from helper.response_cache import bump_generation
+from helper.count_cache import MOVIES_COUNT_KEY
+
+log=logger.get_logger("backfill")
+
+# Groups the documents sharing a `show_id`, keeping their `_id`s in insertion order
+DUPLICATES_PIPELINE = [
+    {'$match': {'show_id': {'$type': 'string'}}},
+    {'$sort': {'_id': 1}},
+    {'$group': {'_id': '$show_id', 'ids': {'$push': '$_id'}, 'count': {'$sum': 1}}},
+    {'$match': {'count': {'$gt': 1}}}
+]
+
+# Fields `normalizer.normalize_document` types; a document still holding a string in any of them predates it.
+# `$type` in `$expr` reports the field's own type, so arrays of strings are not mistaken for raw strings.
+TYPED_FIELDS = ('release_year', 'duration', 'date_added', *normalizer.LIST_FIELDS)
+UNTYPED_FILTER = {'$expr': {'$or': [{'$eq': [{'$type': f'${field}'}, 'string']} for field in TYPED_FIELDS]}}
+
+
+def typed_fields(document):
+    """
+    Returns the fields of a normalized document to `$set`, with its `content_hash` (so re-ingesting the same rows
+    afterwards skips them as unchanged).
+    """
+    document['content_hash'] = content_hash(document, 'content_hash')
+    return {key: value for key, value in document.items() if key != '_id'}
+
+
+def typed_updates(documents):
+    """
+    Normalizes stored documents and returns the `UpdateOne` operations writing their typed fields.
+    """
+    return [UpdateOne({'_id': document['_id']}, {'$set': typed_fields(document)}) for document in normalizer.normalize_batch(documents)]
+
+
+def backfill(batch_size=1000):
+    """
+    Types the documents written before ingestion normalized them.
+
+    **Purpose**:
+    - Sorting and keyset pagination on `duration`, `date_added` and `release_year` need one BSON type per field:
+      MongoDB orders strings after numbers and before dates, so a cursor stops at the type boundary when old
+      string values remain.
+    - Runs once per deploy that introduces typed fields; documents already typed are not matched, so it can be
+      re-run or interrupted safely.
+
+    **Process**:
+    - Walks the untyped documents in `_id` order, `batch_size` at a time, normalizes them with the same code as
+      ingestion and writes them back with one unordered bulk write per batch.
+    - Invalidates the cached `/movies` responses when done.
+
+    **Returns**:
+    - `updated` (int): Number of documents typed.
+    """
+    collection = get_movies_collection()
+    updated = 0
+    last_id = None
+    while True:
+        query = UNTYPED_FILTER if last_id is None else {'$and': [UNTYPED_FILTER, {'_id': {'$gt': last_id}}]}
+        documents = list(collection.find(query).sort('_id', 1).limit(batch_size))
+        if not documents:
+            break
+        last_id = documents[-1]['_id']
+        updated += collection.bulk_write(typed_updates(documents), ordered=False).modified_count
+        log.info(f"Typed {updated} documents so far.")
+
+    if updated:
+        bump_generation(redis_conn)
+    return updated
+
+
+def dedupe(batch_size=1000):
+    """
+    Removes duplicate `show_id` rows, keeping the most recently inserted one of each.
+
+    **Purpose**:
+    - Ingestion used to insert every row of every upload (and of every redelivery), so databases populated
+      before rows were upserted on `show_id` hold duplicates, and the `show_id_unique` index cannot be built
+      until they are removed. Run it before `python -m configurations.index_configuration`.
+
+    **Returns**:
+    - `removed` (int): Number of documents removed.
+    """
+    collection = get_movies_collection()
+    removed = 0
+    stale_ids = []
+    for group in collection.aggregate(DUPLICATES_PIPELINE, allowDiskUse=True):
+        stale_ids.extend(group['ids'][:-1])
+        if len(stale_ids) >= batch_size:
+            removed += collection.delete_many({'_id': {'$in': stale_ids}}).deleted_count
+            stale_ids = []
+            log.info(f"Removed {removed} duplicate documents so far.")
+    if stale_ids:
+        removed += collection.delete_many({'_id': {'$in': stale_ids}}).deleted_count
+
+    if removed:
+        redis_conn.delete(MOVIES_COUNT_KEY)  # Recounted by the web tier
+        bump_generation(redis_conn)
+    return removed
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Convert movie documents stored with raw string fields to their typed form.')
+    parser.add_argument('--batch-size', type=int, default=1000, help='Documents read and written per round trip.')
+    parser.add_argument('--dedupe', action='store_true', help='Only remove duplicate show_id rows (needed before the unique show_id index can be built).')
+    args = parser.parse_args()
+
+    if args.dedupe:
+        log.info(f"Dedupe finished: {dedupe(args.batch_size)} duplicate documents removed.")
+    else:
+        log.info(f"Backfill finished: {backfill(args.batch_size)} documents typed.")
@@ -0,0 +1,171 @@
+import hashlib
+import json
+from pymongo import InsertOne, ReplaceOne
+from pymongo.errors import BulkWriteError
+
+
+DEFAULT_BATCH_SIZE = 1000
+DEFAULT_BATCH_BYTES = 8 * 1024 * 1024  # 8 MB
+
+
+def estimate_document_size(document):
+    """
+    Cheap upper-bound-ish estimate of a document's encoded size, used for the batch byte budget.
+    """
+    return sum(len(key) + len(str(value)) + 8 for key, value in document.items())
+
+
+def content_hash(document, hash_field):
+    """
+    Returns a BLAKE2b digest of a document's content, ignoring `_id` and the hash field itself.
+    """
+    content = {key: value for key, value in document.items() if key not in ('_id', hash_field)}
+    encoded = json.dumps(content, sort_keys=True, default=str, separators=(',', ':')).encode('utf-8')
+    return hashlib.blake2b(encoded, digest_size=16).hexdigest()
+
+
+class BatchWriter:
+    """
+    Buffers parsed rows and writes them to MongoDB with unordered bulk writes.
+
+    **Purpose**:
+    - Replaces one `insert_one` round trip per row with one round trip per batch.
+    - Keeps ingesting when individual rows fail: failed rows of a batch are recorded and the file carries on.
+    - When `key_field` is set, documents carrying that field are upserted on it (`ReplaceOne(..., upsert=True)`),
+      so re-ingesting the same rows (e.g. after a redelivery) never creates duplicates.
+    - When `hash_field` is also set, every document stores a digest of its content in that field, and documents
+      whose stored digest is unchanged are dropped from the batch before writing: re-ingesting a catalog only
+      writes the rows that changed.
+
+    **Parameters**:
+    - `collection` (Collection): Target MongoDB collection.
+    - `batch_size` (int): Maximum number of documents per batch.
+    - `max_batch_bytes` (int): Approximate byte budget per batch; the batch is flushed when it is reached.
+    - `key_field` (str): Field documents are upserted on; `None` inserts every document.
+    - `hash_field` (str): Field holding the content digest used to skip unchanged documents (requires `key_field`).
+    - `transform` (callable): Optional function applied to every batch right before it is written,
+      e.g. to normalize raw rows into typed documents.
+    - `on_flush` (callable): Called as `on_flush(writer, failed_rows)` after every flush, where `failed_rows`
+      holds `{'index', 'error', 'document'}` entries for the rows of that batch that could not be written.
+    """
+
+    def __init__(self, collection, batch_size=DEFAULT_BATCH_SIZE, max_batch_bytes=DEFAULT_BATCH_BYTES, on_flush=None, transform=None, key_field=None, hash_field=None):
+        self.collection = collection
+        self.key_field = key_field
+        self.hash_field = hash_field if key_field else None
+        self.batch_size = batch_size
+        self.max_batch_bytes = max_batch_bytes
+        self.on_flush = on_flush
+        self.transform = transform
+        self.buffer = []
+        self.buffer_bytes = 0
+        self.rows_written = 0
+        self.rows_failed = 0
+        self.rows_unchanged = 0
+        self.batches_flushed = 0
+        self.last_batch_inserted = 0
+        self.last_batch = []
+
+    def add(self, document):
+        """
+        Adds a document to the current batch, flushing when the size or byte budget is reached.
+        """
+        self.buffer.append(document)
+        self.buffer_bytes += estimate_document_size(document)
+        if len(self.buffer) >= self.batch_size or self.buffer_bytes >= self.max_batch_bytes:
+            self.flush()
+
+    def flush(self):
+        """
+        Writes the buffered documents with a single unordered `bulk_write` (or `insert_many` without a `key_field`).
+
+        `rows_written` counts inserted, upserted, replaced and unchanged (skipped) documents, `rows_unchanged` only
+        the skipped ones; `last_batch_inserted` counts the documents the batch added to the collection, and
+        `last_batch` holds the documents actually written.
+
+        Per-row failures reported in a `BulkWriteError` are recorded and do not abort the file;
+        any other error (e.g. a lost connection) is propagated to the caller.
+        """
+        if not self.buffer:
+            return
+
+        batch = self.buffer
+        self.buffer = []
+        self.buffer_bytes = 0
+        failed_rows = []
+
+        if self.transform:
+            batch = self.transform(batch)
+        if self.hash_field:
+            batch = self.drop_unchanged(batch)
+
+        try:
+            if not batch:
+                inserted = 0
+            elif self.key_field:
+                result = self.collection.bulk_write([self.operation(document) for document in batch], ordered=False)
+                inserted = result.inserted_count + result.upserted_count
+                self.rows_written += inserted + result.matched_count
+            else:
+                result = self.collection.insert_many(batch, ordered=False)
+                inserted = len(result.inserted_ids)
+                self.rows_written += inserted
+        except BulkWriteError as e:
+            inserted = e.details.get('nInserted', 0) + e.details.get('nUpserted', 0)
+            self.rows_written += inserted + e.details.get('nMatched', 0)
+            for error in e.details.get('writeErrors', []):
+                failed_rows.append({
+                    'index': error.get('index'),
+                    'error': error.get('errmsg'),
+                    'document': batch[error['index']]
+                })
+            self.rows_failed += len(failed_rows)
+
+        self.batches_flushed += 1
+        self.last_batch_inserted = inserted
+        self.last_batch = batch
+        if self.on_flush:
+            self.on_flush(self, failed_rows)
+
+    def drop_unchanged(self, batch):
+        """
+        Stamps every document with its content digest and returns the ones that differ from what is stored.
+
+        The stored digests are read with one `$in` query on `key_field` (served by its unique index).
+        """
+        for document in batch:
+            document[self.hash_field] = content_hash(document, self.hash_field)
+        keys = [document[self.key_field] for document in batch if isinstance(document.get(self.key_field), str)]
+        if not keys:
+            return batch
+
+        stored = {
+            existing[self.key_field]: existing.get(self.hash_field)
+            for existing in self.collection.find(
+                {self.key_field: {'$in': keys, '$type': 'string'}},
+                {'_id': 0, self.key_field: 1, self.hash_field: 1}
+            )
+        }
+        changed = [
+            document for document in batch
+            if document.get(self.key_field) not in stored or stored[document[self.key_field]] != document[self.hash_field]
+        ]
+        unchanged = len(batch) - len(changed)
+        self.rows_unchanged += unchanged
+        self.rows_written += unchanged
+        return changed
+
+    def operation(self, document):
+        """
+        Returns the bulk operation writing `document`: an upsert on `key_field`, or a plain insert when the key is missing.
+        """
+        key = document.get(self.key_field)
+        if key is None:
+            return InsertOne(document)
+        return ReplaceOne({self.key_field: key}, document, upsert=True)
+
+    def close(self):
+        """
+        Flushes whatever is left in the buffer.
+        """
+        self.flush()
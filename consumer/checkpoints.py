@@ -0,0 +1,70 @@
+import json
+
+CHECKPOINT_TTL = 7 * 24 * 3600  # Keep checkpoints of abandoned files for a week
+
+
+class Checkpoint:
+    """
+    Last committed position of a file (or of one chunk of a file), stored in the `checkpoint_<file_id>` Redis hash.
+
+    **Purpose**:
+    - Saved after every committed batch, so a redelivered file resumes from the last committed record instead
+      of starting over.
+    - Chunks of a file ingested in parallel share the hash, each under its own `<chunk_index>:` prefix.
+
+    **Parameters**:
+    - `redis_conn` (Redis): Redis connection.
+    - `file_id` (str): File being ingested.
+    - `prefix` (str): Field prefix, empty for single-pass ingestion.
+    """
+
+    def __init__(self, redis_conn, file_id, prefix=''):
+        self.redis_conn = redis_conn
+        self.key = f'checkpoint_{file_id}'
+        self.prefix = prefix
+
+    def for_chunk(self, chunk_index):
+        """
+        Returns the checkpoint of one chunk of the same file.
+        """
+        chunk = Checkpoint(self.redis_conn, '', prefix=f'{chunk_index}:')
+        chunk.key = self.key
+        return chunk
+
+    def load(self):
+        """
+        Returns `(offset, rows)` of the last committed batch, or `(None, 0)` if nothing was committed yet.
+        """
+        offset, rows = self.redis_conn.hmget(self.key, f'{self.prefix}offset', f'{self.prefix}rows')
+        if offset is None:
+            return None, 0
+        return int(offset), int(rows or 0)
+
+    def save(self, offset, rows):
+        """
+        Records that every record up to byte `offset` (`rows` rows in total) is committed.
+        """
+        pipeline = self.redis_conn.pipeline(transaction=False)
+        pipeline.hset(self.key, mapping={f'{self.prefix}offset': offset, f'{self.prefix}rows': rows})
+        pipeline.expire(self.key, CHECKPOINT_TTL)
+        pipeline.execute()
+
+    def load_ranges(self):
+        """
+        Returns the chunk ranges a parallel ingestion of this file was started with, or `None`.
+        """
+        ranges = self.redis_conn.hget(self.key, 'ranges')
+        return [tuple(chunk) for chunk in json.loads(ranges)] if ranges else None
+
+    def save_ranges(self, ranges):
+        """
+        Records the chunk ranges, so a resumed parallel ingestion splits the file the same way.
+        """
+        self.redis_conn.hset(self.key, 'ranges', json.dumps(ranges))
+        self.redis_conn.expire(self.key, CHECKPOINT_TTL)
+
+    def clear(self):
+        """
+        Removes the checkpoints of the whole file once it is fully processed.
+        """
+        self.redis_conn.delete(self.key)
@@ -1,126 +1,147 @@
-import pika
-import csv
-from pymongo import ASCENDING
 import sys
 sys.path.append("..")
 import os
-from configurations import database_configuration,redis_configuration
+import threading
+from configurations import storage_configuration, rabbitmq_configuration
 from dotenv import load_dotenv
 from logger import logger
+from consumer import readers, parallel_ingest
+from consumer.worker_runtime import ConsumerRuntime
+from helper.response_cache import bump_generation
+from helper import envelope
+from helper.fingerprints import UploadFingerprints
+from helper.chunked_upload import ChunkedUploads
+from helper.progress import progress_key
+from consumer.ingestion import redis_conn, get_movies_collection, autocomplete, create_progress_reporter, progress_callback, get_checkpoint, ingest_records
 
 log=logger.get_logger("file_consumer")
 # Load environment variables from .env file
 dot_env_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), '.env')
 load_dotenv(dot_env_path)
 
-# RabbitMQ and Redis connection details from environment variables
-rabbitmq_host = os.getenv('RABBITMQ_HOST')
-file_processing_queue = os.getenv('FILE_PROCESSING_QUEUE')
-redis_host = os.getenv('REDIS_HOST')
-redis_port = os.getenv('REDIS_PORT')
+# Concurrency of this consumer: unacknowledged messages it may hold and threads processing them
+consumer_prefetch = int(os.getenv('CONSUMER_PREFETCH', 4))
+consumer_threads = int(os.getenv('CONSUMER_THREADS', consumer_prefetch))
 
-# Redis connection
-redis_conn = redis_configuration.get_redis_connection()
 
-# MongoDB collection for storing movie data
-movies_collection = database_configuration.get_movies_collection()
+# Shared spool the web tier streams uploads into
+blob_store = storage_configuration.get_blob_store()
 
+# Checksums of queued uploads, released when a file fails for good so it can be uploaded again
+upload_fingerprints = UploadFingerprints(redis_conn)
 
-worker_folder = os.getenv('WORKER_FOLDER')
-os.makedirs(worker_folder, exist_ok=True)
+# Temporary files of abandoned chunked uploads are swept every `UPLOAD_SWEEP_INTERVAL` seconds
+chunked_uploads = ChunkedUploads(redis_conn, blob_store)
+upload_sweep_interval = float(os.getenv('UPLOAD_SWEEP_INTERVAL', 3600))
 
-#MongoDB index creation for fields `date_added`, `release_year`, `duration`
-movies_collection.create_index([('date_added', ASCENDING), ('release_year', ASCENDING), ('duration', ASCENDING)])
-
-def update_progress(file_id, progress):
-    """
-    Updates the file processing progress in Redis.
+def process_file(file_id, file_path, file_format='csv'):
     """
-    redis_conn.set(f'progress_{file_id}', progress)
+    Processes a spooled CSV or XLSX file in a single streaming pass and inserts data into MongoDB.
 
-def process_csv(file_id, file_content):
-    """
-    Processes the CSV file and inserts data into MongoDB.
+    The reader is picked from `file_format` (see `readers.open_records`); every format feeds the same batched
+    writer. Progress (position over file size, rows, throughput and ETA) is reported after batch flushes,
+    at most once per `PROGRESS_INTERVAL` seconds. CSV files larger than
+    `PARALLEL_INGEST_MIN_BYTES` are split into record-aligned ranges and ingested by a process pool.
+
+    Rows are upserted on `show_id` and the last committed offset is checkpointed after every batch, so a
+    redelivered file resumes where the previous attempt stopped without duplicating rows.
     """
+    checkpoint = get_checkpoint(file_id)
+    reporter = create_progress_reporter(file_id, os.path.getsize(file_path))
     try:
-       
-        file_path = os.path.join(worker_folder, f"{file_id}.csv")
-        with open(file_path, 'wb') as f:
-            f.write(file_content)
-
-        
-        with open(file_path, 'r', encoding='utf-8') as csv_file:
-            reader = csv.DictReader(csv_file)
-            total_rows = sum(1 for _ in reader) 
-            csv_file.seek(0)  
-
-            
-            first_row_skipped = False
-
-            
-            rows_processed = 0
-            for row in reader:
-                if not first_row_skipped:
-                    first_row_skipped = True
-                    continue  
-                
-
-            
-                movies_collection.insert_one({
-                    "title": row.get('title'),
-                    "release_year": row.get('release_year'),
-                    "duration": row.get('duration'),
-                    "date_added": row.get('date_added'),
-                    "description": row.get('description'),
-                    "director": row.get('director'),
-                    "cast": row.get('cast'),
-                    "country": row.get('country'),
-                    "rating": row.get('rating'),
-                    "listed_in": row.get('listed_in'),
-                    "show_id": row.get('show_id'),
-                    "type": row.get('type')
-                })
-                rows_processed += 1
-
-                
-                if rows_processed % 10 == 0 or rows_processed == total_rows:
-                    progress = (rows_processed / total_rows) * 100
-                    update_progress(file_id, int(progress))
+        if file_format == 'csv' and parallel_ingest.should_split(reporter.total_bytes):
+            rows_written, rows_failed = parallel_ingest.ingest_parallel(file_id, file_path, reporter)
+        else:
+            resume_offset, rows_before = checkpoint.load()
+            records, total, unit = readers.open_records(file_path, file_format, start=resume_offset)
+            reporter = create_progress_reporter(file_id, total, unit)
+            if resume_offset is not None:
+                log.info(f"Resuming file {file_id} at {unit} {resume_offset} ({rows_before} rows already committed).")
+                reporter.resume(rows_before, resume_offset)
+            writer = ingest_records(file_id, records, progress_callback(reporter), checkpoint, rows_before)
+            rows_written, rows_failed = rows_before + writer.rows_written, writer.rows_failed
+            log.info(f"File {file_id}: {writer.rows_unchanged} rows unchanged since the previous ingest were skipped.")
 
         
-        update_progress(file_id, 100)
-        log.info(f"File {file_id} processed successfully.")
+        reporter.finish(rows_written + rows_failed)
+        bump_generation(redis_conn)  # Invalidate cached /movies responses
+        log.info(f"File {file_id} processed successfully: {rows_written} rows written, {rows_failed} failed.")
 
         
-        os.remove(file_path)
+        checkpoint.clear()
+        blob_store.delete(file_path)
 
     except Exception as e:
         log.error(f"Error processing file {file_id}: {e}")
-        update_progress(file_id, -1)  # Use -1 to indicate an error
+        reporter.retry()  # Not final: the file is only marked failed if the redelivery fails too (see `drop_message`)
+        raise  # Rejected and requeued once by the runtime; the retry resumes from the checkpoint
 
-def callback(ch, method, properties, body):
+def handle_message(body, properties):
+    """
+    Processes one queued upload. Called on a worker thread of the consumer runtime; the message is
+    acknowledged once this returns, i.e. after every batch of the file has been committed.
+    """
    
-    message = eval(body.decode('utf-8'))  # Convert message from RabbitMQ back to dictionary
-    file_id = message.get('file_id')
-    file_content = message.get('file_content').encode('latin1')  # Decode file content
+    descriptor = envelope.decode_json(body)  # Small descriptor pointing at the spooled upload
+    file_id = descriptor.get('file_id')
+    file_path = descriptor.get('path')
+
+    if not os.path.exists(file_path) and float(redis_conn.get(progress_key(file_id)) or 0) == 100:
+        # Ingested, but the ack was lost with the channel (e.g. after the broker's consumer_timeout)
+        log.info(f"File {file_id} was already processed; acknowledging its redelivery.")
+    elif not os.path.exists(file_path) or os.path.getsize(file_path) != descriptor.get('size'):
+        log.error(f"Spooled file for {file_id} is missing or incomplete: {file_path}")
+        create_progress_reporter(file_id, descriptor.get('size')).fail()
+        release_fingerprint(descriptor)
+    else:
+        log.info(f"Processing {descriptor.get('format', 'csv')} file {file_id} ({descriptor.get('size')} bytes)...")
+        process_file(file_id, file_path, descriptor.get('format', 'csv'))  # A failure is retried once by the runtime
+
+def drop_message(body, properties):
+    """
+    Called by the consumer runtime when a file failed again on redelivery and its message is dropped: marks it
+    failed (progress `-1`) and lets the same file be uploaded again.
+    """
+    descriptor = envelope.decode_json(body)
+    create_progress_reporter(descriptor.get('file_id'), descriptor.get('size')).fail()
+    release_fingerprint(descriptor)
 
-    log.info(f"Processing file {file_id}...")
-    process_csv(file_id, file_content)
+def release_fingerprint(descriptor):
+    """
+    Forgets the checksum of a file that failed, so re-uploading it is queued instead of deduplicated.
+    """
+    if descriptor.get('checksum'):
+        upload_fingerprints.release(descriptor)
 
-   
-    ch.basic_ack(delivery_tag=method.delivery_tag)
+def sweep_abandoned_uploads_forever():
+    """
+    Removes the temporary spool files of abandoned uploads now, then every `UPLOAD_SWEEP_INTERVAL` seconds.
+    """
+    stop = threading.Event()
+    while True:
+        try:
+            removed = chunked_uploads.sweep()
+            if removed:
+                log.info(f"Removed {removed} temporary files of abandoned uploads.")
+        except Exception as e:
+            log.error(f"Failed to sweep abandoned uploads: {e}")
+        if stop.wait(upload_sweep_interval):
+            return
 
 def start_worker():
-    connection = pika.BlockingConnection(pika.ConnectionParameters(host=rabbitmq_host))
-    channel = connection.channel()
-
-    
-    channel.queue_declare(queue=file_processing_queue)
-
- 
-    channel.basic_consume(queue=file_processing_queue, on_message_callback=callback)
-
-    log.info(f'Waiting for messages in the {file_processing_queue} queue...')
-    channel.start_consuming()
-
-start_worker()
+    threading.Thread(target=sweep_abandoned_uploads_forever, name='upload-sweeper', daemon=True).start()
+    rebuilt = autocomplete.rebuild_if_missing(get_movies_collection())
+    if rebuilt:
+        log.info(f'Autocomplete index rebuilt from MongoDB ({rebuilt} entries).')
+    runtime = ConsumerRuntime(
+        rabbitmq_configuration.get_connection_parameters(),
+        rabbitmq_configuration.file_processing_queue,
+        handle_message,
+        prefetch=consumer_prefetch,
+        workers=consumer_threads,
+        on_drop=drop_message
+    )
+    runtime.run()
+
+if __name__ == '__main__':
+    start_worker()
@@ -0,0 +1,122 @@
+from bson import json_util
+import sys
+sys.path.append("..")
+import os
+from configurations import database_configuration,redis_configuration
+from dotenv import load_dotenv
+from logger import logger
+from helper.count_cache import increment_movie_count
+from helper.autocomplete import Autocomplete
+from helper.progress import ProgressReporter
+from consumer import normalizer
+from consumer.checkpoints import Checkpoint
+from consumer.batch_writer import BatchWriter, DEFAULT_BATCH_SIZE, DEFAULT_BATCH_BYTES
+
+log=logger.get_logger("ingestion")
+dot_env_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), '.env')
+load_dotenv(dot_env_path)
+
+# Batched ingestion settings
+ingest_batch_size = int(os.getenv('INGEST_BATCH_SIZE', DEFAULT_BATCH_SIZE))
+ingest_batch_bytes = int(os.getenv('INGEST_BATCH_BYTES', DEFAULT_BATCH_BYTES))
+max_failed_rows = int(os.getenv('MAX_FAILED_ROWS', 1000))
+progress_interval = float(os.getenv('PROGRESS_INTERVAL', 0.25))
+
+# Redis connection
+redis_conn = redis_configuration.get_redis_connection()
+
+# MongoDB collection for storing movie data (resolved per file: the client is created on first use)
+get_movies_collection = database_configuration.get_movies_collection
+
+# Type-ahead index, filled from every committed batch
+autocomplete = Autocomplete(redis_conn)
+
+
+def get_checkpoint(file_id):
+    """
+    Returns the checkpoint of a file.
+    """
+    return Checkpoint(redis_conn, file_id)
+
+def create_progress_reporter(file_id, total, unit='bytes'):
+    """
+    Returns a throttled progress reporter for a file (at most one update per `PROGRESS_INTERVAL` seconds).
+    """
+    return ProgressReporter(redis_conn, file_id, total, min_interval=progress_interval, unit=unit)
+
+def progress_callback(reporter):
+    """
+    Adapts a `ProgressReporter` to the `report_progress(position, rows_done)` callback of `ingest_records`
+    (`ProgressReporter.update` takes the row count first).
+    """
+    return lambda position, rows_done: reporter.update(rows_done, position)
+
+def record_failed_rows(file_id, failed_rows):
+    """
+    Stores the rows of a batch that could not be written, capped at `MAX_FAILED_ROWS` per file.
+    """
+    if not failed_rows:
+        return
+    key = f'failed_rows_{file_id}'
+    pipeline = redis_conn.pipeline()
+    pipeline.rpush(key, *[json_util.dumps(row) for row in failed_rows])
+    pipeline.ltrim(key, 0, max_failed_rows - 1)
+    pipeline.execute()
+    log.warning(f"{len(failed_rows)} rows of file {file_id} failed to insert.")
+
+def build_movie_document(row):
+    """
+    Maps a parsed row onto the movies collection schema. Values are still raw strings here; they are
+    typed per batch by `normalizer.normalize_batch` right before the batch is written.
+    """
+    return {
+        "title": row.get('title'),
+        "release_year": row.get('release_year'),
+        "duration": row.get('duration'),
+        "date_added": row.get('date_added'),
+        "description": row.get('description'),
+        "director": row.get('director'),
+        "cast": row.get('cast'),
+        "country": row.get('country'),
+        "rating": row.get('rating'),
+        "listed_in": row.get('listed_in'),
+        "show_id": row.get('show_id'),
+        "type": row.get('type')
+    }
+
+def ingest_records(file_id, records, report_progress, checkpoint, rows_before=0):
+    """
+    Writes `(row, position)` records to MongoDB in batches, upserting on `show_id`. Rows whose `content_hash`
+    matches the stored document are skipped, so re-ingesting a file only writes the rows that changed.
+
+    After every committed batch its titles and people are added to the autocomplete index, the position of its
+    last record is saved to `checkpoint`, then
+    `report_progress(position, rows_done)` is called, so both always reflect committed batches.
+    `rows_before` is the number of rows already committed by an earlier, interrupted attempt.
+
+    Returns the `BatchWriter` so callers can read the written/failed row counts.
+    """
+    position = 0
+
+    def on_flush(writer, failed_rows):
+        rows_done = rows_before + writer.rows_written + writer.rows_failed
+        record_failed_rows(file_id, failed_rows)
+        increment_movie_count(redis_conn, writer.last_batch_inserted)
+        failed_indexes = {row['index'] for row in failed_rows}
+        autocomplete.add_documents(document for index, document in enumerate(writer.last_batch) if index not in failed_indexes)
+        checkpoint.save(position, rows_done)
+        report_progress(position, rows_done)
+
+    writer = BatchWriter(
+        get_movies_collection(),
+        ingest_batch_size,
+        ingest_batch_bytes,
+        on_flush=on_flush,
+        transform=normalizer.normalize_batch,
+        key_field='show_id',
+        hash_field='content_hash'
+    )
+    for row, position in records:
+        writer.add(build_movie_document(row))
+    writer.close()
+    return writer
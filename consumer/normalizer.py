@@ -0,0 +1,102 @@
+import datetime
+from functools import lru_cache
+
+
+DATE_FORMATS = ('%B %d, %Y', '%b %d, %Y', '%Y-%m-%d', '%d-%m-%Y', '%m/%d/%Y')
+LIST_FIELDS = ('cast', 'listed_in', 'country')
+TEXT_FIELDS = ('title', 'description', 'director', 'rating', 'show_id', 'type')
+
+
+@lru_cache(maxsize=16384)
+def parse_date(value):
+    """
+    Parses `date_added` values such as "September 25, 2021" into a `datetime`.
+
+    Returns `None` for empty or unrecognised values. Results are memoised because the same dates repeat
+    across thousands of rows.
+    """
+    value = value.strip()
+    if not value:
+        return None
+    for date_format in DATE_FORMATS:
+        try:
+            return datetime.datetime.strptime(value, date_format)
+        except ValueError:
+            continue
+    return None
+
+@lru_cache(maxsize=4096)
+def parse_duration(value):
+    """
+    Parses durations such as "90 min" or "2 Seasons".
+
+    **Returns**:
+    - `(amount, unit)`: `amount` is an int, `unit` is `'min'` or `'season'`; `(None, None)` if the value cannot be parsed.
+    """
+    parts = value.split()
+    if not parts or not parts[0].isdigit():
+        return None, None
+    unit = parts[1].lower() if len(parts) > 1 else 'min'
+    return int(parts[0]), 'season' if unit.startswith('season') else 'min'
+
+def parse_int(value):
+    """
+    Converts a numeric string to an int, returning `None` when it is empty or not a number.
+    """
+    value = value.strip()
+    return int(value) if value.isdigit() else None
+
+def split_list(value):
+    """
+    Splits a comma-separated value into a list of trimmed, non-empty items.
+    """
+    return [item.strip() for item in value.split(',') if item.strip()]
+
+def normalize_document(document):
+    """
+    Converts the raw string fields of a movie document into their typed form, in place.
+
+    - `release_year` becomes an int.
+    - `duration` becomes an int (minutes or seasons) and `duration_unit` records which one.
+    - `date_added` becomes a `datetime`.
+    - `cast`, `listed_in` and `country` become lists.
+    - Empty text fields become `None`.
+    """
+    for field in TEXT_FIELDS:
+        value = document.get(field)
+        if value is not None and not isinstance(value, str):
+            value = str(value)  # e.g. numeric cells read from a spreadsheet
+        document[field] = (value.strip() or None) if isinstance(value, str) else value
+
+    release_year = document.get('release_year')
+    if isinstance(release_year, str):
+        document['release_year'] = parse_int(release_year)
+    elif isinstance(release_year, float):
+        document['release_year'] = int(release_year)
+
+    duration = document.get('duration')
+    if isinstance(duration, str):
+        document['duration'], document['duration_unit'] = parse_duration(duration)
+
+    date_added = document.get('date_added')
+    if isinstance(date_added, str):
+        document['date_added'] = parse_date(date_added)
+    elif isinstance(date_added, datetime.date) and not isinstance(date_added, datetime.datetime):
+        document['date_added'] = datetime.datetime.combine(date_added, datetime.time())
+
+    for field in LIST_FIELDS:
+        value = document.get(field)
+        if isinstance(value, str):
+            document[field] = split_list(value)
+        elif value is None:
+            document[field] = []
+
+    return document
+
+def normalize_batch(documents):
+    """
+    Normalizes a whole batch right before it is written, so the per-value parsers' caches stay hot.
+    """
+    for document in documents:
+        normalize_document(document)
+    return documents
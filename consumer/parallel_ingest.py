@@ -0,0 +1,117 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_EXCEPTION
+import sys
+sys.path.append("..")
+import os
+from dotenv import load_dotenv
+from logger import logger
+from consumer import ingestion, readers
+
+log=logger.get_logger("parallel_ingest")
+dot_env_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), '.env')
+load_dotenv(dot_env_path)
+
+# Files at least this large are split into record-aligned ranges and ingested by a process pool
+parallel_ingest_min_bytes = int(os.getenv('PARALLEL_INGEST_MIN_BYTES', 256 * 1024 * 1024))
+ingest_workers = int(os.getenv('INGEST_WORKERS', os.cpu_count() or 1))
+progress_poll_interval = float(os.getenv('PARALLEL_PROGRESS_INTERVAL', 1.0))
+
+_pool = None
+
+
+def get_pool():
+    """
+    Returns the process pool used for chunked ingestion, creating it on first use.
+
+    Workers are started with the `spawn` method so each one opens its own MongoDB and Redis connections
+    instead of inheriting the parent's sockets.
+    """
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=ingest_workers, mp_context=multiprocessing.get_context('spawn'))
+    return _pool
+
+def should_split(file_size):
+    """
+    Tells whether a file is large enough to be worth ingesting in parallel.
+    """
+    return ingest_workers > 1 and file_size >= parallel_ingest_min_bytes
+
+def ingest_chunk(file_id, file_path, chunk_index, start, end):
+    """
+    Ingests one record-aligned byte range of a CSV file. Runs inside a pool worker.
+
+    The bytes and rows processed so far are published in the `progress_chunks_<file_id>` Redis hash under
+    `<chunk_index>:bytes` and `<chunk_index>:rows`, so the coordinator can combine them. The chunk resumes
+    from its own checkpoint if an earlier attempt committed part of it.
+    """
+    chunk_progress_key = f'progress_chunks_{file_id}'
+    checkpoint = ingestion.get_checkpoint(file_id).for_chunk(chunk_index)
+
+    def report_progress(position, rows_done):
+        ingestion.redis_conn.hset(chunk_progress_key, mapping={f'{chunk_index}:bytes': position - start, f'{chunk_index}:rows': rows_done})
+
+    resume_offset, rows_before = checkpoint.load()
+    resume_offset = resume_offset or start
+    rows_written = rows_failed = 0
+    if resume_offset < end:
+        records = readers.iter_csv_records(file_path, start=resume_offset, end=end)
+        writer = ingestion.ingest_records(file_id, records, report_progress, checkpoint, rows_before)
+        rows_written, rows_failed = writer.rows_written, writer.rows_failed
+    report_progress(end, rows_before + rows_written + rows_failed)
+    return rows_before + rows_written, rows_failed
+
+def ingest_parallel(file_id, file_path, reporter):
+    """
+    Splits a CSV file into record-aligned ranges and ingests them concurrently.
+
+    **Process**:
+    1. Computes one byte range per pool worker with `readers.split_csv_ranges`, or reuses the ranges recorded
+       in the checkpoint when the file is being resumed.
+    2. Submits every range to the process pool.
+    3. While chunks are running, sums the per-chunk byte and row counters and hands the totals to
+       `reporter`, which updates the existing `progress_<file_id>` key.
+
+    **Returns**:
+    - `(rows_written, rows_failed)` totals across all chunks.
+
+    **Raises**:
+    - The first exception raised by a chunk, once the chunks not started yet are cancelled and those already
+      running have finished, so the retry of the file never races them on the same rows and checkpoints.
+    """
+
+    checkpoint = ingestion.get_checkpoint(file_id)
+    ranges = checkpoint.load_ranges()
+    if ranges is None:
+        ranges = readers.split_csv_ranges(file_path, ingest_workers)
+        checkpoint.save_ranges(ranges)
+    chunk_progress_key = f'progress_chunks_{file_id}'
+    log.info(f"Ingesting file {file_id} in {len(ranges)} chunks.")
+
+    pool = get_pool()
+    futures = [
+        pool.submit(ingest_chunk, file_id, file_path, chunk_index, start, end)
+        for chunk_index, (start, end) in enumerate(ranges)
+    ]
+
+    try:
+        pending = futures
+        while pending:
+            done, pending = wait(pending, timeout=progress_poll_interval, return_when=FIRST_EXCEPTION)
+            for future in done:
+                if future.exception():
+                    raise future.exception()
+            counters = ingestion.redis_conn.hgetall(chunk_progress_key)
+            bytes_done = sum(int(value) for field, value in counters.items() if field.endswith(b':bytes'))
+            rows_done = sum(int(value) for field, value in counters.items() if field.endswith(b':rows'))
+            reporter.update(rows_done, bytes_done, force=True)
+    except Exception:
+        for future in futures:
+            future.cancel()
+        wait(futures)  # Chunks already running cannot be cancelled
+        raise
+    finally:
+        ingestion.redis_conn.delete(chunk_progress_key)
+
+    results = [future.result() for future in futures]
+    return sum(written for written, _ in results), sum(failed for _, failed in results)
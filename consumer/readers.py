@@ -0,0 +1,219 @@
+import csv
+import os
+
+
+class ByteCountingLines:
+    """
+    Iterates over the lines of a binary file, decoding them and keeping track of the bytes consumed.
+
+    `csv.reader` only pulls the lines it needs to complete a record (including quoted newlines), so after
+    a record has been yielded `position` is exactly the byte offset at which that record ends.
+    """
+
+    def __init__(self, raw_file, encoding='utf-8'):
+        self.raw_file = raw_file
+        self.encoding = encoding
+        self.position = raw_file.tell()
+
+    def __iter__(self):
+        for line in self.raw_file:
+            self.position += len(line)
+            yield line.decode(self.encoding)
+
+
+SCAN_BLOCK_SIZE = 4 * 1024 * 1024  # 4 MB
+
+
+def read_header(raw_file, encoding='utf-8'):
+    """
+    Reads the header record from the start of an open binary CSV file.
+
+    **Returns**:
+    - `(header, position)`: The list of field names (without a UTF-8 BOM) and the byte offset where the header ends.
+      `header` is `None` for an empty file.
+    """
+    raw_file.seek(0)
+    lines = ByteCountingLines(raw_file, encoding)
+    header = next(csv.reader(lines), None)
+    if header and header[0].startswith('\ufeff'):
+        header[0] = header[0][1:]
+    return header, lines.position
+
+
+def iter_csv_records(file_path, encoding='utf-8', start=None, end=None):
+    """
+    Streams a CSV file in a single pass.
+
+    **Purpose**:
+    - Parses the file once, without a separate row-counting pass, and never holds more than the current record in memory.
+    - Exposes the byte offset reached after each record so progress can be computed as bytes consumed over file size.
+
+    **Parameters**:
+    - `file_path` (str): Path of the CSV file; the first line is the header.
+    - `encoding` (str): Text encoding of the file. A leading UTF-8 BOM is ignored.
+    - `start` (int): Optional record-aligned byte offset to start reading from (defaults to right after the header).
+    - `end` (int): Optional record-aligned byte offset to stop at; records starting at or after it are not read.
+
+    **Returns**:
+    - Generator of `(row, position)` tuples, where `row` is a dict keyed by the header fields and `position`
+      is the byte offset right after the record.
+    """
+
+    with open(file_path, 'rb') as raw_file:
+        header, header_end = read_header(raw_file, encoding)
+        if header is None:
+            return
+
+        raw_file.seek(max(start or 0, header_end))
+        lines = ByteCountingLines(raw_file, encoding)
+        reader = csv.reader(lines)
+
+        for values in reader:
+            if values:
+                yield dict(zip(header, values)), lines.position
+            if end is not None and lines.position >= end:
+                break
+
+
+def split_csv_ranges(file_path, parts, encoding='utf-8'):
+    """
+    Splits a CSV file into record-aligned byte ranges that can be parsed independently.
+
+    **Purpose**:
+    - Lets one large upload be ingested by several worker processes in parallel.
+
+    **Process**:
+    1. Skips the header record.
+    2. Scans the body in blocks, tracking whether the scan is inside a quoted field by counting `"` characters
+       (an escaped `""` counts twice, so it never changes the parity).
+    3. For every target offset (file body split into `parts` equal slices), moves forward to the first newline
+       that is outside quotes, so a range never starts in the middle of a record.
+
+    **Returns**:
+    - `ranges` (list): `(start, end)` byte offsets covering the whole body; fewer than `parts` for small files.
+    """
+
+    with open(file_path, 'rb') as raw_file:
+        header, header_end = read_header(raw_file, encoding)
+        size = raw_file.seek(0, 2)
+        if header is None or size <= header_end:
+            return []
+
+        body_size = size - header_end
+        targets = [header_end + (body_size * i) // parts for i in range(1, parts)]
+        boundaries = [header_end]
+
+        raw_file.seek(header_end)
+        block_start = header_end
+        in_quotes = False
+        searching = False
+
+        while targets:
+            block = raw_file.read(SCAN_BLOCK_SIZE)
+            if not block:
+                break
+            block_end = block_start + len(block)
+            index = 0
+
+            while targets:
+                if not searching:
+                    if targets[0] >= block_end:
+                        break
+                    target_index = max(targets[0] - block_start, index)
+                    in_quotes ^= block.count(b'"', index, target_index) % 2 == 1
+                    index = target_index
+                    searching = True
+
+                newline = block.find(b'\n', index)
+                if newline == -1:
+                    break
+                in_quotes ^= block.count(b'"', index, newline) % 2 == 1
+                index = newline + 1
+                if not in_quotes:
+                    boundary = block_start + index
+                    if boundary < size and boundary > boundaries[-1]:
+                        boundaries.append(boundary)
+                    while targets and targets[0] <= boundary:
+                        targets.pop(0)
+                    searching = False
+
+            in_quotes ^= block.count(b'"', index) % 2 == 1
+            block_start = block_end
+
+    boundaries.append(size)
+    return list(zip(boundaries[:-1], boundaries[1:]))
+
+
+def iter_xlsx_records(file_path, start=None):
+    """
+    Streams the rows of the first worksheet of an XLSX workbook.
+
+    **Purpose**:
+    - Opens the workbook in read-only mode, which parses the sheet XML incrementally instead of loading the
+      whole workbook, so memory stays constant whatever the spreadsheet size.
+
+    **Parameters**:
+    - `file_path` (str): Path of the workbook; the first row is the header.
+    - `start` (int): Optional number of sheet rows already consumed (as returned in `position`) to resume after.
+
+    **Returns**:
+    - Generator of `(row, position)` tuples, where `row` is a dict keyed by the header cells and `position`
+      is the number of sheet rows consumed so far (header included).
+    """
+
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        header = [str(cell).strip() if cell is not None else '' for cell in header]
+
+        position = 1
+        for values in rows:
+            position += 1
+            if start is not None and position <= start:
+                continue
+            if all(value is None for value in values):
+                continue
+            yield {field: ('' if value is None else value) for field, value in zip(header, values)}, position
+    finally:
+        workbook.close()
+
+
+def xlsx_row_count(file_path):
+    """
+    Returns the number of rows of the first worksheet, as declared in the sheet dimensions (may be approximate).
+    """
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(file_path, read_only=True)
+    try:
+        return workbook.worksheets[0].max_row or 0
+    finally:
+        workbook.close()
+
+
+READERS = {
+    'csv': {'records': iter_csv_records, 'unit': 'bytes', 'total': os.path.getsize},
+    'xlsx': {'records': iter_xlsx_records, 'unit': 'rows', 'total': xlsx_row_count}
+}
+
+
+def open_records(file_path, file_format, start=None):
+    """
+    Dispatches to the streaming reader of a file format.
+
+    **Returns**:
+    - `(records, total, unit)`: The `(row, position)` generator, the position reached at the end of the file,
+      and the unit positions are measured in (`bytes` for CSV, `rows` for XLSX).
+
+    **Raises**:
+    - `ValueError`: If the format is not supported.
+    """
+    if file_format not in READERS:
+        raise ValueError(f"Unsupported file format {file_format}.")
+    reader = READERS[file_format]
+    return reader['records'](file_path, start=start), reader['total'](file_path), reader['unit']
@@ -0,0 +1,148 @@
+import functools
+import signal
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import pika
+import sys
+sys.path.append("..")
+from logger import logger
+
+log=logger.get_logger("worker_runtime")
+
+
+class ConsumerRuntime:
+    """
+    Consumes a RabbitMQ queue and processes messages on a worker pool, off the connection's I/O thread.
+
+    **Purpose**:
+    - Keeps the pika connection responsive (heartbeats keep flowing) while long files are ingested.
+    - Processes up to `prefetch` messages concurrently, so one consumer host can use all of its cores and
+      its MongoDB connection pool.
+    - Acknowledges a message only after its handler returned, i.e. after every MongoDB batch of the file was
+      committed. Acks are handed back to the I/O thread with `add_callback_threadsafe`, since pika channels
+      are not thread-safe.
+    - Drains gracefully on SIGTERM/SIGINT: stops taking new deliveries, waits for in-flight messages to finish
+      and be acknowledged, then closes the connection.
+    - Survives a channel the broker closed under running handlers, e.g. when a message stays unacknowledged
+      longer than RabbitMQ's `consumer_timeout` (30 minutes by default; see the README): acks that can no longer
+      be sent are logged, in-flight handlers still finish, and `run` raises once they have, so the process is
+      restarted. The broker redelivers the unacknowledged messages, and ingestion resumes them from their
+      checkpoints.
+
+    **Parameters**:
+    - `connection_parameters` (pika.ConnectionParameters): Broker connection settings.
+    - `queue` (str): Queue to consume.
+    - `handler` (callable): Called as `handler(body, properties)` on a worker thread.
+      A normal return acks the message; an exception rejects it (requeued once, dropped on redelivery).
+    - `prefetch` (int): Maximum number of unacknowledged messages delivered to this consumer (`basic_qos`).
+    - `workers` (int): Number of worker threads; defaults to `prefetch`.
+    - `declare_queue` (callable): Optional `declare_queue(channel)` run before consuming; by default the queue
+      is declared durable, matching the web tier's `Publisher`.
+    - `on_drop` (callable): Optional `on_drop(body, properties)` called on the worker thread when a failed
+      message is dropped instead of requeued, i.e. once it has failed for good.
+    """
+
+    def __init__(self, connection_parameters, queue, handler, prefetch=4, workers=None, declare_queue=None, on_drop=None):
+        self.connection_parameters = connection_parameters
+        self.queue = queue
+        self.handler = handler
+        self.prefetch = prefetch
+        self.executor = ThreadPoolExecutor(max_workers=workers or prefetch, thread_name_prefix='consumer')
+        self.declare_queue = declare_queue
+        self.on_drop = on_drop
+        self.connection = None
+        self.channel = None
+        self.in_flight = 0
+        self.stopping = False
+        self._lock = threading.Lock()
+
+    def run(self):
+        """
+        Consumes until a SIGTERM/SIGINT is received, then drains and returns.
+        """
+        self.connection = pika.BlockingConnection(self.connection_parameters)
+        self.channel = self.connection.channel()
+        if self.declare_queue:
+            self.declare_queue(self.channel)
+        else:
+            self.channel.queue_declare(queue=self.queue, durable=True)
+        self.channel.basic_qos(prefetch_count=self.prefetch)
+        self.channel.basic_consume(queue=self.queue, on_message_callback=self.on_message)
+
+        signal.signal(signal.SIGTERM, self.request_stop)
+        signal.signal(signal.SIGINT, self.request_stop)
+
+        log.info(f'Waiting for messages in the {self.queue} queue (prefetch {self.prefetch})...')
+        try:
+            self.channel.start_consuming()
+        except pika.exceptions.AMQPError as e:
+            log.error(f'Lost the {self.queue} channel ({e!r}); waiting for in-flight messages before exiting.')
+            raise
+        finally:
+            self.drain()
+
+    def request_stop(self, signum=None, frame=None):
+        """
+        Stops taking new deliveries; in-flight messages are still completed and acknowledged.
+        """
+        if self.stopping:
+            return
+        self.stopping = True
+        log.info('Shutdown requested, draining in-flight messages...')
+        self.connection.add_callback_threadsafe(self.channel.stop_consuming)
+
+    def drain(self):
+        """
+        Keeps the I/O loop running until every in-flight message is acknowledged, then closes the connection.
+        """
+        while self.in_flight and self.connection.is_open:
+            self.connection.process_data_events(time_limit=1)
+        self.executor.shutdown(wait=True)  # Handlers still run to their last checkpoint if the connection is gone
+        if self.connection.is_open:
+            self.connection.close()
+        log.info('Consumer stopped.')
+
+    def on_message(self, channel, method, properties, body):
+        with self._lock:
+            self.in_flight += 1
+        self.executor.submit(self.process, method.delivery_tag, method.redelivered, body, properties)
+
+    def process(self, delivery_tag, redelivered, body, properties):
+        """
+        Runs the handler on a worker thread and schedules the ack/nack on the I/O thread.
+        """
+        try:
+            self.handler(body, properties)
+            settle = functools.partial(self.channel.basic_ack, delivery_tag=delivery_tag)
+        except Exception as e:
+            log.error(f"Message {delivery_tag} failed: {e}")
+            settle = functools.partial(self.channel.basic_nack, delivery_tag=delivery_tag, requeue=not redelivered)
+            if redelivered and self.on_drop:
+                try:
+                    self.on_drop(body, properties)
+                except Exception as e:
+                    log.error(f"Cleaning up dropped message {delivery_tag} failed: {e}")
+        try:
+            self.connection.add_callback_threadsafe(functools.partial(self.settle, delivery_tag, settle))
+        except pika.exceptions.AMQPError as e:
+            self.unsettled(delivery_tag, e)
+
+    def settle(self, delivery_tag, settle):
+        """
+        Acks or nacks a message. Runs on the I/O thread.
+        """
+        try:
+            settle()
+        except pika.exceptions.AMQPError as e:
+            self.unsettled(delivery_tag, e)
+            return
+        with self._lock:
+            self.in_flight -= 1
+
+    def unsettled(self, delivery_tag, error):
+        """
+        Gives up on acking or nacking a message whose channel or connection is closed; the broker redelivers it.
+        """
+        log.warning(f"Could not settle message {delivery_tag} ({error!r}): the channel is closed (e.g. after the broker's consumer_timeout), so it will be redelivered and resume from its checkpoint.")
+        with self._lock:
+            self.in_flight -= 1
@@ -0,0 +1,225 @@
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from flask import request, jsonify, g, current_app
+import sys
+sys.path.append("..")
+from helper import helper
+from helper.sessions import REVOCATION_CHANNEL
+from logger import logger
+
+log=logger.get_logger("auth")
+
+
+class TTLCache:
+    """
+    Small thread-safe LRU cache whose entries also expire after a time-to-live.
+
+    **Parameters**:
+    - `max_size` (int): Maximum number of entries; the least recently used entry is evicted first.
+    - `ttl` (float): Default lifetime of an entry in seconds.
+    """
+
+    def __init__(self, max_size=10000, ttl=30):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """
+        Returns the cached value, or `None` if it is missing or expired.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        """
+        Stores a value for `ttl` seconds, capped at the cache default.
+        """
+        lifetime = self.ttl if ttl is None else min(ttl, self.ttl)
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + lifetime)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, key):
+        """
+        Removes a single entry.
+        """
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        """
+        Removes every entry.
+        """
+        with self._lock:
+            self._entries.clear()
+
+
+class Authenticator:
+    """
+    Verifies bearer tokens and user sessions for protected routes.
+
+    **Purpose**:
+    - Replaces the token parsing, JWT decoding and Redis session lookup that every protected route used to repeat.
+    - Keeps verified tokens and sessions in an in-process TTL+LRU cache, so authenticated requests usually
+      cost no network call at all.
+    - Listens on the `session_revocations` Redis channel and evicts revoked sessions immediately, so a logout
+      takes effect on every process without waiting for the cache TTL. While the listener is not subscribed
+      the session cache is bypassed and every request goes to Redis.
+    - Every revocation is numbered; a session read from Redis is only cached if no revocation of its user
+      arrived since the read started, so a logout racing with a cache miss is never undone.
+
+    **Parameters**:
+    - `session_store` (SessionStore): Store holding the sessions; its Redis connection is also used for revocations.
+    - `cache_size` (int): Maximum number of cached tokens and sessions.
+    - `cache_ttl` (float): Seconds a session is trusted without asking Redis again.
+    """
+
+    def __init__(self, session_store, cache_size=10000, cache_ttl=30):
+        self.session_store = session_store
+        self.redis_conn = session_store.redis_conn
+        self.tokens = TTLCache(cache_size, cache_ttl)
+        self.sessions = TTLCache(cache_size, cache_ttl)
+        self.revocations = TTLCache(cache_size, cache_ttl)  # User ID -> sequence number of its last revocation
+        self.revocation_sequence = 0
+        self.cleared_at = 0  # Sequence number of the last revocation of every session
+        self.listening = False
+        self._listener = None
+        self._lock = threading.Lock()
+        self._revocation_lock = threading.Lock()
+
+    def verify_token(self, token):
+        """
+        Decodes a JWT, caching the payload until the token expires.
+        """
+        payload = self.tokens.get(token)
+        if payload is None:
+            payload = helper.decode_token(token, current_app.config['SECRET_KEY'])
+            if payload:
+                self.tokens.set(token, payload, ttl=payload['exp'] - time.time())
+        return payload
+
+    def load_session(self, user_id):
+        """
+        Returns the username stored in a user's session, or `None` if the session expired.
+
+        Cache misses validate the session and slide its expiry with a single Redis round trip.
+        """
+        if self.listening:
+            username = self.sessions.get(user_id)
+            if username is not None:
+                return username
+
+        read_at = self.revocation_sequence
+        username = self.session_store.touch(user_id)
+        if username is None:
+            return None
+        if self.listening and not self.revoked_since(user_id, read_at):
+            self.sessions.set(user_id, username)
+        return username
+
+    def revoked_since(self, user_id, sequence):
+        """
+        Tells whether the session of `user_id` (or every session) was revoked after revocation `sequence`.
+        """
+        return max(self.revocations.get(user_id) or 0, self.cleared_at) > sequence
+
+    def forget_session(self, user_id=None):
+        """
+        Drops a cached session (every session when `user_id` is `None`) and numbers the revocation.
+        """
+        with self._revocation_lock:
+            self.revocation_sequence += 1
+            if user_id is None:
+                self.cleared_at = self.revocation_sequence
+            else:
+                self.revocations.set(user_id, self.revocation_sequence)
+        if user_id is None:
+            self.sessions.clear()
+        else:
+            self.sessions.invalidate(user_id)
+
+    def revoke(self, *user_ids):
+        """
+        Deletes the sessions of `user_ids` and tells every process to drop them from its cache.
+        """
+        self.session_store.revoke(*user_ids)
+        for user_id in user_ids:
+            self.forget_session(user_id)
+
+    def start_revocation_listener(self):
+        """
+        Starts the revocation listener thread, once per process.
+        """
+        if self._listener is not None:
+            return
+        with self._lock:
+            if self._listener is None:
+                self._listener = threading.Thread(target=self._listen_forever, name='session-revocations', daemon=True)
+                self._listener.start()
+
+    def _listen_forever(self):
+        backoff = 1
+        while True:
+            pubsub = self.redis_conn.pubsub(ignore_subscribe_messages=True)
+            try:
+                pubsub.subscribe(REVOCATION_CHANNEL)
+                # Anything cached before the subscription could have missed a revocation
+                self.forget_session()
+                self.listening = True
+                backoff = 1
+                for message in pubsub.listen():
+                    self.forget_session(message['data'].decode('utf-8'))
+            except Exception as e:
+                log.error(f"Session revocation listener disconnected: {e}")
+            finally:
+                self.listening = False
+                self.forget_session()
+                pubsub.close()
+            time.sleep(backoff)
+            backoff = min(backoff * 2, 30)
+
+    def required(self, view):
+        """
+        Decorator protecting a route with a bearer token and an active session.
+
+        On success `g.user_id` and `g.username` are set for the view. Otherwise it returns
+        403 when the token is missing or invalid, and 401 when the session has expired.
+        """
+
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            self.start_revocation_listener()
+
+            token = request.headers.get('Authorization')
+            if not token:
+                return jsonify({'message': 'Token is missing!'}), 403
+
+            token = token.split(" ")[1] if " " in token else token
+            decoded_token = self.verify_token(token)
+            if not decoded_token:
+                return jsonify({'message': 'Invalid or expired token!'}), 403
+
+            user_id = decoded_token['user_id']
+            username = self.load_session(user_id)
+            if not username:
+                return jsonify({'message': 'Session expired, please log in again.'}), 401
+
+            g.user_id = user_id
+            g.username = username
+            return view(*args, **kwargs)
+
+        return wrapper
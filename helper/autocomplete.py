@@ -0,0 +1,135 @@
+import unicodedata
+
+SUGGEST_KEY = 'suggest:movies'
+SEPARATOR = '\x00'
+REBUILD_BATCH_SIZE = 5000
+
+
+def normalize(text):
+    """
+    Folds a value for prefix matching: accents removed, case-folded, whitespace collapsed.
+    """
+    decomposed = unicodedata.normalize('NFKD', text)
+    stripped = ''.join(char for char in decomposed if not unicodedata.combining(char))
+    return ' '.join(stripped.casefold().split())
+
+
+def suggestion_values(document):
+    """
+    Yields the `(kind, value)` pairs of a movie document that are offered as suggestions.
+    """
+    if isinstance(document.get('title'), str):
+        yield 'title', document['title']
+    director = document.get('director')
+    if isinstance(director, str):
+        for name in director.split(','):
+            if name.strip():
+                yield 'director', name.strip()
+    cast = document.get('cast')
+    if isinstance(cast, list):
+        for name in cast:
+            if isinstance(name, str) and name.strip():
+                yield 'cast', name.strip()
+
+
+def members(kind, value):
+    """
+    Returns the sorted-set members indexing `value`, one per word it can be typed from.
+
+    A member is `<normalized suffix>\\0<kind>\\0<value>`, so "hanks" finds "Tom Hanks" as well as "tom h".
+    """
+    words = normalize(value).split(' ')
+    return [f'{" ".join(words[i:])}{SEPARATOR}{kind}{SEPARATOR}{value}' for i in range(len(words)) if words[i]]
+
+
+class Autocomplete:
+    """
+    Prefix index of titles, directors and cast members, stored in one Redis sorted set.
+
+    **Purpose**:
+    - Serves type-ahead from a single `ZRANGEBYLEX` (O(log N) plus the results), without touching MongoDB.
+    - Every member has score 0, so the set is ordered lexicographically and a prefix is a contiguous range.
+    - Filled incrementally by the consumer after every committed batch; `ZADD` is idempotent, so
+      re-ingested rows do not create duplicates.
+
+    **Parameters**:
+    - `redis_conn` (Redis): Redis connection.
+    - `key` (str): Sorted set holding the index.
+    """
+
+    def __init__(self, redis_conn, key=SUGGEST_KEY):
+        self.redis_conn = redis_conn
+        self.key = key
+
+    def add_documents(self, documents, key=None):
+        """
+        Indexes the titles and people of a batch of movie documents, in a single round trip.
+        """
+        mapping = {}
+        for document in documents:
+            for kind, value in suggestion_values(document):
+                for member in members(kind, value):
+                    mapping[member] = 0
+        if mapping:
+            self.redis_conn.zadd(key or self.key, mapping)
+        return len(mapping)
+
+    def suggest(self, prefix, limit=10):
+        """
+        Returns up to `limit` `{'value', 'kind'}` suggestions starting with `prefix`, in lexicographic order.
+        """
+        prefix = normalize(prefix)
+        if not prefix:
+            return []
+
+        start = b'[' + prefix.encode('utf-8')
+        end = start + b'\xff'
+        suggestions = []
+        seen = set()
+        offset = 0
+        # A value indexed under several words can match twice; fetch a little more than needed and dedupe
+        while len(suggestions) < limit:
+            page = self.redis_conn.zrangebylex(self.key, start, end, start=offset, num=limit * 2)
+            for member in page:
+                _, kind, value = member.decode('utf-8').split(SEPARATOR, 2)
+                if (kind, value) in seen:
+                    continue
+                seen.add((kind, value))
+                suggestions.append({'value': value, 'kind': kind})
+                if len(suggestions) == limit:
+                    break
+            if len(page) < limit * 2:
+                break
+            offset += len(page)
+        return suggestions
+
+    def rebuild(self, collection):
+        """
+        Rebuilds the index from MongoDB into a temporary key, then swaps it in atomically with `RENAME`.
+
+        **Returns**:
+        - `count` (int): Number of members indexed.
+        """
+        building_key = f'{self.key}:rebuild'
+        self.redis_conn.delete(building_key)
+        count = 0
+        batch = []
+        for document in collection.find({}, {'_id': 0, 'title': 1, 'director': 1, 'cast': 1}):
+            batch.append(document)
+            if len(batch) >= REBUILD_BATCH_SIZE:
+                count += self.add_documents(batch, key=building_key)
+                batch = []
+        count += self.add_documents(batch, key=building_key)
+        if count:
+            self.redis_conn.rename(building_key, self.key)
+        else:
+            self.redis_conn.delete(self.key)
+        return count
+
+    def rebuild_if_missing(self, collection):
+        """
+        Rebuilds the index when the key does not exist (e.g. Redis was flushed), so startup never serves an empty index.
+        """
+        if self.redis_conn.exists(self.key):
+            return 0
+        return self.rebuild(collection)
@@ -0,0 +1,228 @@
+import hashlib
+import os
+
+
+CHUNK_SIZE = 1024 * 1024  # 1 MB
+
+
+class FileTooLargeError(Exception):
+    """
+    Raised when a streamed upload grows past the configured maximum size.
+    """
+
+
+class SpoolFile:
+    """
+    Temporary spool file written sequentially, checksummed and size-checked while it is written.
+
+    **Purpose**:
+    - Lets a multipart parser write an upload straight into the spool (see `helper.upload_request`), instead of
+      buffering it in a temporary file of its own that would then be copied.
+    - Reads, seeks and the other file methods are those of the underlying file.
+
+    **Parameters**:
+    - `file_id` (str): ID of the upload.
+    - `path` (str): Final spool path; bytes are written to `<path>.part` until `commit`.
+    - `extension` (str): Format of the file.
+    - `max_size` (int): Size in bytes past which writing fails, or `None`.
+    """
+
+    def __init__(self, file_id, path, extension, max_size=None):
+        self.file_id = file_id
+        self.path = path
+        self.partial_path = f"{path}.part"
+        self.extension = extension
+        self.max_size = max_size
+        self.size = 0
+        self.checksum = hashlib.blake2b()
+        self.committed = False
+        self.file = open(self.partial_path, 'w+b')
+
+    def __getattr__(self, name):
+        return getattr(self.file, name)
+
+    def write(self, data):
+        """
+        Appends `data`; the partial file is removed if it grows past `max_size`.
+
+        **Raises**:
+        - `FileTooLargeError`: If the file is larger than `max_size` bytes.
+        """
+        self.size += len(data)
+        if self.max_size is not None and self.size > self.max_size:
+            self.discard()
+            raise FileTooLargeError(f"Upload exceeds {self.max_size} bytes.")
+        self.checksum.update(data)
+        return self.file.write(data)
+
+    def commit(self):
+        """
+        Renames the written file into place.
+
+        **Returns**:
+        - `descriptor` (dict): `file_id`, `path`, `size`, `checksum`, `checksum_algorithm` and `format` of the stored file.
+        """
+        self.file.close()
+        os.replace(self.partial_path, self.path)
+        self.committed = True
+        return {
+            'file_id': self.file_id,
+            'path': self.path,
+            'size': self.size,
+            'checksum': self.checksum.hexdigest(),
+            'checksum_algorithm': 'blake2b',
+            'format': self.extension
+        }
+
+    def discard(self):
+        """
+        Closes and removes the partial file, unless it was committed.
+        """
+        self.file.close()
+        if not self.committed and os.path.exists(self.partial_path):
+            os.remove(self.partial_path)
+
+    def close(self):
+        self.discard()
+
+
+class LocalBlobStore:
+    """
+    Stores uploaded files in a spool directory shared by the web tier and the consumers.
+
+    **Purpose**:
+    - Lets the upload endpoint stream request bodies to disk in fixed-size chunks, so the web process never
+      holds a whole file in memory.
+    - Gives the consumer a path it can read from instead of receiving the file bytes over RabbitMQ.
+
+    **Parameters**:
+    - `root` (str): Directory used as the spool. It must be reachable by every consumer (local disk or a shared mount).
+    - `chunk_size` (int): Number of bytes read from the incoming stream per iteration.
+    """
+
+    def __init__(self, root, chunk_size=CHUNK_SIZE):
+        self.root = os.path.abspath(root)
+        self.chunk_size = chunk_size
+        os.makedirs(self.root, exist_ok=True)
+
+    def path_for(self, file_id, extension):
+        """
+        Returns the spool path used for a given file ID and extension.
+        """
+        return os.path.join(self.root, f"{file_id}.{extension}")
+
+    def open_spool(self, file_id, extension, max_size=None):
+        """
+        Opens a temporary spool file to be written sequentially, then committed or discarded (see `SpoolFile`).
+        """
+        return SpoolFile(file_id, self.path_for(file_id, extension), extension, max_size)
+
+    def save_stream(self, file_id, stream, extension, max_size=None):
+        """
+        Streams a file-like object into the spool.
+
+        **Process**:
+        1. Reads `chunk_size` bytes at a time from `stream` and appends them to a temporary file.
+        2. Updates a BLAKE2b checksum and the byte count while writing.
+        3. Aborts and removes the partial file if `max_size` is exceeded.
+        4. Renames the temporary file into place once the stream is exhausted.
+
+        **Returns**:
+        - `descriptor` (dict): `file_id`, `path`, `size`, `checksum`, `checksum_algorithm` and `format` of the stored file.
+
+        **Raises**:
+        - `FileTooLargeError`: If the stream is larger than `max_size` bytes.
+        """
+
+        spool = self.open_spool(file_id, extension, max_size)
+        try:
+            while True:
+                chunk = stream.read(self.chunk_size)
+                if not chunk:
+                    break
+                spool.write(chunk)
+        except BaseException:
+            spool.discard()
+            raise
+        return spool.commit()
+
+    def create_partial(self, file_id, extension, size):
+        """
+        Creates the temporary spool file of a chunked upload, preallocated (sparse) to its final `size`.
+
+        **Returns**:
+        - `path` (str): Path of the temporary file; chunks are written into it with `write_at`.
+        """
+        partial_path = f"{self.path_for(file_id, extension)}.part"
+        with open(partial_path, 'wb') as spool_file:
+            spool_file.truncate(size)
+        return partial_path
+
+    def write_at(self, partial_path, offset, stream, length):
+        """
+        Copies exactly `length` bytes from `stream` into a temporary spool file at `offset`, in place.
+
+        Chunks of the same upload can be written concurrently, since every write is positioned (`pwrite`).
+
+        **Returns**:
+        - `checksum` (str): BLAKE2b hex digest of the bytes written.
+
+        **Raises**:
+        - `ValueError`: If the stream holds fewer or more than `length` bytes.
+        """
+        checksum = hashlib.blake2b()
+        written = 0
+        fd = os.open(partial_path, os.O_WRONLY)
+        try:
+            while written < length:
+                chunk = stream.read(min(self.chunk_size, length - written))
+                if not chunk:
+                    break
+                checksum.update(chunk)
+                os.pwrite(fd, chunk, offset + written)
+                written += len(chunk)
+        finally:
+            os.close(fd)
+        if written != length or stream.read(1):
+            raise ValueError(f"Expected {length} bytes.")
+        return checksum.hexdigest()
+
+    def commit_partial(self, partial_path):
+        """
+        Moves a completed temporary spool file into place and returns its final path.
+        """
+        path = partial_path[:-len('.part')]
+        os.replace(partial_path, path)
+        return path
+
+    def partial_files(self):
+        """
+        Lists the temporary files in the spool (uploads being streamed or received in chunks).
+
+        **Returns**:
+        - `partials` (list): `(file_id, path, modified_at)` tuples; `modified_at` is a Unix timestamp.
+        """
+        partials = []
+        for entry in os.scandir(self.root):
+            if not entry.name.endswith('.part'):
+                continue
+            try:
+                partials.append((entry.name.split('.', 1)[0], entry.path, entry.stat().st_mtime))
+            except FileNotFoundError:
+                continue  # Committed or removed meanwhile
+        return partials
+
+    def reopen_partial(self, path):
+        """
+        Moves a committed spool file back to its temporary path (undoes `commit_partial`) and returns that path.
+        """
+        partial_path = f"{path}.part"
+        os.replace(path, partial_path)
+        return partial_path
+
+    def delete(self, path):
+        """
+        Removes a spooled file if it still exists.
+        """
+        if os.path.exists(path):
+            os.remove(path)
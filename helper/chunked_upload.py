@@ -0,0 +1,251 @@
+import hashlib
+import re
+import time
+import uuid
+
+DEFAULT_CHUNK_SIZE = 8 * 1024 * 1024  # 8 MB
+DEFAULT_SESSION_TTL = 24 * 3600
+DEFAULT_SWEEP_GRACE = 3600  # Temporary files written to within the last hour are never swept
+
+CONTENT_RANGE = re.compile(r'^bytes (\d+)-(\d+)/(\d+)$')
+
+
+class UploadError(Exception):
+    """
+    Raised when a chunked upload request is invalid; carries the HTTP status to answer with.
+    """
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def parse_content_range(header):
+    """
+    Parses a `Content-Range: bytes <start>-<end>/<size>` header into `(start, end, size)` (`end` inclusive).
+    """
+    match = CONTENT_RANGE.match(header or '')
+    if not match:
+        raise UploadError('Invalid or missing Content-Range header! Expected "bytes <start>-<end>/<size>".')
+    start, end, size = (int(value) for value in match.groups())
+    if end < start:
+        raise UploadError('Invalid Content-Range! End must not be before start.')
+    return start, end, size
+
+
+class ChunkedUploads:
+    """
+    Resumable uploads, sent as fixed-size chunks that are written in place into the spool.
+
+    **Purpose**:
+    - A dropped connection only loses the chunk in flight: the client asks which chunks were received and
+      sends the rest, possibly several at a time.
+    - The declared size is checked before any byte is accepted, and memory per request is bounded by the chunk size.
+
+    **State** (Redis, expiring `session_ttl` seconds after the last chunk):
+    - `upload:<id>` hash: owner, size, extension, chunk size and temporary path.
+    - `upload_chunks:<id>` bitmap: one bit per received chunk, so duplicate chunks are skipped.
+    - `upload_digests:<id>` hash: BLAKE2b digest of every received chunk; the file checksum is the BLAKE2b of
+      the chunk digests in order, so completing an upload never re-reads the file.
+
+    **Parameters**:
+    - `redis_conn` (Redis): Redis connection.
+    - `blob_store` (LocalBlobStore): Spool the chunks are written to.
+    - `chunk_size` (int): Size of every chunk except the last one.
+    - `max_size` (int): Largest accepted file, in bytes.
+    - `session_ttl` (int): Seconds an idle upload is kept.
+    """
+
+    def __init__(self, redis_conn, blob_store, chunk_size=DEFAULT_CHUNK_SIZE, max_size=None, session_ttl=DEFAULT_SESSION_TTL):
+        self.redis_conn = redis_conn
+        self.blob_store = blob_store
+        self.chunk_size = chunk_size
+        self.max_size = max_size
+        self.session_ttl = session_ttl
+
+    @staticmethod
+    def keys(upload_id):
+        return f'upload:{upload_id}', f'upload_chunks:{upload_id}', f'upload_digests:{upload_id}'
+
+    def initiate(self, owner, extension, size):
+        """
+        Starts an upload of `size` bytes and preallocates its spool file.
+
+        **Returns**:
+        - `upload` (dict): `upload_id`, `chunk_size` and `total_chunks`.
+        """
+        if size < 1:
+            raise UploadError('Invalid size! Must be a positive integer.')
+        if self.max_size is not None and size > self.max_size:
+            raise UploadError(f'File size exceeds the maximum allowed limit of {self.max_size} bytes.', status=413)
+
+        upload_id = str(uuid.uuid4())
+        partial_path = self.blob_store.create_partial(upload_id, extension, size)
+        upload_key = self.keys(upload_id)[0]
+        pipeline = self.redis_conn.pipeline(transaction=False)
+        pipeline.hset(upload_key, mapping={
+            'owner': owner,
+            'size': size,
+            'extension': extension,
+            'chunk_size': self.chunk_size,
+            'path': partial_path
+        })
+        pipeline.expire(upload_key, self.session_ttl)
+        pipeline.execute()
+        return {'upload_id': upload_id, 'chunk_size': self.chunk_size, 'total_chunks': -(-size // self.chunk_size)}
+
+    def load(self, upload_id, owner):
+        """
+        Returns the state of an upload owned by `owner`.
+
+        **Raises**:
+        - `UploadError` (404): If the upload does not exist, expired, or belongs to another user.
+        """
+        state = self.redis_conn.hgetall(self.keys(upload_id)[0])
+        state = {key.decode(): value.decode() for key, value in state.items()}
+        if not state or state['owner'] != owner:
+            raise UploadError('Upload not found', status=404)
+        for field in ('size', 'chunk_size'):
+            state[field] = int(state[field])
+        state['total_chunks'] = -(-state['size'] // state['chunk_size'])
+        return state
+
+    def status(self, upload_id, owner):
+        """
+        Reports how much of an upload was received.
+
+        **Returns**:
+        - `status` (dict): `offset` (bytes received contiguously from the start, where a sequential client
+          resumes), `received_chunks`, `missing_chunks` (up to 100 indexes), `chunk_size`, `total_chunks` and `size`.
+        """
+        state = self.load(upload_id, owner)
+        chunks_key = self.keys(upload_id)[1]
+        bitmap = self.redis_conn.get(chunks_key) or b''
+        missing = [index for index in range(state['total_chunks']) if not self._has_chunk(bitmap, index)]
+        first_missing = missing[0] if missing else state['total_chunks']
+        return {
+            'upload_id': upload_id,
+            'offset': min(first_missing * state['chunk_size'], state['size']),
+            'received_chunks': state['total_chunks'] - len(missing),
+            'missing_chunks': missing[:100],
+            'chunk_size': state['chunk_size'],
+            'total_chunks': state['total_chunks'],
+            'size': state['size']
+        }
+
+    @staticmethod
+    def _has_chunk(bitmap, index):
+        byte = index // 8
+        return byte < len(bitmap) and bool(bitmap[byte] & (0x80 >> (index % 8)))
+
+    def write_chunk(self, upload_id, owner, content_range, stream, checksum=None):
+        """
+        Writes one chunk in place.
+
+        The chunk must be chunk-aligned (`start` a multiple of `chunk_size`) and complete. A chunk that was
+        already received is skipped without reading the body. When `checksum` (BLAKE2b hex) is given, a chunk
+        whose bytes do not match is not marked received, so the client can send it again.
+
+        **Returns**:
+        - `result` (dict): `chunk` index and whether it was `skipped`.
+        """
+        state = self.load(upload_id, owner)
+        start, end, size = parse_content_range(content_range)
+        if size != state['size']:
+            raise UploadError(f"Invalid Content-Range! Total size must be {state['size']}.")
+        index, remainder = divmod(start, state['chunk_size'])
+        expected_end = min(start + state['chunk_size'], state['size']) - 1
+        if remainder or index >= state['total_chunks'] or end != expected_end:
+            raise UploadError(f"Invalid Content-Range! A chunk must start at a multiple of {state['chunk_size']} bytes and span {state['chunk_size']} bytes (less for the last chunk).")
+
+        upload_key, chunks_key, digests_key = self.keys(upload_id)
+        if self.redis_conn.getbit(chunks_key, index):
+            return {'chunk': index, 'skipped': True}
+
+        try:
+            digest = self.blob_store.write_at(state['path'], start, stream, end - start + 1)
+        except ValueError as e:
+            raise UploadError(f'Incomplete chunk! {e}')
+        if checksum and checksum.lower() != digest:
+            raise UploadError('Chunk checksum mismatch!', status=422)
+
+        pipeline = self.redis_conn.pipeline(transaction=False)
+        pipeline.hset(digests_key, index, digest)
+        pipeline.setbit(chunks_key, index, 1)
+        for key in (upload_key, chunks_key, digests_key):
+            pipeline.expire(key, self.session_ttl)
+        pipeline.execute()
+        return {'chunk': index, 'skipped': False}
+
+    def complete(self, upload_id, owner):
+        """
+        Moves a fully received upload into place.
+
+        The upload's state is kept until the caller either `finish`es it once the file is queued, or `reopen`s it
+        when queueing failed, so completing can be retried.
+
+        **Returns**:
+        - `descriptor` (dict): Same shape as `LocalBlobStore.save_stream`, ready to be queued.
+
+        **Raises**:
+        - `UploadError` (409): If chunks are still missing or the upload is already being completed.
+        """
+        state = self.load(upload_id, owner)
+        upload_key, chunks_key, digests_key = self.keys(upload_id)
+        if self.redis_conn.bitcount(chunks_key) != state['total_chunks']:
+            raise UploadError('Upload is incomplete; query its status for the missing chunks.', status=409)
+        if not self.redis_conn.hsetnx(upload_key, 'completing', 1):
+            raise UploadError('Upload is already being completed.', status=409)
+
+        try:
+            digests = self.redis_conn.hgetall(digests_key)
+            checksum = hashlib.blake2b()
+            for index in range(state['total_chunks']):
+                checksum.update(bytes.fromhex(digests[str(index).encode()].decode()))
+            path = self.blob_store.commit_partial(state['path'])
+        except BaseException:
+            self.redis_conn.hdel(upload_key, 'completing')  # Lets the client retry instead of answering 409 until expiry
+            raise
+        return {
+            'file_id': upload_id,
+            'path': path,
+            'size': state['size'],
+            'checksum': checksum.hexdigest(),
+            'checksum_algorithm': 'blake2b-chunks',
+            'chunk_size': state['chunk_size'],
+            'format': state['extension']
+        }
+
+    def finish(self, upload_id):
+        """
+        Forgets a completed upload, once its file was queued.
+        """
+        self.redis_conn.delete(*self.keys(upload_id))
+
+    def reopen(self, upload_id, descriptor):
+        """
+        Moves the file of an upload that could not be queued back to its temporary path, so completing it
+        can be retried (and an abandoned upload is still removed with the temporary files).
+        """
+        self.blob_store.reopen_partial(descriptor['path'])
+        self.redis_conn.hdel(self.keys(upload_id)[0], 'completing')
+
+    def sweep(self, grace=DEFAULT_SWEEP_GRACE):
+        """
+        Removes the temporary spool files of abandoned uploads.
+
+        Preallocated files of chunked uploads outlive their Redis state, which expires `session_ttl` seconds
+        after the last chunk. A temporary file is removed once no upload state refers to it and it was not
+        written to for `grace` seconds (which also spares `/upload` requests still streaming into the spool).
+
+        **Returns**:
+        - `removed` (int): Number of files removed.
+        """
+        removed = 0
+        now = time.time()
+        for upload_id, path, modified_at in self.blob_store.partial_files():
+            if now - modified_at < grace or self.redis_conn.exists(self.keys(upload_id)[0]):
+                continue
+            self.blob_store.delete(path)
+            removed += 1
+        return removed
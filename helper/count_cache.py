@@ -0,0 +1,123 @@
+import threading
+import sys
+sys.path.append("..")
+from logger import logger
+
+log=logger.get_logger("count_cache")
+
+MOVIES_COUNT_KEY = 'movies:count'
+
+# Only adjusts the cached count when it exists; a missing key is rebuilt from MongoDB by the refresher instead
+# of being recreated with a partial value.
+INCREMENT_IF_EXISTS = """
+if redis.call('exists', KEYS[1]) == 1 then
+    return redis.call('incrby', KEYS[1], ARGV[1])
+end
+return nil
+"""
+
+
+def increment_movie_count(redis_conn, amount):
+    """
+    Adds `amount` to the cached movie count, if it is cached.
+
+    **Purpose**:
+    - Called by the consumer after every committed batch, so the cached total follows ingestion without
+      a collection scan.
+    """
+    if amount:
+        redis_conn.eval(INCREMENT_IF_EXISTS, 1, MOVIES_COUNT_KEY, amount)
+
+
+class MovieCountCache:
+    """
+    Serves the total number of movies from Redis instead of counting the collection on every request.
+
+    **Purpose**:
+    - Removes `count_documents({})` from the `/movies` request path.
+    - A daemon thread recomputes the count every `refresh_interval` seconds; between refreshes the consumer
+      keeps it up to date with `increment_movie_count`.
+    - When the key is missing (cold start, flush, eviction) requests are answered from
+      `estimated_document_count` and one background refresh restores the exact value, instead of every
+      concurrent request counting the collection.
+
+    **Parameters**:
+    - `redis_conn` (Redis): Redis connection holding the cached count.
+    - `get_collection` (callable): Returns the movies collection.
+    - `refresh_interval` (float): Seconds between background refreshes.
+    - `use_estimate` (bool): Use `estimated_document_count` (collection metadata, O(1)) instead of an exact count.
+    """
+
+    def __init__(self, redis_conn, get_collection, refresh_interval=60, use_estimate=False):
+        self.redis_conn = redis_conn
+        self.get_collection = get_collection
+        self.refresh_interval = refresh_interval
+        self.use_estimate = use_estimate
+        self._refresher = None
+        self._lock = threading.Lock()
+        self._refreshing = threading.Lock()
+
+    def count(self):
+        """
+        Counts the movies in MongoDB, exactly or from collection metadata depending on `use_estimate`.
+        """
+        collection = self.get_collection()
+        if self.use_estimate:
+            return collection.estimated_document_count()
+        return collection.count_documents({})
+
+    def refresh(self):
+        """
+        Recomputes the count and stores it in Redis.
+        """
+        total = self.count()
+        self.redis_conn.set(MOVIES_COUNT_KEY, total)
+        return total
+
+    def get(self):
+        """
+        Returns the cached total, or the collection's estimated count while it is not cached.
+
+        Also starts the background refresher on first use.
+        """
+        self.start_refresher()
+        total = self.redis_conn.get(MOVIES_COUNT_KEY)
+        if total is None:
+            self.refresh_in_background()
+            return self.get_collection().estimated_document_count()
+        return int(total)
+
+    def refresh_in_background(self):
+        """
+        Starts a refresh on its own thread, unless one is already running.
+        """
+        if not self._refreshing.acquire(blocking=False):
+            return
+        threading.Thread(target=self._refresh_once, name='movie-count-fill', daemon=True).start()
+
+    def _refresh_once(self):
+        try:
+            self.refresh()
+        except Exception as e:
+            log.error(f"Failed to refresh the movie count: {e}")
+        finally:
+            self._refreshing.release()
+
+    def start_refresher(self):
+        """
+        Starts the background refresh thread, once per process.
+        """
+        if self._refresher is not None:
+            return
+        with self._lock:
+            if self._refresher is None:
+                self._refresher = threading.Thread(target=self._refresh_forever, name='movie-count-refresher', daemon=True)
+                self._refresher.start()
+
+    def _refresh_forever(self):
+        stop = threading.Event()
+        while not stop.wait(self.refresh_interval):
+            try:
+                self.refresh()
+            except Exception as e:
+                log.error(f"Failed to refresh the movie count: {e}")
@@ -0,0 +1,71 @@
+from helper.progress import progress_key
+
+DEFAULT_FINGERPRINT_TTL = 30 * 24 * 3600  # Remember uploaded files for 30 days
+
+# Deletes the fingerprint only if it still points at the given file, so a newer upload's claim is kept.
+RELEASE_IF_OWNER = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+
+class UploadFingerprints:
+    """
+    Maps the checksum of every uploaded file to the `file_id` it was queued as.
+
+    **Purpose**:
+    - The upload path already hashes files while streaming them (BLAKE2b); re-uploading an identical file is
+      answered with the earlier `file_id` (whose progress and results are already known) instead of being
+      queued and ingested again.
+    - Fingerprints of files that failed are released, so the same file can be uploaded again.
+
+    **Parameters**:
+    - `redis_conn` (Redis): Redis connection.
+    - `ttl` (int): Seconds a fingerprint is remembered.
+    """
+
+    def __init__(self, redis_conn, ttl=DEFAULT_FINGERPRINT_TTL):
+        self.redis_conn = redis_conn
+        self.ttl = ttl
+        self._release = redis_conn.register_script(RELEASE_IF_OWNER)
+
+    @staticmethod
+    def key(descriptor):
+        """
+        Returns the Redis key of a file's fingerprint. Chunked uploads hash chunk digests, so their checksum
+        depends on the chunk size as well.
+        """
+        algorithm = descriptor['checksum_algorithm']
+        if descriptor.get('chunk_size'):
+            algorithm = f"{algorithm}-{descriptor['chunk_size']}"
+        return f"upload_fingerprint:{algorithm}:{descriptor['checksum']}"
+
+    def claim(self, descriptor):
+        """
+        Records the fingerprint of a file about to be queued.
+
+        **Returns**:
+        - `previous_file_id` (str): The `file_id` an identical file was already queued as, or `None` when this
+          file is new (or the earlier one failed) and should be queued.
+        """
+        key = self.key(descriptor)
+        if self.redis_conn.set(key, descriptor['file_id'], nx=True, ex=self.ttl):
+            return None
+
+        previous_file_id = self.redis_conn.get(key)
+        if previous_file_id is not None:
+            previous_file_id = previous_file_id.decode()
+            progress = self.redis_conn.get(progress_key(previous_file_id))
+            if progress is not None and progress != b'-1':
+                return previous_file_id
+
+        self.redis_conn.set(key, descriptor['file_id'], ex=self.ttl)
+        return None
+
+    def release(self, descriptor):
+        """
+        Forgets the fingerprint of a file that could not be processed.
+        """
+        self._release(keys=[self.key(descriptor)], args=[descriptor['file_id']])
@@ -0,0 +1,54 @@
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+
+class HealthChecks:
+    """
+    Runs dependency checks for the readiness endpoint, concurrently and with a deadline.
+
+    **Purpose**:
+    - Readiness answers within `timeout` seconds even when a dependency hangs: a check that has not finished
+      by then is reported as `timeout`, so load balancers never pile up requests on the probe.
+
+    **Parameters**:
+    - `checks` (dict): Name to callable; a check passes when it returns without raising.
+    - `timeout` (float): Seconds the checks may take in total.
+    """
+
+    def __init__(self, checks, timeout=2.0):
+        self.checks = checks
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(max_workers=len(checks), thread_name_prefix='health')
+
+    def run(self):
+        """
+        Runs every check.
+
+        **Returns**:
+        - `(ready, results)`: Whether every check passed, and `{name: {'status', 'seconds', 'error'}}`.
+        """
+        started_at = time.monotonic()
+        futures = {name: self._executor.submit(self._timed, check) for name, check in self.checks.items()}
+        wait(futures.values(), timeout=self.timeout)
+
+        results = {}
+        for name, future in futures.items():
+            if not future.done():
+                future.cancel()
+                results[name] = {'status': 'timeout', 'seconds': round(time.monotonic() - started_at, 3)}
+                continue
+            seconds, error = future.result()
+            results[name] = {'status': 'ok' if error is None else 'error', 'seconds': seconds}
+            if error is not None:
+                results[name]['error'] = error
+        return all(result['status'] == 'ok' for result in results.values()), results
+
+    @staticmethod
+    def _timed(check):
+        started_at = time.monotonic()
+        try:
+            check()
+            error = None
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+        return round(time.monotonic() - started_at, 3), error
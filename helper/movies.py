@@ -0,0 +1,190 @@
+from helper import pagination, serialization
+
+# Fields returned by /movies and their defaults when missing from a document
+MOVIE_FIELDS = {
+    'title': None,
+    'release_year': None,
+    'duration': 0,
+    'date_added': None,
+    'description': None,
+    'director': None,
+    'cast': [],
+    'country': None,
+    'rating': None,
+    'listed_in': [],
+    'show_id': None,
+    'type': None
+}
+
+# Fields /movies can be sorted by, each backed by a `(field, _id)` index
+SORT_FIELDS = ['date_added', 'release_year', 'duration']
+
+
+def parse_fields(value):
+    """
+    Parses the comma-separated `fields` parameter of `/movies` and `/movies/search`.
+
+    **Returns**:
+    - `fields` (list): The requested fields, or every movie field when `value` is empty.
+
+    **Raises**:
+    - `ValueError`: If a field is unknown or none is given.
+    """
+    if not value:
+        return list(MOVIE_FIELDS)
+    fields = [field.strip() for field in value.split(',') if field.strip()]
+    if not fields or any(field not in MOVIE_FIELDS for field in fields):
+        raise ValueError(f"Invalid fields! Must be a subset of {list(MOVIE_FIELDS)}.")
+    return fields
+
+
+def parse_page(args, max_per_page):
+    """
+    Parses the `page` and `per_page` parameters (defaults 1 and 10).
+
+    **Returns**:
+    - `(page, per_page)`
+
+    **Raises**:
+    - `ValueError`: If either is not a positive integer, or `per_page` exceeds `max_per_page`.
+    """
+    try:
+        page = int(args.get('page', 1))
+    except ValueError:
+        raise ValueError('Invalid page number! Must be an integer.')
+    if page < 1:
+        raise ValueError('Invalid page number! Page must be a positive integer.')
+
+    try:
+        per_page = int(args.get('per_page', 10))
+    except ValueError:
+        raise ValueError('Invalid per_page number! Must be an integer.')
+    if per_page < 1:
+        raise ValueError('Invalid per_page number! Must be a positive integer.')
+    if per_page > max_per_page:
+        raise ValueError(f'Invalid per_page number! Must not exceed {max_per_page}.')
+    return page, per_page
+
+
+def parse_listing(args, max_per_page):
+    """
+    Parses and validates the query parameters of `/movies`.
+
+    With a `cursor`, the sort comes from the token and `page`, `sort_by` and `order` are ignored.
+
+    **Returns**:
+    - `listing` (dict): `page`, `per_page`, `fields`, `sort_by`, `sort_order`, `cursor_token`, and the `query`
+      selecting the page that follows the cursor (empty without one).
+
+    **Raises**:
+    - `ValueError`: If a parameter or the cursor is invalid.
+    """
+    page, per_page = parse_page(args, max_per_page)
+    fields = parse_fields(args.get('fields'))
+
+    sort_by = args.get('sort_by', 'date_added')
+    if sort_by not in SORT_FIELDS:
+        raise ValueError(f"Invalid sort field! Must be one of {SORT_FIELDS}.")
+    sort_order = 1 if args.get('order', 'asc') == 'asc' else -1
+    query = {}
+
+    cursor_token = args.get('cursor')
+    if cursor_token:
+        cursor = pagination.decode_cursor(cursor_token)
+        if not cursor or cursor['sort_by'] not in SORT_FIELDS or cursor['sort_order'] not in (1, -1):
+            raise ValueError('Invalid cursor!')
+        sort_by, sort_order = cursor['sort_by'], cursor['sort_order']
+        query = pagination.keyset_filter(sort_by, sort_order, cursor['last_value'], cursor['last_id'])
+
+    return {
+        'page': page,
+        'per_page': per_page,
+        'fields': fields,
+        'sort_by': sort_by,
+        'sort_order': sort_order,
+        'cursor_token': cursor_token,
+        'query': query
+    }
+
+
+def listing_cache_key(listing):
+    """
+    Returns the response cache key of a parsed `/movies` request; both apps share the cache, so they share the key.
+    """
+    return (listing['sort_by'], listing['sort_order'], listing['cursor_token'] or listing['page'], listing['per_page'], tuple(listing['fields']))
+
+
+def shape_page(movies, fields, sort_by, sort_order, per_page):
+    """
+    Turns the `per_page + 1` documents fetched for a `/movies` page into the response items.
+
+    Drops the extra document (its presence means another page follows) and the cursor-only fields, and fills
+    defaults for missing fields.
+
+    **Returns**:
+    - `(movies, next_cursor)`: The page items, and the continuation token (`None` on the last page).
+    """
+    next_cursor = None
+    if len(movies) > per_page:
+        movies = movies[:per_page]
+        last = movies[-1]
+        next_cursor = pagination.encode_cursor(sort_by, sort_order, last.get(sort_by), last['_id'])
+
+    drop_sort_field = sort_by not in fields
+    for movie in movies:
+        del movie['_id']
+        if drop_sort_field:
+            movie.pop(sort_by, None)
+        for field in fields:
+            if field not in movie:
+                movie[field] = MOVIE_FIELDS[field]
+    return movies, next_cursor
+
+
+def total_pages(listing, total_movies):
+    return (total_movies + listing['per_page'] - 1) // listing['per_page']
+
+
+def page_out_of_range(listing, total_movies):
+    """
+    Tells whether a page-numbered request asks for a page past the last one.
+    """
+    return not listing['cursor_token'] and listing['page'] > total_pages(listing, total_movies)
+
+
+def find_page(collection, listing):
+    """
+    Returns the cursor of a `/movies` page: `per_page + 1` documents with only the requested fields (plus `_id`
+    and the sort field needed for the next cursor), walking the `(sort_by, _id)` index. Works with both the
+    synchronous and the asyncio collection.
+    """
+    sort_by, sort_order = listing['sort_by'], listing['sort_order']
+    projection = dict.fromkeys(listing['fields'], 1)
+    projection[sort_by] = 1
+    cursor = collection.find(listing['query'], projection).sort([(sort_by, sort_order), ('_id', sort_order)])
+    if not listing['cursor_token']:
+        cursor = cursor.skip((listing['page'] - 1) * listing['per_page'])
+    return cursor.limit(listing['per_page'] + 1)
+
+
+def page_response(listing, movies, total_movies):
+    """
+    Builds the `/movies` response from the documents returned by `find_page`.
+
+    **Returns**:
+    - `(status, body)`: HTTP status code and the serialized JSON body as bytes.
+    """
+    if page_out_of_range(listing, total_movies):
+        return 400, serialization.dumps({'message': f'Page number exceeds total pages! Total pages: {total_pages(listing, total_movies)}.'})
+
+    movies, next_cursor = shape_page(movies, listing['fields'], listing['sort_by'], listing['sort_order'], listing['per_page'])
+    return 200, serialization.dumps({
+        'movies': movies,
+        'pagination': {
+            'current_page': None if listing['cursor_token'] else listing['page'],
+            'per_page': listing['per_page'],
+            'total_pages': total_pages(listing, total_movies),
+            'total_movies': total_movies,
+            'next_cursor': next_cursor
+        }
+    })
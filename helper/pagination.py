@@ -0,0 +1,73 @@
+import base64
+import binascii
+from bson import json_util
+
+
+def encode_cursor(sort_by, sort_order, last_value, last_id):
+    """
+    Encodes the position of the last returned movie into an opaque continuation token.
+
+    **Parameters**:
+    - `sort_by` (str): Field the listing is sorted by.
+    - `sort_order` (int): `1` for ascending, `-1` for descending.
+    - `last_value`: Value of `sort_by` on the last returned document (may be `None`).
+    - `last_id` (ObjectId): `_id` of the last returned document, used as a tiebreaker.
+
+    **Returns**:
+    - `token` (str): URL-safe token to pass back as the `cursor` query parameter.
+    """
+    payload = json_util.dumps({'s': sort_by, 'o': sort_order, 'v': last_value, 'i': last_id})
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(token):
+    """
+    Decodes a continuation token produced by `encode_cursor`.
+
+    **Returns**:
+    - `cursor` (dict): `sort_by`, `sort_order`, `last_value` and `last_id` of the token.
+    - `None`: If the token is malformed.
+    """
+    try:
+        payload = json_util.loads(base64.urlsafe_b64decode(token.encode('ascii')))
+        return {
+            'sort_by': payload['s'],
+            'sort_order': payload['o'],
+            'last_value': payload['v'],
+            'last_id': payload['i']
+        }
+    except (ValueError, KeyError, TypeError, binascii.Error):
+        return None
+
+
+def keyset_filter(sort_by, sort_order, last_value, last_id):
+    """
+    Builds the range query that returns the documents following `(last_value, last_id)`.
+
+    **Purpose**:
+    - Replaces `skip()` with a range scan on the `(sort_by, _id)` index, so any page costs the same as the first one.
+
+    **Process**:
+    - Documents are ordered by `sort_by` and then `_id`, so the next page starts either at a strictly
+      greater/smaller sort value, or at the same sort value with a greater/smaller `_id`.
+    - MongoDB sorts missing/`null` values first in ascending order and last in descending order;
+      those documents are handled explicitly because range operators never match `null`.
+
+    **Returns**:
+    - `filter` (dict): MongoDB query filter.
+    """
+    after = '$gt' if sort_order == 1 else '$lt'
+
+    if last_value is None:
+        same_value_after = {sort_by: None, '_id': {after: last_id}}
+        if sort_order == 1:
+            return {'$or': [same_value_after, {sort_by: {'$ne': None}}]}
+        return same_value_after
+
+    clauses = [
+        {sort_by: {after: last_value}},
+        {sort_by: last_value, '_id': {after: last_id}}
+    ]
+    if sort_order == -1:
+        clauses.append({sort_by: None})
+    return {'$or': clauses}
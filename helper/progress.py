@@ -0,0 +1,146 @@
+import json
+import time
+
+
+def progress_key(file_id):
+    """
+    Returns the Redis key holding the progress percentage of a file (read by `/progress/<file_id>`).
+    """
+    return f'progress_{file_id}'
+
+def details_key(file_id):
+    """
+    Returns the Redis hash holding the detailed progress of a file.
+    """
+    return f'progress_details_{file_id}'
+
+def progress_channel(file_id):
+    """
+    Returns the Redis pub/sub channel progress updates of a file are published on.
+    """
+    return f'progress:{file_id}'
+
+# Server-Sent Events of `/progress/<file_id>/stream`
+FINAL_STATUSES = ('done', 'failed')
+KEEP_ALIVE_EVENT = ": keep-alive\n\n"
+SSE_HEADERS = {'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+
+def snapshot(file_id, progress, details):
+    """
+    Returns the first event of a progress stream from the `progress_<file_id>` value and the raw details hash;
+    a file queued but not started yet has no details.
+    """
+    return {key.decode(): json.loads(value) for key, value in details.items()} or {'file_id': file_id, 'progress': float(progress), 'status': 'queued'}
+
+def progress_event(details):
+    """
+    Formats progress details as a `progress` Server-Sent Event.
+    """
+    return f"event: progress\ndata: {json.dumps(details)}\n\n"
+
+def is_final(details):
+    """
+    Tells whether progress details end the stream (the file is done or failed).
+    """
+    return details.get('status') in FINAL_STATUSES
+
+
+class ProgressReporter:
+    """
+    Publishes the ingestion progress of one file, at most once per `min_interval` seconds.
+
+    **Purpose**:
+    - Replaces one blocking Redis write per few rows with one pipelined round trip per interval.
+    - Each update sets the `progress_<file_id>` percentage, stores the details (rows and bytes done,
+      throughput and ETA) in `progress_details_<file_id>`, and publishes them on `progress:<file_id>` for
+      Server-Sent Events subscribers.
+
+    **Parameters**:
+    - `redis_conn` (Redis): Redis connection.
+    - `file_id` (str): File being ingested.
+    - `total_bytes` (int): Size of the file, used for the percentage and the ETA.
+    - `unit` (str): What positions are measured in: `bytes` (CSV) or `rows` (XLSX, where the byte offset is not
+      observable); `bytes_done`/`total_bytes` then count rows.
+    - `min_interval` (float): Minimum number of seconds between two updates, unless forced.
+    - `details_ttl` (int): Seconds the details hash is kept after the last update.
+    """
+
+    def __init__(self, redis_conn, file_id, total_bytes, min_interval=0.25, details_ttl=86400, unit='bytes'):
+        self.redis_conn = redis_conn
+        self.file_id = file_id
+        self.total_bytes = total_bytes
+        self.unit = unit
+        self.min_interval = min_interval
+        self.details_ttl = details_ttl
+        self.started_at = time.monotonic()
+        self.last_published_at = None
+        self.initial_rows = 0
+        self.initial_bytes = 0
+        self.last_progress = 0
+
+    def resume(self, rows_done, bytes_done):
+        """
+        Declares work committed by an earlier attempt, so throughput and ETA only account for this attempt.
+        """
+        self.initial_rows = rows_done
+        self.initial_bytes = bytes_done
+
+    def update(self, rows_done, bytes_done, force=False):
+        """
+        Publishes the progress if `min_interval` has elapsed since the last update (or `force` is set).
+        """
+        now = time.monotonic()
+        if not force and self.last_published_at is not None and now - self.last_published_at < self.min_interval:
+            return
+        self.last_published_at = now
+
+        elapsed = max(now - self.started_at, 1e-6)
+        bytes_per_second = max(bytes_done - self.initial_bytes, 0) / elapsed
+        remaining_bytes = max(self.total_bytes - bytes_done, 0)
+        progress = int((bytes_done / self.total_bytes) * 100) if self.total_bytes else 100
+        self.publish(min(progress, 99), 'processing', {
+            'rows_done': rows_done,
+            'bytes_done': bytes_done,
+            'rows_per_second': round(max(rows_done - self.initial_rows, 0) / elapsed, 1),
+            'bytes_per_second': round(bytes_per_second, 1),
+            'eta_seconds': round(remaining_bytes / bytes_per_second, 1) if bytes_per_second else None
+        })
+
+    def finish(self, rows_done):
+        """
+        Marks the file as fully processed.
+        """
+        elapsed = max(time.monotonic() - self.started_at, 1e-6)
+        self.publish(100, 'done', {
+            'rows_done': rows_done,
+            'bytes_done': self.total_bytes,
+            'rows_per_second': round(max(rows_done - self.initial_rows, 0) / elapsed, 1),
+            'bytes_per_second': round(max(self.total_bytes - self.initial_bytes, 0) / elapsed, 1),
+            'eta_seconds': 0
+        })
+
+    def retry(self):
+        """
+        Marks an attempt that failed and will be retried: the percentage is kept and the status is not final, so
+        progress streams stay open for the retry.
+        """
+        self.publish(max(self.last_progress, 0), 'retrying', {})
+
+    def fail(self):
+        """
+        Marks the file as failed for good (progress `-1`).
+        """
+        self.publish(-1, 'failed', {})
+
+    def publish(self, progress, status, details):
+        """
+        Writes the percentage and the details and publishes them, in a single pipelined round trip.
+        """
+        self.last_progress = progress
+        details = {**details, 'file_id': self.file_id, 'progress': progress, 'status': status, 'total_bytes': self.total_bytes, 'unit': self.unit}
+        pipeline = self.redis_conn.pipeline(transaction=False)
+        pipeline.set(progress_key(self.file_id), progress)
+        pipeline.hset(details_key(self.file_id), mapping={key: json.dumps(value) for key, value in details.items()})
+        pipeline.expire(details_key(self.file_id), self.details_ttl)
+        pipeline.publish(progress_channel(self.file_id), json.dumps(details))
+        pipeline.execute()
@@ -0,0 +1,208 @@
+import collections
+import threading
+import time
+from concurrent.futures import Future
+import pika
+import sys
+sys.path.append("..")
+from logger import logger
+
+log=logger.get_logger("publisher")
+
+PERSISTENT = 2  # AMQP delivery mode: the broker writes the message to disk
+
+
+class PublishError(Exception):
+    """
+    Raised (through the publish future) when the broker rejects a message (`basic.nack`).
+    """
+
+
+class Publisher:
+    """
+    Publishes messages to a durable RabbitMQ queue from any thread, with publisher confirms.
+
+    **Purpose**:
+    - pika connections and channels are not thread-safe. One dedicated I/O thread owns the connection and
+      channel. Callers on any thread only append to a handoff queue and wake the I/O loop with
+      `add_callback_threadsafe`, so concurrent uploads never wait on a lock held across a network round trip.
+    - The I/O loop also answers heartbeats, so an idle web process keeps its connection.
+    - Every message is published persistent on a durable queue, in confirm mode. The broker acknowledges
+      messages in batches (`multiple=True`), and one confirm resolves the futures of every message it covers.
+    - When the connection drops, it reconnects with exponential backoff. Messages that were sent but not
+      confirmed are published again (at least once; the consumer's upserts make redelivery harmless).
+
+    **Parameters**:
+    - `connection_parameters` (pika.ConnectionParameters): Broker connection settings.
+    - `queue` (str): Queue messages are routed to (default exchange); declared durable.
+    - `max_backoff` (float): Maximum seconds between reconnection attempts.
+    """
+
+    def __init__(self, connection_parameters, queue, max_backoff=30):
+        self.connection_parameters = connection_parameters
+        self.queue = queue
+        self.max_backoff = max_backoff
+        self._outbox = collections.deque()
+        self._unconfirmed = {}
+        self._delivery_tag = 0
+        self._connection = None
+        self._channel = None
+        self._ready = threading.Event()  # Set once connected, with the queue declared and confirms enabled
+        self._stopping = False
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def publish(self, body, properties=None):
+        """
+        Queues a message for publishing. Safe to call from any thread.
+
+        **Parameters**:
+        - `body` (bytes): Message body.
+        - `properties` (dict): `pika.BasicProperties` arguments; the delivery mode is always persistent.
+
+        **Returns**:
+        - `Future`: Resolves to `True` once the broker confirmed the message, or fails with `PublishError` if it
+          was rejected. Cancelling the future before the message is sent drops the message.
+        """
+        future = Future()
+        self._outbox.append((body, properties or {}, future))
+        self.start()
+        connection = self._connection
+        if self._ready.is_set() and connection is not None:
+            try:
+                connection.ioloop.add_callback_threadsafe(self._flush)
+            except Exception:
+                pass  # The connection is going away; the message is sent after reconnecting
+        return future
+
+    @property
+    def ready(self):
+        """
+        Tells whether the publisher is connected, with the queue declared and confirms enabled.
+        """
+        return self._ready.is_set()
+
+    def wait_ready(self, timeout=None):
+        """
+        Starts the I/O thread if needed and waits up to `timeout` seconds for the publisher to be ready.
+
+        **Returns**:
+        - `ready` (bool): Whether the publisher is ready.
+        """
+        self.start()
+        return self._ready.wait(timeout)
+
+    def start(self):
+        """
+        Starts the I/O thread, once per process.
+        """
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='rabbitmq-publisher', daemon=True)
+                self._thread.start()
+
+    def close(self):
+        """
+        Stops the I/O thread after closing the connection. Messages not yet confirmed are abandoned.
+        """
+        self._stopping = True
+        connection = self._connection
+        if connection is not None:
+            connection.ioloop.add_callback_threadsafe(connection.close)
+
+    def _run(self):
+        backoff = 1
+        while not self._stopping:
+            try:
+                self._connection = pika.SelectConnection(
+                    self.connection_parameters,
+                    on_open_callback=self._on_connection_open,
+                    on_open_error_callback=self._on_connection_error,
+                    on_close_callback=self._on_connection_closed
+                )
+                self._connection.ioloop.start()
+            except Exception as e:
+                log.error(f"RabbitMQ publisher I/O loop failed: {e}")
+
+            if self._ready.is_set():
+                backoff = 1  # The connection was usable; retry quickly
+            self._ready.clear()
+            self._channel = None
+            self._requeue_unconfirmed()
+            if self._stopping:
+                break
+            log.warning(f"RabbitMQ publisher reconnecting in {backoff}s...")
+            time.sleep(backoff)
+            backoff = min(backoff * 2, self.max_backoff)
+
+    def _requeue_unconfirmed(self):
+        for tag in sorted(self._unconfirmed, reverse=True):
+            self._outbox.appendleft(self._unconfirmed.pop(tag))
+        self._delivery_tag = 0
+
+    def _on_connection_open(self, connection):
+        connection.channel(on_open_callback=self._on_channel_open)
+
+    def _on_connection_error(self, connection, error):
+        log.error(f"RabbitMQ publisher could not connect: {error}")
+        connection.ioloop.stop()
+
+    def _on_connection_closed(self, connection, reason):
+        if not self._stopping:
+            log.warning(f"RabbitMQ publisher connection closed: {reason}")
+        connection.ioloop.stop()
+
+    def _on_channel_open(self, channel):
+        self._channel = channel
+        channel.add_on_close_callback(self._on_channel_closed)
+        channel.queue_declare(queue=self.queue, durable=True, callback=self._on_queue_declared)
+
+    def _on_channel_closed(self, channel, reason):
+        log.warning(f"RabbitMQ publisher channel closed: {reason}")
+        if self._connection.is_open:
+            self._connection.close()
+
+    def _on_queue_declared(self, frame):
+        self._channel.confirm_delivery(self._on_confirm, callback=self._on_confirm_mode)
+
+    def _on_confirm_mode(self, frame):
+        self._ready.set()
+        log.info(f"RabbitMQ publisher ready on the {self.queue} queue.")
+        self._flush()
+
+    def _flush(self):
+        """
+        Publishes everything in the handoff queue. Runs on the I/O thread.
+        """
+        while self._ready.is_set() and self._outbox:
+            body, properties, future = self._outbox.popleft()
+            if not future.running() and not future.set_running_or_notify_cancel():
+                continue  # Cancelled by the caller before it was sent; re-sent messages are already running
+            self._channel.basic_publish(
+                exchange='',
+                routing_key=self.queue,
+                body=body,
+                properties=pika.BasicProperties(**{**properties, 'delivery_mode': PERSISTENT})
+            )
+            self._delivery_tag += 1
+            self._unconfirmed[self._delivery_tag] = (body, properties, future)
+
+    def _on_confirm(self, frame):
+        """
+        Resolves the futures of every message covered by a broker ack/nack. Runs on the I/O thread.
+        """
+        method = frame.method
+        acked = isinstance(method, pika.spec.Basic.Ack)
+        if method.multiple:
+            tags = [tag for tag in self._unconfirmed if tag <= method.delivery_tag]
+        else:
+            tags = [method.delivery_tag] if method.delivery_tag in self._unconfirmed else []
+
+        for tag in tags:
+            _, _, future = self._unconfirmed.pop(tag)
+            if acked:
+                future.set_result(True)
+            else:
+                future.set_exception(PublishError('Message rejected by the broker.'))
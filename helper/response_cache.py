@@ -0,0 +1,129 @@
+import asyncio
+import hashlib
+import time
+
+GENERATION_KEY = 'movies:generation'
+
+# Reads the current generation and the cached entry for it in a single round trip.
+LOOKUP = """
+local generation = redis.call('get', KEYS[1]) or '0'
+return {generation, redis.call('get', ARGV[1] .. generation .. ':' .. ARGV[2])}
+"""
+
+
+def bump_generation(redis_conn):
+    """
+    Invalidates every cached `/movies` response by moving to a new generation.
+
+    **Purpose**:
+    - Called by the consumer when an ingest finishes. Old entries are never read again and expire on their own TTL.
+    """
+    redis_conn.incr(GENERATION_KEY)
+
+
+class ResponseCache:
+    """
+    Read-through cache of serialized JSON responses stored in Redis.
+
+    **Purpose**:
+    - Serves hot pages straight from Redis, skipping both MongoDB and JSON serialization.
+    - Protects MongoDB from stampedes: on a miss only one caller (the holder of a short Redis lock) computes
+      the response while the others wait for it to appear.
+
+    **Parameters**:
+    - `redis_conn` (Redis): Redis connection used for entries and locks.
+    - `ttl` (int): Seconds a cached response lives.
+    - `lock_ttl` (int): Seconds after which an abandoned single-flight lock expires.
+    - `wait_timeout` (float): Maximum seconds a caller waits for another caller's result before computing it itself.
+    - `poll_interval` (float): Seconds between checks while waiting.
+    """
+
+    def __init__(self, redis_conn, ttl=30, lock_ttl=5, wait_timeout=2.0, poll_interval=0.02):
+        self.redis_conn = redis_conn
+        self.ttl = ttl
+        self.lock_ttl = lock_ttl
+        self.wait_timeout = wait_timeout
+        self.poll_interval = poll_interval
+        self._lookup = redis_conn.register_script(LOOKUP)
+
+    def lookup(self, namespace, params):
+        """
+        Returns `(key, cached)` for the current generation; `cached` is `None` on a miss.
+        """
+        digest = hashlib.sha1(repr(params).encode('utf-8')).hexdigest()
+        generation, cached = self._lookup(keys=[GENERATION_KEY], args=[f'cache:{namespace}:', digest])
+        return f'cache:{namespace}:{generation.decode()}:{digest}', cached
+
+    def get_or_compute(self, namespace, params, compute):
+        """
+        Returns the cached body for `params`, computing and caching it on a miss.
+
+        **Parameters**:
+        - `namespace` (str): Prefix separating the cached endpoints.
+        - `params` (tuple): Everything the response depends on.
+        - `compute` (callable): Returns `(status, body)`; only `200` bodies are cached.
+
+        **Returns**:
+        - `(status, body)`: HTTP status code and serialized JSON bytes.
+        """
+
+        key, cached = self.lookup(namespace, params)
+        if cached is not None:
+            return 200, cached
+
+        lock_key = f'{key}:lock'
+        if not self.redis_conn.set(lock_key, 1, nx=True, ex=self.lock_ttl):
+            deadline = time.monotonic() + self.wait_timeout
+            while time.monotonic() < deadline:
+                time.sleep(self.poll_interval)
+                cached = self.redis_conn.get(key)
+                if cached is not None:
+                    return 200, cached
+            return compute()
+
+        try:
+            status, body = compute()
+            if status == 200:
+                self.redis_conn.setex(key, self.ttl, body)
+            return status, body
+        finally:
+            self.redis_conn.delete(lock_key)
+
+
+class AsyncResponseCache(ResponseCache):
+    """
+    `ResponseCache` over a `redis.asyncio` connection, for the ASGI app. Entries, generations and locks are
+    shared with the Flask app; waiting for another caller's result yields to the event loop instead of sleeping.
+    """
+
+    async def lookup(self, namespace, params):
+        digest = hashlib.sha1(repr(params).encode('utf-8')).hexdigest()
+        generation, cached = await self._lookup(keys=[GENERATION_KEY], args=[f'cache:{namespace}:', digest])
+        return f'cache:{namespace}:{generation.decode()}:{digest}', cached
+
+    async def get_or_compute(self, namespace, params, compute):
+        """
+        Same as `ResponseCache.get_or_compute`, with `compute` a coroutine function.
+        """
+
+        key, cached = await self.lookup(namespace, params)
+        if cached is not None:
+            return 200, cached
+
+        lock_key = f'{key}:lock'
+        if not await self.redis_conn.set(lock_key, 1, nx=True, ex=self.lock_ttl):
+            deadline = time.monotonic() + self.wait_timeout
+            while time.monotonic() < deadline:
+                await asyncio.sleep(self.poll_interval)
+                cached = await self.redis_conn.get(key)
+                if cached is not None:
+                    return 200, cached
+            return await compute()
+
+        try:
+            status, body = await compute()
+            if status == 200:
+                await self.redis_conn.setex(key, self.ttl, body)
+            return status, body
+        finally:
+            await self.redis_conn.delete(lock_key)
@@ -0,0 +1,162 @@
+import re
+from pymongo import DESCENDING
+
+# Equality filters accepted by /movies/search, mapped to the document field they match.
+FILTER_FIELDS = {
+    'title': 'title',
+    'director': 'director',
+    'cast': 'cast',
+    'country': 'country',
+    'genre': 'listed_in',
+    'rating': 'rating',
+    'type': 'type'
+}
+
+# Indexes the planner can hint, with their fields before `release_year`, most selective first. Each one is
+# `(field, ..., release_year)`, so the year range and the default `release_year` sort are served by the same
+# index. Every filter field leads at least one of them.
+PLANNED_INDEXES = [
+    ('cast_year', ['cast']),
+    ('director_year', ['director']),
+    ('title_year', ['title']),
+    ('type_rating_year', ['type', 'rating']),
+    ('rating_year', ['rating']),
+    ('country_year', ['country']),
+    ('listed_in_year', ['listed_in'])
+]
+YEAR_INDEX = 'release_year_id'
+
+# Facets counted for every search; array fields are unwound so each value is counted once per movie.
+FACET_FIELDS = ('type', 'rating', 'listed_in', 'country', 'release_year')
+ARRAY_FIELDS = ('listed_in', 'country', 'cast')
+
+
+def parse_criteria(args):
+    """
+    Extracts the search criteria from the query string.
+
+    **Returns**:
+    - `criteria` (dict): `q`, the equality filters keyed by document field, `year_from` and `year_to`;
+      missing parameters are left out.
+
+    **Raises**:
+    - `ValueError`: If a year is not an integer or the range is empty.
+    """
+
+    criteria = {}
+    q = args.get('q', '').strip()
+    if q:
+        criteria['q'] = q
+    for param, field in FILTER_FIELDS.items():
+        value = args.get(param, '').strip()
+        if value:
+            criteria[field] = value
+
+    for bound in ('year_from', 'year_to'):
+        if args.get(bound):
+            try:
+                criteria[bound] = int(args[bound])
+            except ValueError:
+                raise ValueError(f"Invalid {bound}! Must be an integer.")
+    if criteria.get('year_from', 0) > criteria.get('year_to', float('inf')):
+        raise ValueError('Invalid year range! year_from must not exceed year_to.')
+    return criteria
+
+
+def build_filter(criteria):
+    """
+    Translates search criteria into a MongoDB filter.
+
+    - `q` becomes a `$text` search on the `search_text` index (title, description, cast, director).
+    - `title` is a case-sensitive prefix match (`^...`), the only regex shape MongoDB answers from an index.
+    - Array fields (`cast`, `country`, `listed_in`) match any element, through their multikey indexes.
+    """
+
+    query = {}
+    if 'q' in criteria:
+        query['$text'] = {'$search': criteria['q']}
+    for field in FILTER_FIELDS.values():
+        if field not in criteria:
+            continue
+        if field == 'title':
+            query['title'] = {'$regex': f"^{re.escape(criteria['title'])}"}
+        else:
+            query[field] = criteria[field]
+
+    year_range = {}
+    if 'year_from' in criteria:
+        year_range['$gte'] = criteria['year_from']
+    if 'year_to' in criteria:
+        year_range['$lte'] = criteria['year_to']
+    if year_range:
+        query['release_year'] = year_range
+    return query
+
+
+def plan(criteria):
+    """
+    Picks the index and sort order for a search.
+
+    **Process**:
+    - Text searches must use the text index; they are sorted by relevance (`textScore`).
+    - Otherwise the first index in `PLANNED_INDEXES` whose leading field is filtered on is hinted (e.g.
+      `type_rating_year` also serves a `type`-only filter, through its prefix), so MongoDB never falls back to
+      a collection scan or a less selective index; the remaining filters are applied to the documents that
+      index returns. Results are sorted by `release_year`, newest first.
+    - With only a year range, the `(release_year, _id)` index is used.
+
+    **Returns**:
+    - `plan` (dict): `filter`, `hint` (index name or `None`) and `sort`.
+    """
+
+    query = build_filter(criteria)
+    if 'q' in criteria:
+        return {'filter': query, 'hint': None, 'sort': [('score', {'$meta': 'textScore'})]}
+
+    hint = None
+    for name, fields in PLANNED_INDEXES:
+        if fields[0] in criteria:
+            hint = name
+            break
+    if hint is None and 'release_year' in query:
+        hint = YEAR_INDEX
+    return {'filter': query, 'hint': hint, 'sort': [('release_year', DESCENDING)]}
+
+
+def facet_pipeline(search_plan, limit=20):
+    """
+    Builds the single `$facet` aggregation counting the matches per type, rating, genre, country and year.
+    """
+
+    facets = {'total': [{'$count': 'count'}]}
+    for field in FACET_FIELDS:
+        stages = [{'$unwind': f'${field}'}] if field in ARRAY_FIELDS else []
+        facets[field] = stages + [{'$sortByCount': f'${field}'}, {'$limit': limit}]
+    return [{'$match': search_plan['filter']}, {'$facet': facets}]
+
+
+def count_facets(collection, search_plan, limit=20):
+    """
+    Runs the facet aggregation and reshapes it into `{'total': n, '<field>': [{'value', 'count'}]}`.
+    """
+
+    options = {'hint': search_plan['hint']} if search_plan['hint'] else {}
+    result = next(collection.aggregate(facet_pipeline(search_plan, limit), **options), {})
+    facets = {'total': result['total'][0]['count'] if result.get('total') else 0}
+    for field in FACET_FIELDS:
+        facets[field] = [{'value': bucket['_id'], 'count': bucket['count']} for bucket in result.get(field, [])]
+    return facets
+
+
+def find_page(collection, search_plan, projection, page, per_page):
+    """
+    Returns one page of matching documents, following the plan's hint and sort.
+
+    Text searches are sorted by `textScore` without projecting it (MongoDB 4.4+), so the documents keep the
+    `/movies` shape.
+    """
+
+    cursor = collection.find(search_plan['filter'], projection).sort(search_plan['sort'])
+    if search_plan['hint']:
+        cursor = cursor.hint(search_plan['hint'])
+    return list(cursor.skip((page - 1) * per_page).limit(per_page))
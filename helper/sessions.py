@@ -0,0 +1,86 @@
+REVOCATION_CHANNEL = 'session_revocations'
+
+
+class SessionStore:
+    """
+    Redis-backed user sessions, keyed by the user's subject ID (the string form of the user's MongoDB `_id`).
+
+    **Purpose**:
+    - Gives `register`, `login` and the token checks one consistent key (`session:<subject>`), matching the
+      `user_id` claim signed into every token.
+    - Validates a session and slides its expiry in a single pipelined round trip.
+    - Revokes any number of sessions in a single round trip and announces each revocation on
+      `session_revocations` so processes caching sessions can drop them.
+
+    **Parameters**:
+    - `redis_conn` (Redis): Redis connection holding the sessions.
+    - `ttl` (int): Session lifetime in seconds, renewed on every validation.
+    """
+
+    def __init__(self, redis_conn, ttl=3600):
+        self.redis_conn = redis_conn
+        self.ttl = ttl
+
+    def key(self, subject):
+        """
+        Returns the Redis key holding the session of `subject`.
+        """
+        return f"session:{subject}"
+
+    def create(self, subject, username):
+        """
+        Starts (or restarts) the session of `subject`.
+        """
+        self.redis_conn.setex(self.key(subject), self.ttl, username)
+
+    def touch(self, subject):
+        """
+        Returns the username of an active session and extends its expiry, in one round trip.
+
+        **Returns**:
+        - `username` (str): If the session is active.
+        - `None`: If the session expired or was revoked.
+        """
+        pipeline = self.redis_conn.pipeline(transaction=False)
+        pipeline.get(self.key(subject))
+        pipeline.expire(self.key(subject), self.ttl)
+        username, _ = pipeline.execute()
+        return username.decode('utf-8') if username is not None else None
+
+    def revoke(self, *subjects):
+        """
+        Deletes the sessions of all `subjects` and publishes their revocation, in one round trip.
+        """
+        if not subjects:
+            return
+        pipeline = self.redis_conn.pipeline(transaction=False)
+        pipeline.delete(*[self.key(subject) for subject in subjects])
+        for subject in subjects:
+            pipeline.publish(REVOCATION_CHANNEL, subject)
+        pipeline.execute()
+
+
+class AsyncSessionStore(SessionStore):
+    """
+    `SessionStore` over a `redis.asyncio` connection, for the ASGI app. Keys and semantics are identical, so
+    both apps share the same sessions.
+    """
+
+    async def create(self, subject, username):
+        await self.redis_conn.setex(self.key(subject), self.ttl, username)
+
+    async def touch(self, subject):
+        pipeline = self.redis_conn.pipeline(transaction=False)
+        pipeline.get(self.key(subject))
+        pipeline.expire(self.key(subject), self.ttl)
+        username, _ = await pipeline.execute()
+        return username.decode('utf-8') if username is not None else None
+
+    async def revoke(self, *subjects):
+        if not subjects:
+            return
+        pipeline = self.redis_conn.pipeline(transaction=False)
+        pipeline.delete(*[self.key(subject) for subject in subjects])
+        for subject in subjects:
+            pipeline.publish(REVOCATION_CHANNEL, subject)
+        await pipeline.execute()
@@ -0,0 +1,91 @@
+from concurrent.futures import TimeoutError as PublishTimeout
+from helper import envelope
+from helper.progress import progress_key
+from helper.publisher import PublishError
+
+
+class UploadQueue:
+    """
+    Queues spooled uploads for the consumers; shared by the Flask and the ASGI app.
+
+    **Purpose**:
+    - A file identical to one already queued or processed (same checksum, see `helper.fingerprints`) is not
+      queued again: the spooled copy is removed and the earlier `file_id` is returned instead.
+    - Otherwise the descriptor is published, wrapped in a versioned envelope, through the shared `Publisher`,
+      and the file only counts as queued once the broker confirmed it (persisted on the durable queue).
+    - A message already sent when the confirm times out stays with the publisher, which re-sends it until the
+      broker answers; it is reported as queued, and marked failed (progress `-1`) if the broker rejects it later.
+
+    **Parameters**:
+    - `redis_conn` (Redis): Redis connection (progress keys).
+    - `blob_store` (LocalBlobStore): Spool the uploads were written to.
+    - `publisher` (Publisher): Publisher of the file processing queue.
+    - `fingerprints` (UploadFingerprints): Checksums of queued uploads.
+    - `compression` (str): Envelope compression.
+    - `confirm_timeout` (float): Seconds to wait for the broker's confirm.
+    """
+
+    def __init__(self, redis_conn, blob_store, publisher, fingerprints, compression='gzip', confirm_timeout=10):
+        self.redis_conn = redis_conn
+        self.blob_store = blob_store
+        self.publisher = publisher
+        self.fingerprints = fingerprints
+        self.compression = compression
+        self.confirm_timeout = confirm_timeout
+
+    def enqueue(self, descriptor, keep_file=False):
+        """
+        Deduplicates and publishes a spooled file. Blocks until the broker confirms, so async callers run it on
+        a worker thread.
+
+        **Parameters**:
+        - `descriptor` (dict): Spooled file, as returned by the blob store.
+        - `keep_file` (bool): Leave the spooled file in place when it could not be queued, so the caller can
+          retry (chunked uploads); by default it is deleted.
+
+        **Returns**:
+        - `(payload, status)`:
+            - 200: The earlier `file_id`, with `duplicate` set.
+            - 202: The file is queued for processing.
+            - 503: The file was not queued: the broker rejected it, or it could not be sent within
+              `confirm_timeout` seconds.
+        """
+        previous_file_id = self.fingerprints.claim(descriptor)
+        if previous_file_id:
+            self.blob_store.delete(descriptor['path'])
+            return {'file_id': previous_file_id, 'status': 'Identical file already uploaded', 'duplicate': True}, 200
+
+        self.redis_conn.set(progress_key(descriptor['file_id']), 0)
+        body, properties = envelope.encode_message(descriptor, compression=self.compression)
+        future = self.publisher.publish(body, properties)
+        try:
+            future.result(timeout=self.confirm_timeout)
+        except PublishTimeout:
+            if not future.cancel():
+                # Sent but not confirmed yet: the publisher re-sends it until the broker acks or nacks it
+                future.add_done_callback(lambda done: done.exception() and self.reject(descriptor))
+                return {'file_id': descriptor['file_id'], 'status': 'File queued for processing'}, 202
+            self.discard(descriptor, keep_file)
+            return {'message': 'Could not queue the file, please retry.'}, 503
+        except PublishError:
+            self.discard(descriptor, keep_file)
+            return {'message': 'Could not queue the file, please retry.'}, 503
+        return {'file_id': descriptor['file_id'], 'status': 'File queued for processing'}, 202
+
+    def discard(self, descriptor, keep_file=False):
+        """
+        Undoes `enqueue` for a file that was not queued: its fingerprint and progress are removed, so it can be
+        uploaded again, and so is the spooled file unless `keep_file` is set.
+        """
+        if not keep_file:
+            self.blob_store.delete(descriptor['path'])
+        self.fingerprints.release(descriptor)
+        self.redis_conn.delete(progress_key(descriptor['file_id']))
+
+    def reject(self, descriptor):
+        """
+        Marks a file reported as queued as failed, after the broker rejected its message.
+        """
+        self.blob_store.delete(descriptor['path'])
+        self.fingerprints.release(descriptor)
+        self.redis_conn.set(progress_key(descriptor['file_id']), -1)
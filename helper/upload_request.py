@@ -0,0 +1,50 @@
+import uuid
+from flask import Request
+from helper import helper
+
+
+class SpoolingRequest(Request):
+    """
+    Flask request that parses uploaded files straight into the spool.
+
+    **Purpose**:
+    - By default Werkzeug buffers every multipart file in a temporary file of its own, which `/upload` would
+      then copy into the spool: the upload would be written to disk twice. Here each file part with an
+      allowed extension is written once, to a `SpoolFile` of `blob_store`, while the body is parsed.
+    - The size limit is enforced while parsing, so a body sent without `Content-Length` is cut off at
+      `max_file_size` bytes instead of being buffered first.
+    - Spool files the view did not commit are removed when the request is closed. Files with another extension
+      are buffered the default way (and rejected by the view).
+
+    Set up with `spooling_request`.
+    """
+
+    blob_store = None
+    allowed_extensions = ()
+    max_file_size = None
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        if self.blob_store is None or not filename or not helper.allowed_file(filename, self.allowed_extensions):
+            return super()._get_file_stream(total_content_length, content_type, filename, content_length)
+        extension = filename.rsplit('.', 1)[1].lower()
+        spool = self.blob_store.open_spool(str(uuid.uuid4()), extension, max_size=self.max_file_size)
+        self.__dict__.setdefault('spools', []).append(spool)
+        return spool
+
+    def close(self):
+        try:
+            super().close()
+        finally:
+            for spool in self.__dict__.get('spools', []):
+                spool.discard()
+
+
+def spooling_request(blob_store, allowed_extensions, max_file_size=None):
+    """
+    Returns the request class to set as `app.request_class`, spooling files into `blob_store`.
+    """
+    return type('SpoolingRequest', (SpoolingRequest,), {
+        'blob_store': blob_store,
+        'allowed_extensions': allowed_extensions,
+        'max_file_size': max_file_size
+    })
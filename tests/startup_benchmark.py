@@ -0,0 +1,88 @@
+"""
+Startup-time benchmark.
+
+Imports each entry point in fresh interpreters and reports the median wall time, the import time alone, and
+any connection or thread created while importing (there should be none: connections are lazy). Exits with
+status 1 when the median exceeds `STARTUP_BUDGET_SECONDS` or an import opened a connection, so it can gate CI.
+
+    python tests/startup_benchmark.py [--runs 5] [--budget 1.5] [module ...]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_MODULES = ['app', 'asgi_app', 'consumer.file_consumer']
+
+PROBE = """
+import importlib, json, threading, time
+started_at = time.perf_counter()
+importlib.import_module({module!r})
+import_seconds = time.perf_counter() - started_at
+from configurations import connection_factory
+print(json.dumps({{
+    'import_seconds': import_seconds,
+    'connections': [c.name for c in connection_factory._connections if c.created],
+    'threads': [t.name for t in threading.enumerate() if t is not threading.main_thread()]
+}}))
+"""
+
+
+def measure(module, runs=5):
+    """
+    Imports `module` in `runs` fresh interpreters.
+
+    **Returns**:
+    - `result` (dict): Median and maximum wall time (interpreter start included) and import time, in seconds,
+      plus the connections and threads found after the last import.
+    """
+    wall, imports, probe = [], [], {}
+    for _ in range(runs):
+        started_at = time.perf_counter()
+        output = subprocess.run(
+            [sys.executable, '-c', PROBE.format(module=module)],
+            cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout
+        wall.append(time.perf_counter() - started_at)
+        probe = json.loads(output.strip().splitlines()[-1])
+        imports.append(probe['import_seconds'])
+    return {
+        'module': module,
+        'median_seconds': statistics.median(wall),
+        'max_seconds': max(wall),
+        'median_import_seconds': statistics.median(imports),
+        'connections': probe['connections'],
+        'threads': probe['threads']
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measures process startup time of the entry points.')
+    parser.add_argument('modules', nargs='*', default=DEFAULT_MODULES)
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--budget', type=float, default=float(os.getenv('STARTUP_BUDGET_SECONDS', 1.5)))
+    args = parser.parse_args()
+
+    failed = False
+    for module in args.modules:
+        result = measure(module, args.runs)
+        over_budget = result['median_seconds'] > args.budget
+        failed = failed or over_budget or bool(result['connections'])
+        print(
+            f"{module:<24} median {result['median_seconds']:.3f}s (import {result['median_import_seconds']:.3f}s, "
+            f"max {result['max_seconds']:.3f}s) budget {args.budget:.3f}s"
+            f"{'  OVER BUDGET' if over_budget else ''}"
+        )
+        if result['connections']:
+            print(f"{'':<24} connections opened at import: {', '.join(result['connections'])}")
+        if result['threads']:
+            print(f"{'':<24} threads started at import: {', '.join(result['threads'])}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -3,6 +3,7 @@ import sys
 sys.path.append("..")
 from app import app
 import io
+import uuid
 
 @pytest.fixture
 def client():
@@ -33,6 +34,23 @@ def test_login_missing_fields(client):
     assert response.json["message"] == "Username and password are required!"
 
 
+def test_register_token_has_session(client):
+    response = client.post('/register', json={"username": f"user-{uuid.uuid4()}", "password": "123"})
+    assert response.status_code == 201
+
+    token = response.json["token"]
+    response = client.get('/movies', headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code != 401
+
+def test_logout_revokes_session(client, auth_token):
+    headers = {"Authorization": f"Bearer {auth_token}"}
+    response = client.post('/logout', headers=headers)
+    assert response.status_code == 200
+
+    response = client.get('/movies', headers=headers)
+    assert response.status_code == 401
+    assert response.json["message"] == "Session expired, please log in again."
+
 def test_upload_success(client, auth_token):
     file_data = io.BytesIO(b"title,release_date,duration\nMovie A,2023-01-01,120")
     response = client.post(
@@ -76,6 +94,21 @@ def test_query_movies_invalid_page(client, auth_token):
 
     assert response.json["message"] == "Invalid page number! Page must be a positive integer."
 
+def test_query_movies_per_page_too_large(client, auth_token):
+    response = client.get('/movies?page=1&per_page=100000', headers={"Authorization": f"Bearer {auth_token}"})
+    assert response.status_code == 400
+    assert response.json["message"].startswith("Invalid per_page number! Must not exceed")
+
+def test_query_movies_invalid_cursor(client, auth_token):
+    response = client.get('/movies?cursor=not-a-cursor', headers={"Authorization": f"Bearer {auth_token}"})
+    assert response.status_code == 400
+    assert response.json["message"] == "Invalid cursor!"
+
+def test_query_movies_invalid_fields(client, auth_token):
+    response = client.get('/movies?fields=title,password', headers={"Authorization": f"Bearer {auth_token}"})
+    assert response.status_code == 400
+    assert response.json["message"].startswith("Invalid fields!")
+
 def test_query_movies_missing_auth(client):
     response = client.get('/movies?page=1&sort=release_date')
     assert response.status_code == 403
@@ -92,3 +125,584 @@ def test_missing_file_upload(client, auth_token):
     )
     assert response.status_code == 400
     assert response.json["message"] == "No file part"
+
+def test_search_movies_requires_filter(client, auth_token):
+    response = client.get('/movies/search', headers={"Authorization": f"Bearer {auth_token}"})
+    assert response.status_code == 400
+
+def test_search_movies_invalid_year_range(client, auth_token):
+    response = client.get('/movies/search?year_from=2020&year_to=2010', headers={"Authorization": f"Bearer {auth_token}"})
+    assert response.status_code == 400
+
+def test_suggest_movies_requires_query(client, auth_token):
+    response = client.get('/movies/suggest', headers={"Authorization": f"Bearer {auth_token}"})
+    assert response.status_code == 400
+
+def test_chunked_upload_invalid_format(client, auth_token):
+    response = client.post('/uploads', json={"filename": "movies.txt", "size": 10}, headers={"Authorization": f"Bearer {auth_token}"})
+    assert response.status_code == 400
+
+def test_chunked_upload_unknown_id(client, auth_token):
+    response = client.get(f'/uploads/{uuid.uuid4()}', headers={"Authorization": f"Bearer {auth_token}"})
+    assert response.status_code == 404
+
+
+def test_hashing_metrics_missing_auth(client):
+    response = client.get('/metrics/hashing')
+    assert response.status_code == 403
+    assert response.json["message"] == "Token is missing!"
+
+def test_healthz(client):
+    response = client.get('/healthz')
+    assert response.status_code == 200
+    assert response.json["status"] == "alive"
+
+def test_readyz_reports_every_dependency(client):
+    response = client.get('/readyz')
+    assert response.status_code in (200, 503)
+    assert set(response.json["checks"]) == {"mongodb", "redis", "rabbitmq"}
+
+def test_publisher_readiness_waits_for_the_first_connection(monkeypatch):
+    import time
+    from helper.publisher import Publisher
+
+    def connect_after_a_moment(publisher):
+        time.sleep(0.05)
+        publisher._on_confirm_mode(None)
+
+    monkeypatch.setattr(Publisher, '_run', connect_after_a_moment)
+    monkeypatch.setattr(Publisher, '_flush', lambda publisher: None)
+    publisher = Publisher(None, 'file_processing_queue')
+    assert not publisher.ready
+    assert publisher.wait_ready(2)
+    assert publisher.ready
+
+def test_import_opens_no_connections():
+    from tests.startup_benchmark import measure
+    result = measure('app', runs=1)
+    assert result['connections'] == []
+
+
+class RecordingRedis:
+    """
+    Records the commands of Redis pipelines, for units that only write to Redis.
+    """
+
+    def __init__(self):
+        self.commands = []
+
+    def pipeline(self, transaction=True):
+        return self
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self.commands.append((name, args, kwargs))
+
+def test_ingest_progress_reports_rows_and_bytes():
+    import json
+    from helper.progress import ProgressReporter
+    from consumer.ingestion import progress_callback
+    redis_conn = RecordingRedis()
+    reporter = ProgressReporter(redis_conn, 'f', 10_000_000, min_interval=0)
+    progress_callback(reporter)(5_000_000, 20_000)  # ingest_records reports (position, rows_done)
+    assert ('set', ('progress_f', 50), {}) in redis_conn.commands
+    details = json.loads(next(args[1] for name, args, _ in redis_conn.commands if name == 'publish'))
+    assert details['rows_done'] == 20_000
+    assert details['bytes_done'] == 5_000_000
+
+@pytest.mark.parametrize("block_size", [1, 5, 64, 4096])
+@pytest.mark.parametrize("lineterminator", ['\n', '\r\n'])
+def test_csv_ranges_yield_the_rows_of_csv_reader(tmp_path, monkeypatch, block_size, lineterminator):
+    import csv
+    from consumer import readers
+    monkeypatch.setattr(readers, 'SCAN_BLOCK_SIZE', block_size)
+    values = ['plain', 'with, comma', 'quoted "word"', 'multi\nline', 'crlf\r\ninside', '', '""', 'ünïcode']
+    path = tmp_path / 'movies.csv'
+    with open(path, 'w', newline='', encoding='utf-8') as csv_file:
+        writer = csv.writer(csv_file, lineterminator=lineterminator)
+        writer.writerow(['show_id', 'title', 'description'])
+        for i in range(40):
+            writer.writerow([f's{i}', values[i % len(values)], ' '.join(values[:i % 5]) * (i % 3)])
+
+    with open(path, newline='', encoding='utf-8') as csv_file:
+        header, *rows = list(csv.reader(csv_file))
+    expected = [dict(zip(header, row)) for row in rows]
+    for parts in (1, 3, 7, 40):
+        ranges = readers.split_csv_ranges(str(path), parts)
+        assert all(end == start for (_, end), (start, _) in zip(ranges, ranges[1:]))
+        assert [row for start, end in ranges for row, _ in readers.iter_csv_records(str(path), start=start, end=end)] == expected
+
+def test_failed_parallel_ingest_waits_for_running_chunks(monkeypatch):
+    import time
+    from concurrent.futures import ThreadPoolExecutor
+    from consumer import ingestion, parallel_ingest
+
+    class Checkpoint:
+        def load_ranges(self):
+            return [(0, 10), (10, 20)]
+
+    finished = []
+
+    def ingest_chunk(file_id, file_path, chunk_index, start, end):
+        if chunk_index == 0:
+            time.sleep(0.05)  # Chunk 1 is running by then
+            raise RuntimeError('MongoDB unavailable')
+        time.sleep(0.2)
+        finished.append(chunk_index)
+
+    monkeypatch.setattr(parallel_ingest, 'get_pool', lambda: ThreadPoolExecutor(max_workers=2))
+    monkeypatch.setattr(parallel_ingest, 'ingest_chunk', ingest_chunk)
+    monkeypatch.setattr(ingestion, 'get_checkpoint', lambda file_id: Checkpoint())
+    monkeypatch.setattr(ingestion, 'redis_conn', RecordingRedis())
+    with pytest.raises(RuntimeError):
+        parallel_ingest.ingest_parallel('f', 'movies.csv', None)
+    assert finished == [1]
+
+@pytest.mark.parametrize("compression", ['identity', 'gzip', 'zstd'])
+def test_envelope_round_trip(compression):
+    from helper import envelope
+    if compression not in envelope.available_compressions():
+        pytest.skip(f'{compression} is not installed')
+    descriptor = {'file_id': 'f', 'path': '/spool/f.csv', 'padding': 'x' * 2048}
+    body, properties = envelope.encode_message(descriptor, compression=compression)
+    header, _ = envelope.decode_message(body)
+    assert header['content_encoding'] == compression
+    assert 'content_encoding' not in properties
+    assert envelope.decode_json(body) == descriptor
+
+def test_envelope_reads_legacy_json_and_rejects_unknown_formats():
+    import json
+    from helper import envelope
+    assert envelope.decode_json(b'{"file_id": "f"}') == {'file_id': 'f'}
+
+    header = json.dumps({'content_type': 'application/json', 'content_encoding': 'brotli', 'size': 2}).encode()
+    with pytest.raises(ValueError, match='compression'):
+        envelope.decode_message(envelope.PREAMBLE.pack(envelope.MAGIC, envelope.VERSION, len(header)) + header + b'{}')
+    body, _ = envelope.encode_message({'file_id': 'f'})
+    with pytest.raises(ValueError, match='version'):
+        envelope.decode_message(envelope.MAGIC + bytes([envelope.VERSION + 1]) + body[len(envelope.MAGIC) + 1:])
+
+def matches_filter(document, query):
+    """
+    Evaluates the subset of MongoDB filters `keyset_filter` produces; `None` matches missing fields.
+    """
+    if '$or' in query:
+        return any(matches_filter(document, clause) for clause in query['$or'])
+    for field, condition in query.items():
+        value = document.get(field)
+        if not isinstance(condition, dict):
+            if value != condition:
+                return False
+        elif '$ne' in condition:
+            if value == condition['$ne']:
+                return False
+        elif value is None or not ('$gt' in condition and value > condition['$gt'] or '$lt' in condition and value < condition['$lt']):
+            return False
+    return True
+
+@pytest.mark.parametrize("sort_order", [1, -1])
+def test_keyset_pages_follow_the_sort_order_through_null_values(sort_order):
+    from helper.pagination import keyset_filter
+    documents = [{'_id': i, 'duration': value} for i, value in enumerate([90, None, 45, 90, None, 120, 45])]
+    documents.append({'_id': len(documents)})  # Missing sort value
+    # MongoDB order: missing/null values first ascending, last descending; `_id` breaks ties in the same direction
+    ordered = sorted(documents, key=lambda document: (document.get('duration') is not None, document.get('duration') or 0, document['_id']), reverse=sort_order == -1)
+
+    walked = [ordered[0]]
+    while len(walked) < len(documents):
+        last = walked[-1]
+        query = keyset_filter('duration', sort_order, last.get('duration'), last['_id'])
+        following = [document for document in ordered if matches_filter(document, query)]
+        assert following == ordered[len(walked):]
+        walked.append(following[0])
+    query = keyset_filter('duration', sort_order, walked[-1].get('duration'), walked[-1]['_id'])
+    assert not [document for document in documents if matches_filter(document, query)]
+
+def test_text_index_matches_its_stored_form():
+    from configurations.index_configuration import INDEXES, matches
+    index = next(index for index in INDEXES['movies'] if index['name'] == 'search_text')
+    existing = {
+        'key': [('_fts', 'text'), ('_ftsx', 1)],
+        'weights': {'cast': 3, 'description': 1, 'director': 5, 'title': 10},
+        'default_language': 'english',
+        'language_override': 'language',
+        'textIndexVersion': 3
+    }
+    assert matches(existing, index)
+    assert not matches({**existing, 'weights': {**existing['weights'], 'title': 1}}, index)
+
+def test_movie_query_parameters():
+    from helper.movies import MOVIE_FIELDS, parse_fields, parse_page
+    assert parse_page({}, 100) == (1, 10)
+    assert parse_fields('') == list(MOVIE_FIELDS)
+    assert parse_fields('title, type') == ['title', 'type']
+    with pytest.raises(ValueError, match='Must not exceed 100'):
+        parse_page({'per_page': '101'}, 100)
+    with pytest.raises(ValueError, match='Invalid fields'):
+        parse_fields('title,budget')
+
+def test_every_search_filter_is_planned_on_an_index():
+    from configurations.index_configuration import INDEXES
+    from helper import search
+    declared = {index['name'] for index in INDEXES['movies']}
+    assert search.plan({'rating': 'PG'})['hint'] == 'rating_year'
+    assert search.plan({'type': 'Movie'})['hint'] == 'type_rating_year'
+    assert search.plan({'type': 'Movie', 'rating': 'PG'})['hint'] == 'type_rating_year'
+    for field in search.FILTER_FIELDS.values():
+        assert search.plan({field: 'x'})['hint'] in declared
+
+def test_movie_listing_rejects_invalid_cursor():
+    from helper.movies import parse_listing
+    with pytest.raises(ValueError, match='Invalid cursor'):
+        parse_listing({'cursor': 'not-a-cursor'}, 100)
+
+class StubFingerprints:
+    def claim(self, descriptor):
+        return None
+
+    def release(self, descriptor):
+        self.released = descriptor['file_id']
+
+class RejectingPublisher:
+    def publish(self, body, properties):
+        from concurrent.futures import Future
+        from helper.publisher import PublishError
+        future = Future()
+        future.set_running_or_notify_cancel()
+        future.set_exception(PublishError('Message rejected by the broker.'))
+        return future
+
+@pytest.mark.parametrize("keep_file", [False, True])
+def test_rejected_upload_is_not_queued(tmp_path, keep_file):
+    import os
+    from helper.blob_store import LocalBlobStore
+    from helper.upload_queue import UploadQueue
+    blob_store = LocalBlobStore(str(tmp_path))
+    descriptor = blob_store.save_stream('f', io.BytesIO(b'show_id,title\n'), 'csv')
+    fingerprints = StubFingerprints()
+    upload_queue = UploadQueue(RecordingRedis(), blob_store, RejectingPublisher(), fingerprints)
+    assert upload_queue.enqueue(descriptor, keep_file=keep_file)[1] == 503
+    assert os.path.exists(descriptor['path']) == keep_file
+    assert fingerprints.released == 'f'
+
+def test_multipart_upload_is_parsed_into_the_spool(tmp_path):
+    import os
+    from flask import Flask, request as current_request
+    from helper.blob_store import LocalBlobStore, FileTooLargeError
+    from helper.upload_request import spooling_request
+    blob_store = LocalBlobStore(str(tmp_path))
+    upload_app = Flask('spooling')
+    upload_app.request_class = spooling_request(blob_store, {'csv'}, max_file_size=64)
+
+    @upload_app.route('/upload', methods=['POST'])
+    def upload():
+        try:
+            return current_request.files['file'].stream.commit()
+        except FileTooLargeError:
+            return {}, 400
+
+    content = b'show_id,title\ns1,"Line one\nline two"\n'
+    with upload_app.test_client() as upload_client:
+        descriptor = upload_client.post('/upload', data={'file': (io.BytesIO(content), 'movies.csv'), 'other': (io.BytesIO(b'x'), 'other.csv')}).get_json()
+        assert upload_client.post('/upload', data={'file': (io.BytesIO(b'x' * 65), 'big.csv')}).status_code == 400
+
+    with open(descriptor['path'], 'rb') as spooled:
+        assert spooled.read() == content
+    assert descriptor['checksum'] == blob_store.save_stream('copy', io.BytesIO(content), 'csv')['checksum']
+    assert sorted(os.listdir(tmp_path)) == sorted([os.path.basename(descriptor['path']), 'copy.csv'])
+
+def test_sweep_removes_abandoned_partial_uploads(tmp_path):
+    import os
+    import time
+    from helper.blob_store import LocalBlobStore
+    from helper.chunked_upload import ChunkedUploads
+
+    class ExpiredSessions:
+        def exists(self, key):
+            return 0
+
+    blob_store = LocalBlobStore(str(tmp_path))
+    abandoned = blob_store.create_partial('abandoned', 'csv', 1024)
+    in_progress = blob_store.create_partial('in-progress', 'csv', 1024)
+    os.utime(abandoned, (time.time() - 7200, time.time() - 7200))
+    assert ChunkedUploads(ExpiredSessions(), blob_store).sweep(grace=3600) == 1
+    assert not os.path.exists(abandoned)
+    assert os.path.exists(in_progress)
+
+def test_revocation_during_session_read_is_not_cached():
+    from helper.auth import Authenticator
+
+    class RevokedWhileReading:
+        redis_conn = None
+
+        def touch(self, user_id):
+            authenticator.forget_session(user_id)  # The logout's revocation lands while Redis answers
+            return 'Pavan'
+
+    authenticator = Authenticator(RevokedWhileReading())
+    authenticator.listening = True
+    assert authenticator.load_session('42') == 'Pavan'
+    assert authenticator.sessions.get('42') is None
+
+def test_missing_movie_count_is_estimated_and_filled_once():
+    import threading
+    from helper.count_cache import MovieCountCache, MOVIES_COUNT_KEY
+
+    class Collection:
+        def __init__(self):
+            self.exact_counts = 0
+            self.release = threading.Event()
+
+        def estimated_document_count(self):
+            return 100
+
+        def count_documents(self, query):
+            self.exact_counts += 1
+            self.release.wait(5)
+            return 101
+
+    class CountStore:
+        def __init__(self):
+            self.values = {}
+
+        def get(self, key):
+            return self.values.get(key)
+
+        def set(self, key, value):
+            self.values[key] = value
+
+    collection, redis_conn = Collection(), CountStore()
+    count_cache = MovieCountCache(redis_conn, lambda: collection, refresh_interval=3600)
+    assert [count_cache.get() for _ in range(5)] == [100] * 5
+    collection.release.set()
+    for thread in threading.enumerate():
+        if thread.name == 'movie-count-fill':
+            thread.join(5)
+    assert collection.exact_counts == 1
+    assert redis_conn.values[MOVIES_COUNT_KEY] == 101
+
+@pytest.mark.parametrize("value, expected", [
+    ('90 min', (90, 'min')),
+    ('2 Seasons', (2, 'season')),
+    ('1 Season', (1, 'season')),
+    ('  45  MIN ', (45, 'min')),
+    ('90', (90, 'min')),
+    ('', (None, None)),
+    ('min', (None, None)),
+    ('90min', (None, None))
+])
+def test_parse_duration(value, expected):
+    from consumer.normalizer import parse_duration
+    assert parse_duration(value) == expected
+
+@pytest.mark.parametrize("value, expected", [
+    ('September 25, 2021', (2021, 9, 25)),
+    (' Sep 5, 2021 ', (2021, 9, 5)),
+    ('2021-09-25', (2021, 9, 25)),
+    ('25-09-2021', (2021, 9, 25)),
+    ('09/25/2021', (2021, 9, 25)),
+    ('', None),
+    ('February 30, 2021', None),
+    ('unknown', None)
+])
+def test_parse_date(value, expected):
+    import datetime
+    from consumer.normalizer import parse_date
+    assert parse_date(value) == (datetime.datetime(*expected) if expected else None)
+
+def test_split_list_and_empty_fields():
+    from consumer.normalizer import split_list, normalize_document
+    assert split_list(' , A,, B ,') == ['A', 'B']
+    assert split_list('') == []
+    document = normalize_document({'title': '  ', 'director': 7, 'release_year': 2019.0, 'cast': None})
+    assert (document['title'], document['director'], document['release_year'], document['cast']) == (None, '7', 2019, [])
+
+def test_backfill_types_raw_documents():
+    import datetime
+    from consumer.backfill import typed_fields
+    from consumer.normalizer import normalize_document
+    raw = {'_id': 1, 'title': 'Dick Johnson Is Dead', 'release_year': '2020', 'duration': '90 min',
+           'date_added': 'September 25, 2021', 'cast': 'A, B', 'listed_in': 'Documentaries', 'country': 'United States'}
+    update = typed_fields(normalize_document(raw))
+    assert update['release_year'] == 2020
+    assert (update['duration'], update['duration_unit']) == (90, 'min')
+    assert update['date_added'] == datetime.datetime(2021, 9, 25)
+    assert update['cast'] == ['A', 'B']
+    assert 'content_hash' in update and '_id' not in update
+
+@pytest.mark.parametrize("redelivered", [False, True])
+def test_failed_message_is_dropped_only_on_redelivery(redelivered):
+    from consumer.worker_runtime import ConsumerRuntime
+
+    class Channel:
+        def basic_nack(self, delivery_tag, requeue):
+            self.requeued = requeue
+
+    class Connection:
+        def add_callback_threadsafe(self, callback):
+            callback()
+
+    def fail(body, properties):
+        raise RuntimeError('MongoDB unavailable')
+
+    dropped = []
+    runtime = ConsumerRuntime(None, 'file_processing_queue', fail, on_drop=lambda body, properties: dropped.append(body))
+    runtime.channel, runtime.connection, runtime.in_flight = Channel(), Connection(), 1
+    runtime.process(1, redelivered, b'descriptor', None)
+    assert runtime.channel.requeued == (not redelivered)
+    assert dropped == ([b'descriptor'] if redelivered else [])
+
+def test_ack_on_a_closed_channel_is_left_for_redelivery():
+    import pika
+    from consumer.worker_runtime import ConsumerRuntime
+
+    class ClosedChannel:
+        def basic_ack(self, delivery_tag):
+            raise pika.exceptions.ChannelWrongStateError('Channel is closed.')
+
+    class Connection:
+        is_open = True
+
+        def add_callback_threadsafe(self, callback):
+            callback()
+
+    class ClosedConnection:
+        is_open = False
+
+        def add_callback_threadsafe(self, callback):
+            raise pika.exceptions.ConnectionWrongStateError('Connection is closed.')
+
+    runtime = ConsumerRuntime(None, 'file_processing_queue', lambda body, properties: None)
+    runtime.channel, runtime.connection, runtime.in_flight = ClosedChannel(), Connection(), 2
+    runtime.process(1, False, b'descriptor', None)
+    runtime.connection = ClosedConnection()
+    runtime.process(2, False, b'descriptor', None)
+    assert runtime.in_flight == 0
+    runtime.drain()
+
+class HashRedis:
+    """
+    Dict-backed stand-in for the Redis hash commands used by checkpoints.
+    """
+
+    def __init__(self):
+        self.hashes = {}
+
+    def pipeline(self, transaction=True):
+        return self
+
+    def execute(self):
+        pass
+
+    def expire(self, key, ttl):
+        pass
+
+    def hset(self, key, field=None, value=None, mapping=None):
+        self.hashes.setdefault(key, {}).update(mapping or {field: value})
+
+    def hget(self, key, field):
+        return self.hashes.get(key, {}).get(field)
+
+    def hmget(self, key, *fields):
+        return [self.hget(key, field) for field in fields]
+
+    def delete(self, key):
+        self.hashes.pop(key, None)
+
+def test_checkpoint_resumes_after_the_last_committed_record(tmp_path):
+    from consumer.checkpoints import Checkpoint
+    from consumer.readers import iter_csv_records
+    path = tmp_path / 'movies.csv'
+    path.write_bytes(b'show_id,description\r\ns1,"first\r\nline"\r\ns2,second\r\ns3,"th""ird"\r\n')
+    records = list(iter_csv_records(str(path)))
+
+    redis_conn = HashRedis()
+    assert Checkpoint(redis_conn, 'f').load() == (None, 0)
+    Checkpoint(redis_conn, 'f').save(records[0][1], 1)
+    Checkpoint(redis_conn, 'f').for_chunk(1).save(records[2][1], 1)
+    offset, rows = Checkpoint(redis_conn, 'f').load()
+    assert rows == 1
+    assert list(iter_csv_records(str(path), start=offset)) == records[1:]
+    assert Checkpoint(redis_conn, 'f').for_chunk(1).load() == (records[2][1], 1)
+
+    Checkpoint(redis_conn, 'f').clear()
+    assert Checkpoint(redis_conn, 'f').for_chunk(1).load() == (None, 0)
+
+class BulkCollection:
+    """
+    Collection stand-in for `BatchWriter`: serves stored content digests and answers `bulk_write` with `result`
+    (or raises it).
+    """
+
+    def __init__(self, stored, result):
+        self.stored = stored
+        self.result = result
+        self.written = []
+
+    def find(self, query, projection):
+        return [{'show_id': key, 'content_hash': digest} for key, digest in self.stored.items() if key in query['show_id']['$in']]
+
+    def bulk_write(self, operations, ordered):
+        self.written.extend(operations)
+        if isinstance(self.result, Exception):
+            raise self.result
+        return self.result
+
+def test_batch_writer_skips_unchanged_documents():
+    from types import SimpleNamespace
+    from consumer.batch_writer import BatchWriter, content_hash
+    unchanged = {'show_id': 's1', 'title': 'Same'}
+    stored = {'s1': content_hash(unchanged, 'content_hash'), 's2': 'stale'}
+    collection = BulkCollection(stored, SimpleNamespace(inserted_count=0, upserted_count=1, matched_count=1))
+    writer = BatchWriter(collection, key_field='show_id', hash_field='content_hash')
+    for document in (dict(unchanged), {'show_id': 's2', 'title': 'Changed'}, {'show_id': 's3', 'title': 'New'}):
+        writer.add(document)
+    writer.close()
+    assert len(collection.written) == 2 and [document['show_id'] for document in writer.last_batch] == ['s2', 's3']
+    assert (writer.rows_written, writer.rows_unchanged, writer.last_batch_inserted) == (3, 1, 1)
+
+def test_batch_writer_counts_rows_of_a_partially_failed_batch():
+    from pymongo.errors import BulkWriteError
+    from consumer.batch_writer import BatchWriter
+    error = BulkWriteError({'nInserted': 0, 'nUpserted': 2, 'nMatched': 1, 'writeErrors': [{'index': 1, 'errmsg': 'E11000 duplicate key'}]})
+    flushed = []
+    writer = BatchWriter(BulkCollection({}, error), key_field='show_id', on_flush=lambda writer, failed_rows: flushed.append(failed_rows))
+    for key in ('s1', 's2', 's3', 's4'):
+        writer.add({'show_id': key})
+    writer.close()
+    assert (writer.rows_written, writer.rows_failed, writer.last_batch_inserted) == (3, 1, 2)
+    assert [(row['index'], row['document']['show_id']) for row in flushed[0]] == [(1, 's2')]
+
+def test_failed_attempt_reports_retrying_not_failed():
+    import json
+    from helper.progress import ProgressReporter, is_final
+    redis_conn = RecordingRedis()
+    reporter = ProgressReporter(redis_conn, 'f', 1000, min_interval=0)
+    reporter.update(10, 400)
+    reporter.retry()
+    details = json.loads([args[1] for name, args, _ in redis_conn.commands if name == 'publish'][-1])
+    assert details['status'] == 'retrying' and details['progress'] == 40
+    assert not is_final(details)
+    assert ('set', ('progress_f', 40), {}) in redis_conn.commands
+
+def test_duplicate_show_ids_do_not_block_other_indexes(monkeypatch):
+    from pymongo.errors import OperationFailure
+    from configurations import index_configuration
+
+    class Collection:
+        def __init__(self):
+            self.created = []
+
+        def index_information(self):
+            return {'_id_': {'key': [('_id', 1)]}}
+
+        def create_indexes(self, models):
+            name = models[0].document['name']
+            if name == 'show_id_unique':
+                raise OperationFailure('E11000 duplicate key error', code=11000)
+            self.created.append(name)
+
+    collections = {}
+    monkeypatch.setattr(index_configuration, 'get_collection', lambda name: collections.setdefault(name, Collection()))
+    changes, failures = index_configuration.reconcile_indexes()
+    assert {'date_added_id', 'release_year_id', 'duration_id', 'search_text'} <= set(collections['movies'].created)
+    assert len(failures) == 1 and 'show_id_unique' in failures[0] and '--dedupe' in failures[0]